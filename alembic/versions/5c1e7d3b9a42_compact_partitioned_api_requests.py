@@ -0,0 +1,157 @@
+"""compact_partitioned_api_requests
+
+Stores the responses of the api_requests table compressed, with their hash,
+size and whether they were truncated, indexes created_at, path and
+status_code, and range-partitions the table by month of created_at.
+
+PostgreSQL can't partition an existing table, so the table is recreated and
+the existing requests are copied with their responses stored uncompressed
+("identity" encoding). The partitions of the next months are created by
+`python -m src.jobs.api_requests_retention`; requests outside every monthly
+partition go to api_requests_default.
+
+Revision ID: 5c1e7d3b9a42
+Revises: 0af1eaa2d07b
+Create Date: 2026-10-18 09:12:44.318207
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7d3b9a42'
+down_revision: Union[str, None] = '0af1eaa2d07b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD_MONTHS = 2
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE api_requests RENAME TO api_requests_legacy")
+    op.execute("ALTER SEQUENCE api_requests_id_seq RENAME TO api_requests_legacy_id_seq")
+    op.execute("ALTER INDEX api_requests_pkey RENAME TO api_requests_legacy_pkey")
+
+    op.execute("CREATE SEQUENCE api_requests_id_seq AS bigint")
+    op.execute(
+        """
+        CREATE TABLE api_requests (
+            id bigint NOT NULL DEFAULT nextval('api_requests_id_seq'),
+            request_type varchar NOT NULL,
+            path varchar NOT NULL,
+            created_at timestamp with time zone NOT NULL,
+            response bytea NOT NULL,
+            response_encoding varchar(16) NOT NULL,
+            response_sha256 varchar(64) NOT NULL,
+            response_size integer NOT NULL,
+            response_truncated boolean NOT NULL DEFAULT false,
+            status_code integer NOT NULL,
+            CONSTRAINT api_requests_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE api_requests_id_seq OWNED BY api_requests.id")
+    op.create_index('ix_api_requests_created_at', 'api_requests', ['created_at'])
+    op.create_index('ix_api_requests_path', 'api_requests', ['path'])
+    op.create_index('ix_api_requests_status_code', 'api_requests', ['status_code'])
+
+    op.execute("CREATE TABLE api_requests_default PARTITION OF api_requests DEFAULT")
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month_start timestamp;
+            last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC')
+                + interval '{PARTITIONS_AHEAD_MONTHS} months';
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(created_at), now()) AT TIME ZONE 'UTC')
+            INTO month_start FROM api_requests_legacy;
+
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF api_requests FOR VALUES FROM (%L) TO (%L)',
+                    'api_requests_' || to_char(month_start, '"y"YYYY"m"MM'),
+                    month_start::text || '+00',
+                    (month_start + interval '1 month')::text || '+00'
+                );
+                month_start := month_start + interval '1 month';
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO api_requests (
+            id, request_type, path, created_at, response, response_encoding,
+            response_sha256, response_size, response_truncated, status_code
+        )
+        SELECT
+            id, request_type, path, created_at, convert_to(response, 'UTF8'), 'identity',
+            encode(sha256(convert_to(response, 'UTF8')), 'hex'),
+            octet_length(convert_to(response, 'UTF8')), false, status_code
+        FROM api_requests_legacy
+        """
+    )
+    op.execute(
+        "SELECT setval('api_requests_id_seq', coalesce(max(id), 0) + 1, false) FROM api_requests"
+    )
+    op.drop_table('api_requests_legacy')
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE api_requests RENAME TO api_requests_partitioned")
+    op.execute("ALTER INDEX api_requests_pkey RENAME TO api_requests_partitioned_pkey")
+    op.execute("ALTER SEQUENCE api_requests_id_seq RENAME TO api_requests_partitioned_id_seq")
+    op.create_table('api_requests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('request_type', sa.String(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('response', sa.String(), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    connection = op.get_bind()
+    api_requests = sa.table(
+        'api_requests',
+        sa.column('id'),
+        sa.column('request_type'),
+        sa.column('path'),
+        sa.column('created_at'),
+        sa.column('response'),
+        sa.column('status_code'),
+    )
+    rows = connection.execution_options(stream_results=True).execute(
+        sa.text(
+            "SELECT id, request_type, path, created_at, response, response_encoding, status_code "
+            "FROM api_requests_partitioned ORDER BY id"
+        )
+    ).yield_per(1000)
+    for batch in rows.partitions():
+        connection.execute(
+            api_requests.insert(),
+            [
+                {
+                    "id": row.id,
+                    "request_type": row.request_type,
+                    "path": row.path,
+                    "created_at": row.created_at,
+                    "response": (
+                        zlib.decompress(row.response) if row.response_encoding == "zlib"
+                        else bytes(row.response)
+                    ).decode("utf-8", errors="ignore"),
+                    "status_code": row.status_code,
+                }
+                for row in batch
+            ],
+        )
+    op.execute(
+        "SELECT setval('api_requests_id_seq', coalesce(max(id), 0) + 1, false) FROM api_requests"
+    )
+    op.drop_table('api_requests_partitioned')
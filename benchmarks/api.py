@@ -0,0 +1,399 @@
+"""
+Latency and throughput benchmark of the diamond API.
+
+Drives /diamond/predict-price and /diamond/search with concurrent clients, either
+in-process through the ASGI app or over a local uvicorn server. Requests are
+logged to the SQLite stand-in used by the tests and predictions are served by a
+model freshly trained on the local dataset, unless --model-path is given.
+
+Run from the project root:
+
+    python -m benchmarks.api --mode in-process --concurrency 8 --requests 1000 \\
+        --output benchmark.json --baseline benchmark-baseline.json --max-regression 0.1
+
+The exit code is 1 when a scenario regressed more than --max-regression
+compared to the baseline.
+"""
+import argparse
+import asyncio
+import json
+import pickle
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Iterator
+
+import httpx
+import pandas as pd
+import uvicorn
+from xgboost.sklearn import XGBRegressor
+
+from src.config import app_config
+from src.routers import diamond_router
+from src.services import (
+    diamond_service,
+    encoding_service,
+    model_service,
+    search_index_service,
+)
+from src.services.api_requests_service import api_requests_log_writer
+from src.services.dataset_service import convert_column_into_ordinal_categorical_data_type
+from src.utils.enums.diamonds_enums import (
+    DiamondClarityEnum,
+    DiamondColorEnum,
+    DiamondCutEnum,
+)
+from tests.conftest import TestingSessionLocal, app
+
+SCENARIOS = {
+    "predict-price": "/diamond/predict-price",
+    "search": "/diamond/search",
+}
+
+COMPARED_METRICS = {
+    "p50_ms": "lower",
+    "p95_ms": "lower",
+    "p99_ms": "lower",
+    "requests_per_second": "higher",
+}
+
+
+class StageTimer:
+    """
+    Collects the time spent in each stage of the requests, by wrapping the
+    functions that implement the stages.
+    """
+
+    def __init__(self):
+        self._durations: dict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, function: Callable) -> Callable:
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                with self._lock:
+                    self._durations[stage].append(duration)
+
+        return timed
+
+    def reset(self) -> None:
+        with self._lock:
+            self._durations.clear()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                stage: {
+                    "count": len(durations),
+                    "mean_ms": statistics.fmean(durations) * 1000,
+                    "p50_ms": percentile(durations, 50) * 1000,
+                    "p95_ms": percentile(durations, 95) * 1000,
+                }
+                for stage, durations in self._durations.items()
+            }
+
+
+@contextmanager
+def instrument_stages(stage_timer: StageTimer) -> Iterator[None]:
+    """
+    Wraps the functions of each request stage with the stage timer while the
+    context is active.
+    """
+    patches = [
+        (diamond_service, "validate_data_has_no_zero_values", "validation"),
+        (diamond_service, "find_rows_with_most_similar_weight", "weight_selection"),
+        (search_index_service.search_index_cache, "get", "search_index"),
+        (search_index_service.DiamondSearchIndex, "get_records", "records"),
+        (model_service.model_cache, "get", "model_cache"),
+        (encoding_service.DiamondFeatureEncoder, "encode", "encoding"),
+        (model_service, "predict_features", "inference"),
+        (diamond_router, "log_api_request", "audit_log"),
+    ]
+    originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+    for target, name, stage in patches:
+        setattr(target, name, stage_timer.wrap(stage, getattr(target, name)))
+    try:
+        yield
+    finally:
+        for target, name, original in originals:
+            setattr(target, name, original)
+
+
+def percentile(values: list[float], percent: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def train_model_artifact(dataset_path: str, path: str) -> None:
+    """
+    Trains an XGBoost model on the local dataset, with the notebook's cleaning
+    rules and categories, and pickles it to the received path.
+    """
+    df = pd.read_csv(dataset_path)
+    df = df[(df.x * df.y * df.z != 0) & (df.price > 0)]
+    for column_name, enum in (
+        ("cut", DiamondCutEnum),
+        ("color", DiamondColorEnum),
+        ("clarity", DiamondClarityEnum),
+    ):
+        df[column_name] = convert_column_into_ordinal_categorical_data_type(
+            df=df, column_name=column_name, categories_list=[item.value for item in enum]
+        )
+
+    model = XGBRegressor(enable_categorical=True, random_state=42)
+    model.fit(df.drop(columns="price"), df["price"])
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+
+
+def create_payloads(dataset_path: str, scenario: str, n_payloads: int) -> list[dict]:
+    df = pd.read_csv(dataset_path)
+    df = df[(df.x * df.y * df.z != 0) & (df.price > 0)].drop(columns="price")
+    records = df.sample(n=n_payloads, replace=True, random_state=42).to_dict("records")
+
+    if scenario == "search":
+        return [
+            {key: record[key] for key in ("carat", "cut", "color", "clarity")}
+            for record in records
+        ]
+    return records
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "requests_per_second": len(latencies) / elapsed,
+    }
+
+
+async def run_in_process(path: str, payloads: list[dict], concurrency: int) -> dict:
+    """
+    Sends the payloads through the ASGI app, with `concurrency` requests in flight.
+    """
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+
+        async def send(payload: dict) -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(payload) for payload in payloads))
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, errors, elapsed)
+
+
+def run_over_uvicorn(base_url: str, path: str, payloads: list[dict], concurrency: int) -> dict:
+    """
+    Sends the payloads to the uvicorn server, from `concurrency` client threads.
+    """
+    local = threading.local()
+
+    def send(payload: dict) -> tuple[float, bool]:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = httpx.Client(base_url=base_url)
+        start = time.perf_counter()
+        response = client.post(path, json=payload)
+        return time.perf_counter() - start, response.status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, payloads))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in results]
+    errors = sum(not ok for _, ok in results)
+    return summarize(latencies, errors, elapsed)
+
+
+@contextmanager
+def serve_with_uvicorn() -> Iterator[str]:
+    """
+    Serves the app with uvicorn from a background thread and yields its URL.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def compare_with_baseline(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    """
+    Compares the results with the baseline.
+
+    Parameters
+    ----------
+    results: (dict)
+        The benchmark results.
+    baseline: (dict)
+        The stored benchmark results to compare with.
+    max_regression: (float)
+        The maximum relative regression allowed for each metric, e.g. 0.1 for 10%.
+
+    Returns
+    -------
+    (list[str])
+        A description of each metric that regressed more than allowed.
+    """
+    regressions = []
+    for scenario, baseline_metrics in baseline["scenarios"].items():
+        metrics = results["scenarios"].get(scenario)
+        if metrics is None:
+            continue
+
+        for metric, better in COMPARED_METRICS.items():
+            expected, actual = baseline_metrics[metric], metrics[metric]
+            if better == "lower":
+                regression = (actual - expected) / expected
+            else:
+                regression = (expected - actual) / expected
+
+            if regression > max_regression:
+                regressions.append(
+                    f"{scenario} {metric}: {actual:.3f} vs baseline {expected:.3f} "
+                    f"({regression:+.1%})"
+                )
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=["in-process", "uvicorn"], default="in-process")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--dataset-path", default=app_config.DATASET_PATH)
+    parser.add_argument("--model-path", help="Model to serve. Defaults to a freshly trained one.")
+    parser.add_argument("--output", help="File the results are written to, as JSON.")
+    parser.add_argument("--baseline", help="Results of a previous run to compare with.")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = args.model_path
+        if model_path is None:
+            model_path = f"{directory}/model_xcgboost.pkl"
+            train_model_artifact(args.dataset_path, model_path)
+
+        model_service.model_cache = model_service.ModelCache(
+            path=model_path, reload_interval_seconds=app_config.MODEL_RELOAD_INTERVAL_SECONDS
+        )
+        model_service.model_cache.get()
+        search_index_service.search_index_cache = search_index_service.DiamondSearchIndexCache(
+            path=args.dataset_path
+        )
+        search_index_service.search_index_cache.get()
+        api_requests_log_writer.session_factory = TestingSessionLocal
+        api_requests_log_writer.start()
+
+        results = {
+            "meta": {
+                "mode": args.mode,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "python": platform.python_version(),
+                "created_at": datetime.now().isoformat(),
+            },
+            "scenarios": {},
+        }
+        stage_timer = StageTimer()
+        with instrument_stages(stage_timer), (
+            serve_with_uvicorn() if args.mode == "uvicorn" else nullcontext()
+        ) as base_url:
+            for scenario in args.scenarios:
+                path = SCENARIOS[scenario]
+                warmup = create_payloads(args.dataset_path, scenario, args.warmup)
+                payloads = create_payloads(args.dataset_path, scenario, args.requests)
+
+                if args.mode == "uvicorn":
+                    run_over_uvicorn(base_url, path, warmup, args.concurrency)
+                    stage_timer.reset()
+                    metrics = run_over_uvicorn(base_url, path, payloads, args.concurrency)
+                else:
+                    asyncio.run(run_in_process(path, warmup, args.concurrency))
+                    stage_timer.reset()
+                    metrics = asyncio.run(run_in_process(path, payloads, args.concurrency))
+
+                metrics["stages"] = stage_timer.summary()
+                results["scenarios"][scenario] = metrics
+
+        api_requests_log_writer.stop()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+def print_results(results: dict) -> None:
+    for scenario, metrics in results["scenarios"].items():
+        print(
+            f"{scenario}: {metrics['requests']} requests, {metrics['errors']} errors, "
+            f"{metrics['requests_per_second']:.1f} req/s, p50 {metrics['p50_ms']:.2f} ms, "
+            f"p95 {metrics['p95_ms']:.2f} ms, p99 {metrics['p99_ms']:.2f} ms"
+        )
+        for stage, stage_metrics in metrics["stages"].items():
+            print(
+                f"    {stage:>16}: mean {stage_metrics['mean_ms']:.3f} ms, "
+                f"p95 {stage_metrics['p95_ms']:.3f} ms ({stage_metrics['count']} calls)"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Compares the per-call latency of the dataframe and the encoder paths of a single
+price prediction, and checks that both predict the same values.
+
+Run from the project root:
+
+    python -m benchmarks.feature_encoding --model-path data/models/model_xcgboost.pkl
+"""
+import argparse
+import statistics
+import time
+
+import pandas as pd
+
+from src.config import app_config
+from src.schemas.diamond_schema import DiamondFeaturesForPredictionSchema
+from src.services import encoding_service, model_service
+from src.services.diamond_service import (
+    create_dataframe_from_diamond_schema_for_prediction,
+    prepare_diamond_df_for_xgboost_model,
+)
+
+
+def predict_with_dataframe(data: DiamondFeaturesForPredictionSchema, model) -> float:
+    diamond_df = create_dataframe_from_diamond_schema_for_prediction(data).copy()
+    diamond_df = prepare_diamond_df_for_xgboost_model(diamond_df)
+    return model_service.predict(df=diamond_df, model=model)[0]
+
+
+def predict_with_encoder(data: DiamondFeaturesForPredictionSchema, model) -> float:
+    features = encoding_service.get_model_encoder(model).encode(data)
+    return model_service.predict_features(features=features, model=model)[0]
+
+
+def measure_latencies_us(predict, diamonds, model, repeat: int) -> list[float]:
+    latencies = []
+    for _ in range(repeat):
+        for diamond in diamonds:
+            start = time.perf_counter()
+            predict(diamond, model)
+            latencies.append((time.perf_counter() - start) * 1_000_000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model-path", default=app_config.MODEL_PATH)
+    parser.add_argument("--dataset-path", default=app_config.DATASET_PATH)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    model = model_service.load_pickle_model(args.model_path)
+    df = pd.read_csv(args.dataset_path).drop(columns="price").head(args.rows)
+    diamonds = [DiamondFeaturesForPredictionSchema(**row) for row in df.to_dict("records")]
+
+    mismatches = sum(
+        predict_with_dataframe(diamond, model) != predict_with_encoder(diamond, model)
+        for diamond in diamonds
+    )
+    print(f"Predictions compared: {len(diamonds)}, mismatches: {mismatches}")
+
+    for name, predict in (
+        ("dataframe", predict_with_dataframe),
+        ("encoder", predict_with_encoder),
+    ):
+        latencies = measure_latencies_us(predict, diamonds, model, args.repeat)
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{name:>10}: p50 {quantiles[49]:8.1f} us   p95 {quantiles[94]:8.1f} us   "
+            f"p99 {quantiles[98]:8.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import time
+
+# Start of the imports of the application, the "imports" stage of the startup report.
+IMPORTS_STARTED_AT = time.perf_counter()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+MODEL_PATH = os.environ.get("MODEL_PATH", "data/models/model_xcgboost.pkl")
+LINEAR_MODEL_PATH = os.environ.get("LINEAR_MODEL_PATH", "data/models/model_linear.json")
+MODEL_RELOAD_INTERVAL_SECONDS = float(
+    os.environ.get("MODEL_RELOAD_INTERVAL_SECONDS", "5")
+)
+
+BATCH_PREDICTION_MAX_SIZE = int(os.environ.get("BATCH_PREDICTION_MAX_SIZE", "100000"))
+CSV_PREDICTION_CHUNK_SIZE = int(os.environ.get("CSV_PREDICTION_CHUNK_SIZE", "10000"))
+
+DATASET_PATH = os.environ.get("DATASET_PATH", "data/diamonds.csv")
+DATASET_CACHE_DIR = os.environ.get(
+    "DATASET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "diamond-api")
+)
+
+AUDIT_LOG_QUEUE_MAX_SIZE = int(os.environ.get("AUDIT_LOG_QUEUE_MAX_SIZE", "10000"))
+AUDIT_LOG_FLUSH_MAX_RECORDS = int(os.environ.get("AUDIT_LOG_FLUSH_MAX_RECORDS", "500"))
+AUDIT_LOG_FLUSH_INTERVAL_MS = int(os.environ.get("AUDIT_LOG_FLUSH_INTERVAL_MS", "200"))
+
+PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", "0"))
+PREDICTION_CACHE_FLOAT_PRECISION = int(
+    os.environ.get("PREDICTION_CACHE_FLOAT_PRECISION", "6")
+)
+
+PREDICTION_BATCH_MAX_SIZE = int(os.environ.get("PREDICTION_BATCH_MAX_SIZE", "64"))
+PREDICTION_BATCH_MAX_WAIT_MS = float(os.environ.get("PREDICTION_BATCH_MAX_WAIT_MS", "2"))
+PREDICTION_BATCH_TIMEOUT_SECONDS = float(
+    os.environ.get("PREDICTION_BATCH_TIMEOUT_SECONDS", "30")
+)
+
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", "10000"))
+SEARCH_STREAM_CHUNK_SIZE = int(os.environ.get("SEARCH_STREAM_CHUNK_SIZE", "1000"))
+SIMILARITY_TREE_CACHE_MAX_ENTRIES = int(
+    os.environ.get("SIMILARITY_TREE_CACHE_MAX_ENTRIES", "1024")
+)
+
+INGESTION_CHUNK_SIZE = int(os.environ.get("INGESTION_CHUNK_SIZE", "10000"))
+
+API_MODE = os.environ.get("API_MODE", "sync")
+INFERENCE_EXECUTOR_MAX_WORKERS = int(
+    os.environ.get("INFERENCE_EXECUTOR_MAX_WORKERS", "0")
+) or os.cpu_count()
+
+AUDIT_LOG_RESPONSE_MAX_BYTES = int(os.environ.get("AUDIT_LOG_RESPONSE_MAX_BYTES", "65536"))
+AUDIT_LOG_COMPRESSION_LEVEL = int(os.environ.get("AUDIT_LOG_COMPRESSION_LEVEL", "6"))
+AUDIT_LOG_RETENTION_MONTHS = int(os.environ.get("AUDIT_LOG_RETENTION_MONTHS", "6"))
+AUDIT_LOG_PARTITIONS_AHEAD_MONTHS = int(
+    os.environ.get("AUDIT_LOG_PARTITIONS_AHEAD_MONTHS", "2")
+)
+
+MODEL_REGISTRY_PATH = os.environ.get("MODEL_REGISTRY_PATH", "data/models/registry")
+MODEL_NAME = os.environ.get("MODEL_NAME", "diamonds-xgboost")
+
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "0")) or os.cpu_count()
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PROFILING_DIR = os.environ.get("PROFILING_DIR", "data/profiles")
+PROFILING_HEADER = os.environ.get("PROFILING_HEADER", "X-Profile")
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL_MS = float(os.environ.get("PROFILING_INTERVAL_MS", "1"))
@@ -1,25 +1,131 @@
 import os
-from sqlalchemy import create_engine
+import threading
+
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.config.database_pool import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+)
 
 postgres_user = os.environ.get("POSTGRES_USER", "")
 postgres_password = os.environ.get("POSTGRES_PASSWORD", "")
 postgres_db= os.environ.get("POSTGRES_DB", "")
+postgres_pool_size = int(os.environ.get("POSTGRES_POOL_SIZE", "5"))
+postgres_max_overflow = int(os.environ.get("POSTGRES_MAX_OVERFLOW", "10"))
+postgres_pool_timeout = float(os.environ.get("POSTGRES_POOL_TIMEOUT", "30"))
+postgres_pool_recycle = int(os.environ.get("POSTGRES_POOL_RECYCLE", "1800"))
+postgres_pool_pre_ping = os.environ.get("POSTGRES_POOL_PRE_PING", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 SQLALCHEMY_DATABASE_URL = (
     f"postgresql://{postgres_user}:{postgres_password}@{postgres_db}:5432/{postgres_db}"
 )
+ASYNC_SQLALCHEMY_DATABASE_URL = (
+    f"postgresql+asyncpg://{postgres_user}:{postgres_password}@{postgres_db}:5432/{postgres_db}"
+)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+pool_options = {
+    "pool_size": postgres_pool_size,
+    "max_overflow": postgres_max_overflow,
+    "pool_timeout": postgres_pool_timeout,
+    "pool_recycle": postgres_pool_recycle,
+    "pool_pre_ping": postgres_pool_pre_ping,
+}
 
 Base = declarative_base()
 
+_engines_lock = threading.Lock()
+_engine: Engine | None = None
+_session_factory: sessionmaker | None = None
+_async_engine: AsyncEngine | None = None
+_async_session_factory: async_sessionmaker | None = None
+
+
+def get_engine() -> Engine:
+    """
+    Returns the engine of the blocking sessions, creating it on first use, so
+    importing the application doesn't load the database driver.
+    """
+    global _engine, _session_factory
+    if _engine is None:
+        with _engines_lock:
+            if _engine is None:
+                engine = create_engine(
+                    SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options
+                )
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                _engine = engine
+
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Returns the engine of the async sessions, creating it on first use.
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        with _engines_lock:
+            if _async_engine is None:
+                async_engine = create_async_engine(
+                    ASYNC_SQLALCHEMY_DATABASE_URL,
+                    poolclass=InstrumentedAsyncAdaptedQueuePool,
+                    **pool_options,
+                )
+                _async_session_factory = async_sessionmaker(
+                    bind=async_engine, autoflush=False, expire_on_commit=False
+                )
+                _async_engine = async_engine
+
+    return _async_engine
+
+
+def SessionLocal() -> Session:
+    """
+    Returns a new blocking session of the lazily created engine.
+    """
+    get_engine()
+    return _session_factory()
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """
+    Returns a new async session of the lazily created engine.
+    """
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def dispose_engines() -> None:
+    """
+    Closes the connections of the engines created so far.
+    """
+    if _engine is not None:
+        _engine.dispose()
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from src.schemas.database_pool_schema import (
+    DatabasePoolStatsSchema,
+    DatabasePoolWaitBucketSchema,
+)
+
+CHECKOUT_WAIT_BUCKETS_SECONDS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+class PoolCheckoutStats:
+    """
+    Counters and wait time histogram of the connection checkouts of a pool.
+
+    The wait time covers everything `Pool.connect()` does before handing the
+    connection over: waiting for a free connection, opening a new one within
+    the overflow and the pre-ping.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bucket_counts = [0] * (len(CHECKOUT_WAIT_BUCKETS_SECONDS) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        """
+        Records a checkout.
+
+        Parameters
+        ----------
+        wait_seconds: (float)
+            How long the checkout took.
+        timed_out: (bool)
+            Whether the checkout gave up after the pool timeout.
+        """
+        bucket = bisect_left(CHECKOUT_WAIT_BUCKETS_SECONDS, wait_seconds)
+        with self._lock:
+            self._bucket_counts[bucket] += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+
+    def get_buckets(self) -> list[DatabasePoolWaitBucketSchema]:
+        """
+        Returns the cumulative histogram of the wait times: each bucket counts
+        the checkouts that took up to `le_seconds` (None is unbounded).
+        """
+        with self._lock:
+            bucket_counts = list(self._bucket_counts)
+
+        buckets = []
+        count = 0
+        for le_seconds, bucket_count in zip(
+            [*CHECKOUT_WAIT_BUCKETS_SECONDS, None], bucket_counts
+        ):
+            count += bucket_count
+            buckets.append(DatabasePoolWaitBucketSchema(le_seconds=le_seconds, count=count))
+
+        return buckets
+
+
+class InstrumentedPoolMixin:
+    """
+    Times every connection checkout of a `QueuePool` into `checkout_stats`.
+
+    The stats are kept when the pool is recreated, e.g. by `engine.dispose()`.
+    """
+
+    checkout_stats: PoolCheckoutStats
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = PoolCheckoutStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.checkout_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+
+        self.checkout_stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_pool_stats(pool: InstrumentedPoolMixin) -> DatabasePoolStatsSchema:
+    """
+    Returns the live statistics of an instrumented pool in this worker process.
+
+    Parameters
+    ----------
+    pool: (InstrumentedPoolMixin)
+        The pool of the engine, `engine.pool`.
+
+    Returns
+    -------
+    (DatabasePoolStatsSchema)
+    """
+    stats = pool.checkout_stats
+    return DatabasePoolStatsSchema(
+        pid=os.getpid(),
+        pool_size=pool.size(),
+        max_overflow=pool._max_overflow,
+        timeout_seconds=pool.timeout(),
+        recycle_seconds=pool._recycle,
+        pre_ping=pool._pre_ping,
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=stats.checkouts,
+        checkout_timeouts=stats.timeouts,
+        checkout_wait_seconds_total=stats.wait_seconds_total,
+        checkout_wait_seconds_max=stats.wait_seconds_max,
+        checkout_wait_seconds_buckets=stats.get_buckets(),
+    )
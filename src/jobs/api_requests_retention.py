@@ -0,0 +1,34 @@
+"""
+Keeps the partitions of the `api_requests` table: creates the ones of the next
+months and drops the ones older than `AUDIT_LOG_RETENTION_MONTHS`.
+
+Run it daily, e.g. from cron, in the project root:
+
+    python -m src.jobs.api_requests_retention
+"""
+import logging
+from datetime import datetime, timezone
+
+from src.config import app_config
+from src.config.database_config import SessionLocal
+from src.services.api_requests_partition_service import apply_retention
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    with SessionLocal() as db:
+        created_partitions, dropped_partitions = apply_retention(
+            db,
+            today=datetime.now(timezone.utc).date(),
+            retention_months=app_config.AUDIT_LOG_RETENTION_MONTHS,
+            partitions_ahead_months=app_config.AUDIT_LOG_PARTITIONS_AHEAD_MONTHS,
+        )
+
+    logger.info(f"Created partitions: {created_partitions or 'none'}")
+    logger.info(f"Dropped partitions: {dropped_partitions or 'none'}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,8 +1,49 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import src
+from src.config import app_config
+from src.config.database_config import dispose_engines
+from src.middlewares.metrics_middleware import RequestMetricsMiddleware
+from src.middlewares.profiling_middleware import RequestProfilingMiddleware
+from src.routers.dataset_router import router as dataset_router
+from src.routers.diamond_async_router import router as diamond_async_router
 from src.routers.diamond_router import router as diamond_router
+from src.routers.health_router import router as health_router
+from src.routers.metrics_router import router as metrics_router
+from src.routers.model_router import router as model_router
+from src.routers.observability_router import router as observability_router
+from src.services import model_service
+from src.services.api_requests_service import api_requests_log_writer
+from src.services.prediction_batching_service import prediction_batcher
+from src.services.startup_service import startup_tracker, warm_up
+from src.utils.enums.api_enums import ApiModeEnum
+
+logger = logging.getLogger(__name__)
+
+startup_tracker.record("imports", time.perf_counter() - src.IMPORTS_STARTED_AT)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()
+    for cache in (model_service.model_cache, model_service.linear_model_cache):
+        cache.start_watcher()
+    api_requests_log_writer.start()
+    prediction_batcher.start()
+    yield
+    startup_tracker.set_ready(False)
+    prediction_batcher.stop()
+    api_requests_log_writer.stop()
+    model_service.model_cache.stop_watcher()
+    model_service.linear_model_cache.stop_watcher()
+    await dispose_engines()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost",
@@ -16,7 +57,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+if app_config.PROFILING_ENABLED:
+    app.add_middleware(
+        RequestProfilingMiddleware,
+        output_dir=app_config.PROFILING_DIR,
+        header=app_config.PROFILING_HEADER,
+        sample_rate=app_config.PROFILING_SAMPLE_RATE,
+        interval_ms=app_config.PROFILING_INTERVAL_MS,
+    )
 
-app.include_router(diamond_router)
+if ApiModeEnum(app_config.API_MODE) == ApiModeEnum.async_:
+    app.include_router(diamond_async_router)
+else:
+    app.include_router(diamond_router)
+app.include_router(dataset_router)
+app.include_router(model_router)
+app.include_router(observability_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
 
 
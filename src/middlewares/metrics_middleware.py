@@ -0,0 +1,49 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services import metrics_service
+
+
+class RequestMetricsMiddleware:
+    """
+    Counts the HTTP requests by method, route path and status code, and times them.
+
+    The path is the template of the matched route, like
+    `/models/versions/{version}/promote`, so the number of series doesn't grow
+    with the requested URLs. Requests that match no route are counted as
+    "unmatched".
+
+    Parameters
+    ----------
+    app: (ASGIApp)
+        The wrapped application.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            metrics_service.observe_request(
+                method=scope["method"],
+                path=getattr(route, "path", "unmatched"),
+                status_code=status_code,
+                seconds=time.perf_counter() - start,
+            )
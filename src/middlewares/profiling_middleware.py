@@ -0,0 +1,143 @@
+import logging
+import os
+import random
+import re
+import threading
+from datetime import datetime, timezone
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.utils.stack_sampler import StackSampler
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Background threads of the services, idle most of the time in application code.
+BACKGROUND_THREAD_PREFIXES = (
+    "api-requests-log-writer",
+    "model-cache-watcher",
+    "prediction-batcher",
+)
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+def get_profile_id(method: str, path: str, now: datetime) -> str:
+    """
+    Returns the name of the files of a profile, tagged with the UTC timestamp,
+    the method and the path of the request, e.g.
+    `20240101T120000123456Z_POST_diamond-predict-price`.
+    """
+    path_slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-") or "root"
+    return f"{now.strftime('%Y%m%dT%H%M%S%fZ')}_{method}_{path_slug}"
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles single requests on demand, with a sampling profiler.
+
+    A request is profiled when it has the profiling header set to a non-empty
+    value other than "0", or is drawn at `sample_rate`. Its profile is written
+    to `output_dir` as `<profile id>.pstats`, loadable with `pstats.Stats` or
+    snakeviz, and `<profile id>.collapsed`, the input of flamegraph.pl and
+    speedscope, and the profile id is returned in the `X-Profile-Id` header.
+
+    Other requests only pay for a scan of their headers. A single request is
+    profiled at a time, and requests arriving meanwhile aren't profiled.
+
+    Parameters
+    ----------
+    app: (ASGIApp)
+        The wrapped application.
+    output_dir: (str)
+        The directory where the profiles are written.
+    header: (str)
+        The header that asks for the profile of a request.
+    sample_rate: (float)
+        The fraction of the requests profiled without the header.
+    interval_ms: (float)
+        The time between two samples of the stacks.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        output_dir: str,
+        header: str = "X-Profile",
+        sample_rate: float = 0.0,
+        interval_ms: float = 1.0,
+    ):
+        self.app = app
+        self.output_dir = output_dir
+        self.header = header.lower().encode("latin-1")
+        self.sample_rate = sample_rate
+        self.interval_seconds = interval_ms / 1000
+        self._lock = threading.Lock()
+
+    def should_profile(self, scope: Scope) -> bool:
+        """
+        Returns whether the request asks for a profile or is drawn for one.
+        """
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return value not in (b"", b"0")
+
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = get_profile_id(scope["method"], scope["path"], datetime.now(timezone.utc))
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER, profile_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        sampler = StackSampler(
+            root_dir=APP_DIR,
+            interval_seconds=self.interval_seconds,
+            ignored_thread_prefixes=BACKGROUND_THREAD_PREFIXES,
+        )
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            self._lock.release()
+            await run_in_threadpool(self.write_profile, sampler, profile_id)
+
+    def write_profile(self, sampler: StackSampler, profile_id: str) -> None:
+        """
+        Writes the pstats and collapsed stacks files of a profile.
+
+        Parameters
+        ----------
+        sampler: (StackSampler)
+            The stopped sampler of the request.
+        profile_id: (str)
+            The name of the files.
+        """
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, profile_id)
+            sampler.dump_pstats(f"{path}.pstats")
+            with open(f"{path}.collapsed", "w") as f:
+                f.write(sampler.get_collapsed_stacks())
+        except OSError as e:
+            logger.error(f"Error writing profile {profile_id}. [Details]: {e}")
+            return
+
+        logger.info(
+            f"Profiled {profile_id} in {sampler.duration_seconds * 1000:.1f} ms, "
+            f"{sum(sampler.samples.values())} samples written to {path}.pstats and {path}.collapsed."
+        )
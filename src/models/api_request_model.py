@@ -1,18 +1,33 @@
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Integer, LargeBinary, String
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from src.config.database_config import Base
+from src.utils.response_codec import decode_response
 
 class APIrequestModel(Base):
     __tablename__ = "api_requests"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
     request_type = Column(String, nullable=False)
-    path = Column(String, nullable=False)
-    created_at = Column(DateTime(timezone=True), nullable=False)
-    response = Column(String, nullable=False)
-    status_code = Column(Integer, nullable=False)
+    path = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    response = Column(LargeBinary, nullable=False)
+    response_encoding = Column(String(16), nullable=False)
+    response_sha256 = Column(String(64), nullable=False)
+    response_size = Column(Integer, nullable=False)
+    response_truncated = Column(Boolean, nullable=False, default=False)
+    status_code = Column(Integer, nullable=False, index=True)
+    model_version = Column(String(12), nullable=True)
     
     def save(self, db: Session):
         db.add(self)
         db.commit()
-        db.refresh(self)
\ No newline at end of file
+        db.refresh(self)
+
+    async def save_async(self, db: AsyncSession):
+        db.add(self)
+        await db.commit()
+        await db.refresh(self)
+
+    def get_response_text(self) -> str:
+        return decode_response(self.response, self.response_encoding)
@@ -0,0 +1,458 @@
+"""
+Trains the diamond price models from the local dataset, replacing the
+modelling notebook.
+
+The diamonds are read through `dataset_service` and cleaned with the rules of
+the notebook. A log-linear regression is trained as the baseline and the
+XGBoost hyperparameters are searched with Optuna, running the trials in
+parallel worker processes that share a SQLite study, so an interrupted run
+resumes from the trials already finished. The best XGBoost model is fitted on
+the whole training split, written to `MODEL_PATH` and registered as a new
+version in the model registry; `--promote` makes it the live version served
+by the API.
+
+Run in the project root:
+
+    python -m src.pipeline.train --n-trials 100 --workers 8 --promote
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import optuna
+import pandas as pd
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from xgboost.sklearn import XGBRegressor
+
+from src.config import app_config
+from src.services import dataset_service
+from src.schemas.model_registry_schema import ModelMetricsSchema
+from src.services.diamond_service import prepare_diamond_df_for_xgboost_model
+from src.services.model_registry_service import (
+    ModelRegistry,
+    compute_file_sha256,
+    create_feature_schema,
+    serialize_model,
+    write_file_atomically,
+)
+from src.utils.enums.diamonds_enums import DiamondColumnsEnum
+
+logger = logging.getLogger(__name__)
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+LINEAR_MODEL_DROPPED_COLUMNS = [
+    DiamondColumnsEnum.DEPTH.value,
+    DiamondColumnsEnum.TABLE.value,
+    DiamondColumnsEnum.Y.value,
+    DiamondColumnsEnum.Z.value,
+]
+LINEAR_MODEL_CATEGORICAL_COLUMNS = [
+    DiamondColumnsEnum.CUT.value,
+    DiamondColumnsEnum.COLOR.value,
+    DiamondColumnsEnum.CLARITY.value,
+]
+
+
+def prepare_diamonds_df_for_linear_model(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepares the dataframe for the linear model, dropping the price and the
+    columns the model doesn't use and one-hot encoding the categorical features.
+
+    Parameters
+    ----------
+    df: (DataFrame)
+        The cleaned diamonds dataframe.
+
+    Returns
+    -------
+    (DataFrame)
+        The features of the linear model.
+    """
+    df = df.drop(columns=[*LINEAR_MODEL_DROPPED_COLUMNS, DiamondColumnsEnum.PRICE.value])
+    return pd.get_dummies(df, columns=LINEAR_MODEL_CATEGORICAL_COLUMNS, drop_first=True)
+
+
+def evaluate(y_true: pd.Series, y_pred: np.ndarray) -> dict:
+    """
+    Returns the R2 score and the mean absolute error of the predictions.
+    """
+    return {
+        "r2": float(r2_score(y_true, y_pred)),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+    }
+
+
+def train_linear_model(df: pd.DataFrame) -> tuple[LinearRegression, dict]:
+    """
+    Trains a linear regression on the log of the price.
+
+    Parameters
+    ----------
+    df: (DataFrame)
+        The cleaned diamonds dataframe.
+
+    Returns
+    -------
+    (tuple[LinearRegression, dict])
+        The fitted model and its metrics on the test split.
+    """
+    x = prepare_diamonds_df_for_linear_model(df)
+    y = df[DiamondColumnsEnum.PRICE.value]
+    x_train, x_test, y_train, y_test = train_test_split(
+        x, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+
+    model = LinearRegression()
+    model.fit(x_train, np.log(y_train))
+
+    return model, evaluate(y_test, np.exp(model.predict(x_test)))
+
+
+def export_linear_model(model: LinearRegression) -> dict:
+    """
+    Exports the coefficients of the linear model keyed by feature name, in the
+    JSON format the API loads without sklearn.
+
+    Parameters
+    ----------
+    model: (LinearRegression)
+        The fitted linear model.
+
+    Returns
+    -------
+    (dict)
+    """
+    return {
+        "intercept": float(model.intercept_),
+        "coefficients": {
+            str(feature_name): float(coefficient)
+            for feature_name, coefficient in zip(model.feature_names_in_, model.coef_)
+        },
+    }
+
+
+def split_xgboost_data(df: pd.DataFrame) -> tuple:
+    """
+    Splits the cleaned diamonds into the train and test features and prices of
+    the XGBoost model.
+
+    Returns
+    -------
+    (tuple)
+        x_train, x_test, y_train, y_test
+    """
+    x = prepare_diamond_df_for_xgboost_model(df.copy())
+    y = df[DiamondColumnsEnum.PRICE.value]
+    return train_test_split(x, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
+def suggest_xgboost_params(trial: optuna.trial.Trial) -> dict:
+    """
+    Suggests the XGBoost hyperparameters of a trial, in the notebook's search space.
+    """
+    return {
+        "lambda": trial.suggest_float("lambda", 1e-8, 1.0, log=True),
+        "alpha": trial.suggest_float("alpha", 1e-8, 1.0, log=True),
+        "colsample_bytree": trial.suggest_categorical("colsample_bytree", [0.3, 0.4, 0.5, 0.7]),
+        "subsample": trial.suggest_categorical("subsample", [0.5, 0.6, 0.7, 0.8, 0.9, 1.0]),
+        "learning_rate": trial.suggest_float("learning_rate", 1e-8, 1.0, log=True),
+        "n_estimators": trial.suggest_int("n_estimators", 100, 1000),
+        "max_depth": trial.suggest_int("max_depth", 3, 9),
+        "min_child_weight": trial.suggest_int("min_child_weight", 1, 10),
+    }
+
+
+def create_study_storage(storage_url: str) -> optuna.storages.RDBStorage:
+    """
+    Creates the study storage. SQLite connections wait for the lock held by
+    another worker instead of failing right away.
+    """
+    engine_kwargs = None
+    if storage_url.startswith("sqlite"):
+        engine_kwargs = {"connect_args": {"timeout": 60}}
+
+    return optuna.storages.RDBStorage(storage_url, engine_kwargs=engine_kwargs)
+
+
+def run_optuna_worker(
+    storage_url: str,
+    study_name: str,
+    n_trials: int,
+    seed: int,
+    x_train: pd.DataFrame,
+    y_train: pd.Series,
+) -> None:
+    """
+    Runs trials of the study until it has `n_trials` finished or running trials.
+
+    Each worker trains single-threaded XGBoost models, so the parallelism comes
+    from running one worker per core.
+
+    Parameters
+    ----------
+    storage_url: (str)
+        The storage of the study.
+    study_name: (str)
+        The name of the study.
+    n_trials: (int)
+        The number of trials of the whole study.
+    seed: (int)
+        The seed of the worker's sampler, different for each worker.
+    x_train: (DataFrame)
+        The features used to train and validate the trials.
+    y_train: (Series)
+        The prices used to train and validate the trials.
+    """
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=create_study_storage(storage_url),
+        sampler=optuna.samplers.TPESampler(seed=seed),
+    )
+    x_fit, x_val, y_fit, y_val = train_test_split(
+        x_train, y_train, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+
+    def objective(trial: optuna.trial.Trial) -> float:
+        model = XGBRegressor(
+            **suggest_xgboost_params(trial),
+            enable_categorical=True,
+            random_state=RANDOM_STATE,
+            n_jobs=1,
+        )
+        model.fit(x_fit, y_fit)
+        return mean_absolute_error(y_val, model.predict(x_val))
+
+    study.optimize(
+        objective,
+        callbacks=[MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE, TrialState.RUNNING))],
+    )
+
+
+def search_xgboost_params(
+    x_train: pd.DataFrame,
+    y_train: pd.Series,
+    storage_url: str,
+    study_name: str,
+    n_trials: int,
+    workers: int,
+    seed: int = RANDOM_STATE,
+) -> optuna.Study:
+    """
+    Searches the XGBoost hyperparameters that minimize the mean absolute error
+    on a validation split of the training data, in parallel processes.
+
+    The trials are persisted in the study, so running the search again with
+    the same storage and study name only runs the missing trials. Trials left
+    running by an interrupted run are marked as failed and run again.
+
+    Parameters
+    ----------
+    x_train: (DataFrame)
+        The training features.
+    y_train: (Series)
+        The training prices.
+    storage_url: (str)
+        The SQLAlchemy URL of the study storage, e.g. `sqlite:///data/models/optuna.db`.
+    study_name: (str)
+        The name of the study.
+    n_trials: (int)
+        The number of finished trials the study must have.
+    workers: (int)
+        The number of worker processes.
+    seed: (int)
+        The base seed of the samplers.
+
+    Returns
+    -------
+    (optuna.Study)
+    """
+    storage = create_study_storage(storage_url)
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=storage,
+        direction="minimize",
+        load_if_exists=True,
+    )
+    for trial in study.get_trials(deepcopy=False, states=(TrialState.RUNNING,)):
+        storage.set_trial_state_values(trial._trial_id, state=TrialState.FAIL)
+
+    completed_trials = len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,)))
+    remaining_trials = n_trials - completed_trials
+    logger.info(f"Study {study_name} has {completed_trials} trials, running {max(remaining_trials, 0)}.")
+    if remaining_trials <= 0:
+        return study
+
+    workers = max(1, min(workers, remaining_trials))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor:
+        futures = [
+            executor.submit(
+                run_optuna_worker,
+                storage_url,
+                study_name,
+                n_trials,
+                seed + worker,
+                x_train,
+                y_train,
+            )
+            for worker in range(workers)
+        ]
+        for future in futures:
+            future.result()
+
+    return optuna.load_study(study_name=study_name, storage=storage)
+
+
+def train_xgboost_model(x_train: pd.DataFrame, y_train: pd.Series, params: dict) -> XGBRegressor:
+    """
+    Fits the XGBoost model with the received hyperparameters, using every core.
+    """
+    model = XGBRegressor(**params, enable_categorical=True, random_state=RANDOM_STATE, n_jobs=-1)
+    model.fit(x_train, y_train)
+    return model
+
+
+def write_model_atomically(model, path: str) -> None:
+    """
+    Writes the model to `path` atomically, so the API never loads a partially
+    written model. Paths ending in `.ubj` or `.json` get XGBoost's native
+    format and any other path a pickle.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith((".ubj", ".json")):
+        raw_model, _ = serialize_model(model, native_file_name=os.path.basename(path))
+        write_file_atomically(path, raw_model)
+    else:
+        write_file_atomically(path, pickle.dumps(model))
+
+
+def run_training(
+    data_path: str,
+    model_path: str,
+    linear_model_path: str,
+    metrics_path: str,
+    storage_url: str,
+    study_name: str,
+    n_trials: int,
+    workers: int,
+    registry: ModelRegistry | None = None,
+    promote: bool = False,
+) -> dict:
+    """
+    Runs the whole training: cleaning, the linear baseline, the hyperparameter
+    search and the final XGBoost model, and writes the models and their metrics.
+
+    With a registry, the XGBoost model is also registered as a new version,
+    which is made live when `promote` is True.
+
+    Returns
+    -------
+    (dict)
+        The metrics written to `metrics_path`.
+    """
+    start = time.perf_counter()
+    df = dataset_service.remove_invalid_diamonds(
+        dataset_service.create_dataframe_from_csv(data_path)
+    )
+
+    linear_model, linear_metrics = train_linear_model(df)
+    os.makedirs(os.path.dirname(linear_model_path) or ".", exist_ok=True)
+    write_file_atomically(
+        linear_model_path,
+        json.dumps(export_linear_model(linear_model), indent=2).encode("utf-8"),
+    )
+    logger.info(f"Log-linear model: {linear_metrics}")
+
+    x_train, x_test, y_train, y_test = split_xgboost_data(df)
+    search_start = time.perf_counter()
+    study = search_xgboost_params(
+        x_train, y_train, storage_url=storage_url, study_name=study_name,
+        n_trials=n_trials, workers=workers,
+    )
+    search_seconds = time.perf_counter() - search_start
+
+    model = train_xgboost_model(x_train, y_train, study.best_params)
+    xgboost_metrics = evaluate(y_test, model.predict(x_test))
+    write_model_atomically(model, model_path)
+    logger.info(f"XGBoost model: {xgboost_metrics}")
+
+    model_version = None
+    if registry is not None:
+        model_version = registry.register(
+            model,
+            metrics=ModelMetricsSchema(**xgboost_metrics),
+            data_sha256=compute_file_sha256(data_path),
+            feature_schema=create_feature_schema(x_train),
+        ).version
+        if promote:
+            registry.promote(model_version)
+
+    metrics = {
+        "rows": len(df),
+        "linear": linear_metrics,
+        "xgboost": xgboost_metrics,
+        "model_version": model_version,
+        "best_params": study.best_params,
+        "best_validation_mae": study.best_value,
+        "completed_trials": len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,))),
+        "workers": workers,
+        "search_seconds": search_seconds,
+        "total_seconds": time.perf_counter() - start,
+    }
+    os.makedirs(os.path.dirname(metrics_path) or ".", exist_ok=True)
+    with open(metrics_path, "w") as f:
+        json.dump(metrics, f, indent=2)
+
+    return metrics
+
+
+def main() -> None:
+    models_dir = os.path.dirname(app_config.MODEL_PATH)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-path", default=app_config.DATASET_PATH)
+    parser.add_argument("--model-path", default=app_config.MODEL_PATH)
+    parser.add_argument("--linear-model-path", default=app_config.LINEAR_MODEL_PATH)
+    parser.add_argument("--metrics-path", default=os.path.join(models_dir, "metrics.json"))
+    parser.add_argument(
+        "--storage", default=f"sqlite:///{os.path.join(models_dir, 'optuna_study.db')}"
+    )
+    parser.add_argument("--study-name", default="diamonds-xgboost")
+    parser.add_argument("--n-trials", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--registry-path", default=app_config.MODEL_REGISTRY_PATH)
+    parser.add_argument("--model-name", default=app_config.MODEL_NAME)
+    parser.add_argument(
+        "--promote", action="store_true", help="Make the trained model the live version."
+    )
+    args = parser.parse_args()
+
+    os.makedirs(models_dir or ".", exist_ok=True)
+    metrics = run_training(
+        data_path=args.data_path,
+        model_path=args.model_path,
+        linear_model_path=args.linear_model_path,
+        metrics_path=args.metrics_path,
+        storage_url=args.storage,
+        study_name=args.study_name,
+        n_trials=args.n_trials,
+        workers=args.workers,
+        registry=ModelRegistry(root=args.registry_path, name=args.model_name),
+        promote=args.promote,
+    )
+    print(json.dumps(metrics, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
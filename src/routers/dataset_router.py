@@ -0,0 +1,63 @@
+import os
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from src.config import app_config
+from src.config.database_config import get_db
+from src.schemas.api_requests_schema import ApiRequestsSchema
+from src.schemas.diamond_schema import DatasetIngestionSchema
+from src.services import dataset_service
+from src.services.api_requests_service import log_api_request
+from src.utils.helpers import write_request_body_to_temporary_file
+
+router = APIRouter(prefix="/dataset")
+
+
+@router.post("/ingest", response_model=DatasetIngestionSchema)
+async def post_ingest_dataset(
+    request: Request,
+    chunk_size: int = Query(default=app_config.INGESTION_CHUNK_SIZE, gt=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Appends the new diamonds of the CSV sent as the request body to the dataset.
+
+    The body is streamed to a temporary file and read `chunk_size` rows at a
+    time. Rows with an unknown cut, color or clarity, a non-numeric value, a
+    zero dimension or a non-positive price are skipped as invalid, and rows
+    already in the dataset as duplicates. The search index of every worker is
+    updated with the appended diamonds on its next search instead of being rebuilt.
+    """
+    source_path = await write_request_body_to_temporary_file(request, suffix=".csv")
+
+    try:
+        report = await run_in_threadpool(
+            dataset_service.ingest_csv,
+            source_path=source_path,
+            csv_path=app_config.DATASET_PATH,
+            chunk_size=chunk_size,
+        )
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/dataset/ingest",
+            response=report.model_dump_json(),
+            status_code=200,
+            created_at=datetime.now(),
+        )
+        await run_in_threadpool(log_api_request, request_data=request_data, db=db)
+        return report
+    except (ValueError, FileNotFoundError) as e:
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/dataset/ingest",
+            response=str(e),
+            status_code=400,
+            created_at=datetime.now(),
+        )
+        await run_in_threadpool(log_api_request, request_data=request_data, db=db)
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(source_path)
@@ -0,0 +1,335 @@
+import json
+import os
+from datetime import datetime
+import pickle
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+
+from src.config import app_config
+from src.config.database_config import get_async_db
+from src.schemas.api_requests_schema import ApiRequestsSchema
+from src.schemas.diamond_schema import (
+    DiamondBatchPricePredictionRequestSchema,
+    DiamondBatchPricePredictionSchema,
+    DiamondFeaturesForPredictionSchema,
+    DiamondFeaturesForSearchSchema,
+    DiamondFeaturesForSimilaritySearchSchema,
+    DiamondPriceModelSchema,
+)
+from src.services import diamond_service
+from src.services.api_requests_service import log_api_request_async
+from src.services.model_service import run_in_inference_executor
+from src.utils.enums.diamonds_enums import DiamondPriceModelEnum
+from src.utils.enums.search_enums import SearchResponseFormatEnum
+from src.utils.helpers import write_request_body_to_temporary_file
+
+router = APIRouter(prefix="/diamond")
+
+
+@router.get("/models", response_model=list[DiamondPriceModelSchema])
+async def get_price_models():
+    """
+    Returns the models that can predict prices, whether they are available and
+    the version each one serves.
+    """
+    return await run_in_inference_executor(diamond_service.list_price_models)
+
+
+@router.post("/predict-price")
+async def post_predicted_diamond_price(
+    body: DiamondFeaturesForPredictionSchema,
+    response: Response,
+    model: DiamondPriceModelEnum = DiamondPriceModelEnum.xgboost,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Predicts the price of the diamond.
+
+    The version of the model that served the prediction is returned in the
+    `X-Model-Version` header.
+
+    Model options: "xgboost" (default), the most accurate, or "linear", much
+    faster and less accurate. They are described at /diamond/models.
+
+    Cut options: "Fair","Good","Very Good","Ideal","Premium"
+
+    Color options: "D","E","F","G","H","I","J"
+
+    Clarity options: "IF","VVS1","VVS2","VS1","VS2","SI1","SI2","I1"
+
+    Returns 503 if the price isn't predicted within PREDICTION_BATCH_TIMEOUT_SECONDS.
+    """
+    try:
+        if model == DiamondPriceModelEnum.linear:
+            # The linear model takes microseconds, less than handing it to the executor.
+            prediction = diamond_service.predict_diamond_price(body, model)
+        else:
+            prediction = await run_in_inference_executor(
+                diamond_service.predict_diamond_price, body, model
+            )
+        response.headers["X-Model-Version"] = prediction.model_version
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/predict-price",
+            response=prediction.message,
+            status_code=200,
+            created_at=datetime.now(),
+            model_version=prediction.model_version,
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        return prediction.message
+    except TimeoutError:
+        detail = "The price was not predicted in time, try again later."
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/predict-price",
+            response=detail,
+            status_code=503,
+            created_at=datetime.now(),
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        raise HTTPException(status_code=503, detail=detail)
+    except (
+        ValueError,
+        TypeError,
+        KeyError,
+        pickle.UnpicklingError,
+        FileNotFoundError,
+    ) as e:
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/predict-price",
+            response=str(e),
+            status_code=400,
+            created_at=datetime.now(),
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        raise HTTPException(status_code=400, detail=(str(e)))
+
+
+@router.post("/predict-price/batch", response_model=DiamondBatchPricePredictionSchema)
+async def post_predicted_diamonds_prices_in_batch(
+    body: DiamondBatchPricePredictionRequestSchema,
+    response: Response,
+    model: DiamondPriceModelEnum = DiamondPriceModelEnum.xgboost,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Predicts the prices of a list of diamonds in a single model call.
+
+    Each item has the same fields as the body of /diamond/predict-price. Items that
+    fail validation get an `error` instead of a `price`, without failing the batch.
+    Batches larger than BATCH_PREDICTION_MAX_SIZE are rejected with a 422.
+
+    Model options: "xgboost" (default) or "linear", as in /diamond/predict-price.
+
+    Cut options: "Fair","Good","Very Good","Ideal","Premium"
+
+    Color options: "D","E","F","G","H","I","J"
+
+    Clarity options: "IF","VVS1","VVS2","VS1","VS2","SI1","SI2","I1"
+    """
+    try:
+        prediction = await run_in_inference_executor(
+            diamond_service.predict_diamonds_prices_in_batch, body, model
+        )
+        response.headers["X-Model-Version"] = prediction.model_version
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/predict-price/batch",
+            response=prediction.model_dump_json(),
+            status_code=200,
+            created_at=datetime.now(),
+            model_version=prediction.model_version,
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        return prediction
+    except (
+        ValueError,
+        TypeError,
+        KeyError,
+        pickle.UnpicklingError,
+        FileNotFoundError,
+    ) as e:
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/predict-price/batch",
+            response=str(e),
+            status_code=400,
+            created_at=datetime.now(),
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        raise HTTPException(status_code=400, detail=(str(e)))
+
+
+@router.post("/predict-price/csv")
+async def post_predicted_diamonds_prices_from_csv(
+    request: Request,
+    model: DiamondPriceModelEnum = DiamondPriceModelEnum.xgboost,
+    chunk_size: int = Query(default=app_config.CSV_PREDICTION_CHUNK_SIZE, gt=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Prices the diamonds of the CSV sent as the request body and streams the
+    priced CSV back as it's produced.
+
+    The CSV needs the columns of the body of /diamond/predict-price. It's read
+    and predicted `chunk_size` rows at a time, and the response has the same
+    rows and columns followed by `predicted_price` and `error`: rows that fail
+    validation get an error instead of a price, without failing the file.
+
+    Model options: "xgboost" (default) or "linear", as in /diamond/predict-price.
+
+    Cut options: "Fair","Good","Very Good","Ideal","Premium"
+
+    Color options: "D","E","F","G","H","I","J"
+
+    Clarity options: "IF","VVS1","VVS2","VS1","VS2","SI1","SI2","I1"
+    """
+    source_path = await write_request_body_to_temporary_file(request, suffix=".csv")
+    try:
+        model_version, priced_csv = await run_in_inference_executor(
+            diamond_service.predict_diamonds_prices_from_csv, source_path, model, chunk_size
+        )
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/predict-price/csv",
+            response="Streamed the priced CSV.",
+            status_code=200,
+            created_at=datetime.now(),
+            model_version=model_version,
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        return StreamingResponse(
+            priced_csv,
+            media_type="text/csv",
+            headers={"X-Model-Version": model_version},
+            background=BackgroundTask(os.remove, source_path),
+        )
+    except (
+        ValueError,
+        TypeError,
+        KeyError,
+        pickle.UnpicklingError,
+        FileNotFoundError,
+    ) as e:
+        os.remove(source_path)
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/predict-price/csv",
+            response=str(e),
+            status_code=400,
+            created_at=datetime.now(),
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        raise HTTPException(status_code=400, detail=(str(e)))
+
+
+@router.post("/search")
+async def post_search_diamond_by_features_and_similar_weight(
+    body: DiamondFeaturesForSearchSchema,
+    format: SearchResponseFormatEnum = SearchResponseFormatEnum.json,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Returns the n diamonds with the same features and the most similar weight.
+
+    Cut options: "Fair","Good","Very Good","Ideal","Premium"
+
+    Color options: "D","E","F","G","H","I","J"
+
+    Clarity options: "IF","VVS1","VVS2","VS1","VS2","SI1","SI2","I1"
+
+    Format options:
+    "json" returns a list of diamonds,
+    "ndjson" streams one diamond per line,
+    "columnar" streams a JSON object with one list per column.
+    """
+    try:
+        if format == SearchResponseFormatEnum.json:
+            response = await run_in_inference_executor(
+                diamond_service.search_diamond_by_features_and_similar_weight, body
+            )
+            logged_response = json.dumps(response)
+        else:
+            index, rows = await run_in_inference_executor(
+                diamond_service.find_diamonds_by_features_and_similar_weight, body
+            )
+            if format == SearchResponseFormatEnum.ndjson:
+                response = StreamingResponse(
+                    index.iter_ndjson(rows, app_config.SEARCH_STREAM_CHUNK_SIZE),
+                    media_type="application/x-ndjson",
+                )
+            else:
+                response = StreamingResponse(
+                    index.iter_columnar_json(rows, app_config.SEARCH_STREAM_CHUNK_SIZE),
+                    media_type="application/json",
+                )
+            logged_response = f"Streamed {len(rows)} diamonds as {format.value}."
+
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/search",
+            response=logged_response,
+            status_code=200,
+            created_at=datetime.now(),
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        return response
+    except ValueError as e:
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/search",
+            response=str(e),
+            status_code=400,
+            created_at=datetime.now(),
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        raise HTTPException(status_code=400, detail=(str(e)))
+
+
+@router.post("/search/similar")
+async def post_search_similar_diamonds(
+    body: DiamondFeaturesForSimilaritySearchSchema,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Returns the n diamonds with the same cut, color and clarity that are the
+    most similar in carat, depth, table and dimensions (x, y, z), nearest first,
+    each with its distance to the received diamond.
+
+    The distance is Euclidean, with the difference of each numeric feature
+    divided by its standard deviation in the dataset and its square multiplied
+    by the feature's weight in "weights", 1 by default. A weight of 0 leaves
+    the feature out of the distance.
+
+    Cut options: "Fair","Good","Very Good","Ideal","Premium"
+
+    Color options: "D","E","F","G","H","I","J"
+
+    Clarity options: "IF","VVS1","VVS2","VS1","VS2","SI1","SI2","I1"
+    """
+    try:
+        response = await run_in_inference_executor(diamond_service.search_similar_diamonds, body)
+
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/search/similar",
+            response=json.dumps(response),
+            status_code=200,
+            created_at=datetime.now(),
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        return response
+    except ValueError as e:
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/diamond/search/similar",
+            response=str(e),
+            status_code=400,
+            created_at=datetime.now(),
+        )
+        await log_api_request_async(request_data=request_data, db=db)
+        raise HTTPException(status_code=400, detail=(str(e)))
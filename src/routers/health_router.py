@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Response, status
+
+from src.schemas.startup_schema import StartupReportSchema
+from src.services import startup_service
+from src.services.startup_service import startup_tracker
+
+router = APIRouter()
+
+
+@router.get(
+    "/ready",
+    response_model=StartupReportSchema,
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": StartupReportSchema}},
+)
+def get_readiness(response: Response):
+    """
+    Readiness probe: returns 200 once the worker that served the request
+    loaded the models and the search index, and 503 before that, while it
+    shuts down and while loading the XGBoost model or the dataset fails, with
+    the time spent in each startup stage. The failed loads are retried on
+    each call.
+    """
+    if startup_tracker.is_warmed_up and not startup_tracker.is_ready:
+        startup_service.retry_failed_stages(startup_tracker)
+
+    report = startup_tracker.get_report()
+    if not report.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return report
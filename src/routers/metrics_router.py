@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+
+from src.services import metrics_service
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Returns the request counters and the stage timings in the Prometheus text format.
+    """
+    content, media_type = metrics_service.generate_metrics()
+    return Response(content=content, media_type=media_type)
@@ -0,0 +1,91 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from src.config.database_config import get_db
+from src.schemas.api_requests_schema import ApiRequestsSchema
+from src.schemas.model_registry_schema import ModelVersionSchema, ServedModelSchema
+from src.services import model_service
+from src.services.api_requests_service import log_api_request
+from src.services.model_registry_service import model_registry
+
+router = APIRouter(prefix="/models")
+
+
+@router.get("/versions", response_model=list[ModelVersionSchema])
+def get_model_versions():
+    """
+    Returns the registered model versions with their metrics, training data hash
+    and feature schema, from the oldest to the newest.
+    """
+    return model_registry.list_versions()
+
+
+@router.get("/live", response_model=ServedModelSchema)
+def get_live_model():
+    """
+    Returns the live model version and the versions loaded by the worker that
+    served the request.
+    """
+    return model_service.get_served_model_info()
+
+
+@router.post("/versions/{version}/promote", response_model=ServedModelSchema)
+def post_promote_model_version(version: str, db: Session = Depends(get_db)):
+    """
+    Makes a registered model version live. The worker that serves the request
+    swaps it in right away and the other workers on their next artifact check.
+    """
+    try:
+        served_model = model_service.promote_model_version(version)
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path=f"/models/versions/{version}/promote",
+            response=served_model.model_dump_json(),
+            status_code=200,
+            created_at=datetime.now(),
+            model_version=served_model.served_version,
+        )
+        log_api_request(request_data=request_data, db=db)
+        return served_model
+    except (KeyError, ValueError) as e:
+        status_code = 404 if isinstance(e, KeyError) else 400
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path=f"/models/versions/{version}/promote",
+            response=str(e.args[0]),
+            status_code=status_code,
+            created_at=datetime.now(),
+        )
+        log_api_request(request_data=request_data, db=db)
+        raise HTTPException(status_code=status_code, detail=(str(e.args[0])))
+
+
+@router.post("/rollback", response_model=ServedModelSchema)
+def post_rollback_model_version(db: Session = Depends(get_db)):
+    """
+    Makes the previous live model version live again. Workers that still have
+    it loaded swap it in without loading it again.
+    """
+    try:
+        served_model = model_service.rollback_model_version()
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/models/rollback",
+            response=served_model.model_dump_json(),
+            status_code=200,
+            created_at=datetime.now(),
+            model_version=served_model.served_version,
+        )
+        log_api_request(request_data=request_data, db=db)
+        return served_model
+    except ValueError as e:
+        request_data = ApiRequestsSchema(
+            request_type="post",
+            path="/models/rollback",
+            response=str(e),
+            status_code=400,
+            created_at=datetime.now(),
+        )
+        log_api_request(request_data=request_data, db=db)
+        raise HTTPException(status_code=400, detail=(str(e)))
@@ -0,0 +1,53 @@
+from fastapi import APIRouter
+
+from src.config.database_config import get_async_engine, get_engine
+from src.config.database_pool import get_pool_stats
+from src.schemas.api_requests_schema import ApiRequestsLogWriterStatsSchema
+from src.schemas.database_pool_schema import DatabasePoolStatsSchema
+from src.schemas.diamond_schema import (
+    PredictionBatcherStatsSchema,
+    PredictionCacheStatsSchema,
+)
+from src.services.api_requests_service import api_requests_log_writer
+from src.services.prediction_batching_service import prediction_batcher
+from src.services.prediction_cache_service import prediction_cache
+
+router = APIRouter(prefix="/observability")
+
+
+@router.get("/audit-log-writer", response_model=ApiRequestsLogWriterStatsSchema)
+def get_audit_log_writer_stats():
+    """
+    Returns the counters of the background writer of the API requests log.
+    """
+    return api_requests_log_writer.get_stats()
+
+
+@router.get("/prediction-cache", response_model=PredictionCacheStatsSchema)
+def get_prediction_cache_stats():
+    """
+    Returns the counters of the cache of predicted prices.
+    """
+    return prediction_cache.get_stats()
+
+
+@router.get("/prediction-batcher", response_model=PredictionBatcherStatsSchema)
+def get_prediction_batcher_stats():
+    """
+    Returns the counters of the batcher of concurrent predictions and its
+    current wait time.
+    """
+    return prediction_batcher.get_stats()
+
+
+@router.get("/database-pool", response_model=dict[str, DatabasePoolStatsSchema])
+def get_database_pool_stats():
+    """
+    Returns the live statistics of the database connection pools of the worker
+    that served the request: "sync" for the blocking sessions and "async" for
+    the async ones.
+    """
+    return {
+        "sync": get_pool_stats(get_engine().pool),
+        "async": get_pool_stats(get_async_engine().sync_engine.pool),
+    }
@@ -7,4 +7,15 @@ class ApiRequestsSchema(BaseModel):
     path: str
     response: str
     status_code: int
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+    model_version: str | None = None
+
+class ApiRequestsLogWriterStatsSchema(BaseModel):
+    running: bool
+    queue_depth: int
+    enqueued_records: int
+    written_records: int
+    dropped_records: int
+    flushes: int
+    flush_latency_seconds_total: float
+    flush_latency_seconds_max: float
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+
+
+class DatabasePoolWaitBucketSchema(BaseModel):
+    le_seconds: float | None
+    count: int
+
+
+class DatabasePoolStatsSchema(BaseModel):
+    pid: int
+    pool_size: int
+    max_overflow: int
+    timeout_seconds: float
+    recycle_seconds: int
+    pre_ping: bool
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    checkout_timeouts: int
+    checkout_wait_seconds_total: float
+    checkout_wait_seconds_max: float
+    checkout_wait_seconds_buckets: list[DatabasePoolWaitBucketSchema]
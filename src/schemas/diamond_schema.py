@@ -1,5 +1,13 @@
-from pydantic import BaseModel
-from src.utils.enums.diamonds_enums import DiamondClarityEnum, DiamondColorEnum, DiamondCutEnum
+from typing import Annotated
+
+from pydantic import BaseModel, BeforeValidator, Field
+from src.config import app_config
+from src.utils.enums.diamonds_enums import (
+    DiamondClarityEnum,
+    DiamondColorEnum,
+    DiamondCutEnum,
+    DiamondPriceModelEnum,
+)
 
 class BaseDiamondSchema(BaseModel):
     carat: float
@@ -15,4 +23,88 @@ class DiamondFeaturesForPredictionSchema(BaseDiamondSchema):
     z: float
 
 class DiamondFeaturesForSearchSchema(BaseDiamondSchema):
-    pass
\ No newline at end of file
+    n: int = Field(default=10, gt=0, le=app_config.SEARCH_MAX_RESULTS)
+
+class DiamondSimilarityWeightsSchema(BaseModel):
+    carat: float = Field(default=1.0, ge=0)
+    depth: float = Field(default=1.0, ge=0)
+    table: float = Field(default=1.0, ge=0)
+    x: float = Field(default=1.0, ge=0)
+    y: float = Field(default=1.0, ge=0)
+    z: float = Field(default=1.0, ge=0)
+
+class DiamondFeaturesForSimilaritySearchSchema(DiamondFeaturesForPredictionSchema):
+    n: int = Field(default=10, gt=0, le=app_config.SEARCH_MAX_RESULTS)
+    weights: DiamondSimilarityWeightsSchema = DiamondSimilarityWeightsSchema()
+
+def validate_batch_size(value):
+    """
+    Rejects batches larger than BATCH_PREDICTION_MAX_SIZE before their items are validated.
+    """
+    if isinstance(value, list) and len(value) > app_config.BATCH_PREDICTION_MAX_SIZE:
+        raise ValueError(
+            f"The batch must have at most {app_config.BATCH_PREDICTION_MAX_SIZE} diamonds."
+        )
+    return value
+
+# Items that aren't valid diamonds are kept as dicts, so the batch reports
+# their validation error instead of failing as a whole.
+DiamondBatchPricePredictionRequestSchema = Annotated[
+    list[DiamondFeaturesForPredictionSchema | dict],
+    BeforeValidator(validate_batch_size),
+]
+
+class DiamondPricePredictionSchema(BaseModel):
+    message: str
+    price: float
+    model_version: str
+
+
+class DiamondBatchPricePredictionRowSchema(BaseModel):
+    index: int
+    price: float | None = None
+    error: str | None = None
+
+
+class DiamondBatchPricePredictionSchema(BaseModel):
+    model_version: str
+    predictions: list[DiamondBatchPricePredictionRowSchema]
+
+
+class DiamondPriceModelSchema(BaseModel):
+    name: DiamondPriceModelEnum
+    description: str
+    default: bool
+    available: bool
+    version: str | None = None
+    path: str | None = None
+
+
+class PredictionCacheStatsSchema(BaseModel):
+    model_version: str | None
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+
+
+class PredictionBatcherStatsSchema(BaseModel):
+    running: bool
+    max_batch_size: int
+    max_wait_ms: float
+    current_wait_ms: float
+    batches: int
+    predictions: int
+    mean_batch_size: float
+    largest_batch_size: int
+
+
+class DatasetIngestionSchema(BaseModel):
+    rows_read: int
+    invalid_rows: int
+    duplicate_rows: int
+    appended_rows: int
+    dataset_rows: int
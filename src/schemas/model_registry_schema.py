@@ -0,0 +1,39 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ModelMetricsSchema(BaseModel):
+    r2: float
+    mae: float
+
+
+class ModelFeatureSchema(BaseModel):
+    name: str
+    dtype: str
+    categories: list[str] | None = None
+
+
+class ModelVersionSchema(BaseModel):
+    name: str
+    version: str
+    created_at: datetime
+    artifact: str
+    metrics: ModelMetricsSchema
+    data_sha256: str
+    feature_schema: list[ModelFeatureSchema]
+
+
+class ModelLivePointerSchema(BaseModel):
+    version: str
+    previous_version: str | None = None
+    promoted_at: datetime
+
+
+class ServedModelSchema(BaseModel):
+    live: ModelLivePointerSchema | None
+    served_version: str | None
+    served_path: str | None
+    served_format: str | None
+    served_load_seconds: float | None
+    served_first_inference_seconds: float | None
+    warm_previous_version: str | None
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class StartupStageSchema(BaseModel):
+    name: str
+    seconds: float
+    error: str | None = None
+
+
+class StartupReportSchema(BaseModel):
+    pid: int
+    ready: bool
+    total_seconds: float
+    stages: list[StartupStageSchema]
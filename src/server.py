@@ -0,0 +1,211 @@
+"""
+Pre-fork server: loads the model and the diamonds dataset once, shares the
+dataset through shared memory and forks the API workers, which inherit both.
+
+Run in the project root:
+
+    python -m src.server --port 8080 --workers 4
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+
+import uvicorn
+from prometheus_client import multiprocess
+
+from src.config import app_config
+from src.main import app
+from src.services import dataset_service, search_index_service, startup_service
+from src.services.search_index_service import DiamondSearchIndex
+from src.services.shared_memory_service import SharedSearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+def create_listening_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """
+    Binds the socket every worker accepts connections from.
+
+    Parameters
+    ----------
+    host: (str)
+        The address to bind.
+    port: (int)
+        The port to bind.
+    backlog: (int)
+        The maximum number of pending connections.
+
+    Returns
+    -------
+    (socket.socket)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+
+    return sock
+
+
+def load_shared_search_index(path: str) -> SharedSearchIndex:
+    """
+    Reads the dataset, indexes it and moves the index to shared memory. The
+    dataframe and the private copy of the index are released afterwards.
+
+    Parameters
+    ----------
+    path: (str)
+        The dataset CSV path.
+
+    Returns
+    -------
+    (SharedSearchIndex)
+    """
+    df = dataset_service.load_dataset(path)
+    shared_index = SharedSearchIndex(DiamondSearchIndex.from_dataframe(df))
+    logger.info(
+        f"Shared search index with {len(df)} diamonds from {path} "
+        f"({shared_index.nbytes / 1024 / 1024:.1f} MiB)."
+    )
+
+    return shared_index
+
+
+def clear_metrics_dir(path: str | None) -> None:
+    """
+    Removes the metrics files of the previous run from the directory where the
+    workers write their Prometheus metrics, if it's configured.
+
+    Parameters
+    ----------
+    path: (str | None)
+        The `PROMETHEUS_MULTIPROC_DIR` directory.
+    """
+    if not path:
+        return
+
+    os.makedirs(path, exist_ok=True)
+    for file_name in os.listdir(path):
+        if file_name.endswith(".db"):
+            os.remove(os.path.join(path, file_name))
+
+
+def run_worker(sock: socket.socket, shared_index: SharedSearchIndex) -> None:
+    """
+    Serves the API in a forked worker, with the search index shared by the server.
+
+    Parameters
+    ----------
+    sock: (socket.socket)
+        The listening socket.
+    shared_index: (SharedSearchIndex)
+        The search index shared by the server.
+    """
+    # Signals are sent to the server, which forwards them once to every worker.
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    search_index_service.search_index_cache.pin(shared_index.index)
+    server = uvicorn.Server(uvicorn.Config(app, log_config=None))
+    server.run(sockets=[sock])
+
+
+def fork_worker(sock: socket.socket, shared_index: SharedSearchIndex) -> int:
+    """
+    Forks a worker and returns its pid.
+    """
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            run_worker(sock, shared_index)
+        except BaseException as e:
+            logger.error(f"Worker {os.getpid()} failed. [Details]: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    logger.info(f"Started worker {pid}.")
+    return pid
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    """
+    Loads the model and the dataset, forks the workers and restarts the ones
+    that exit, until the server receives SIGINT or SIGTERM.
+
+    Parameters
+    ----------
+    host: (str)
+        The address to bind.
+    port: (int)
+        The port to bind.
+    workers: (int)
+        The number of worker processes.
+    """
+    sock = create_listening_socket(host, port)
+    clear_metrics_dir(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+    # The workers inherit the stages recorded here and only connect to the database.
+    startup_service.load_models(startup_service.startup_tracker)
+    with startup_service.startup_tracker.stage("data_load"):
+        shared_index = load_shared_search_index(app_config.DATASET_PATH)
+
+    # Objects created so far are never collected, so the collector doesn't
+    # write to their pages and the workers keep sharing them.
+    gc.collect()
+    gc.freeze()
+
+    worker_pids: set[int] = set()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info(f"Stopping {len(worker_pids)} workers.")
+        for pid in worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        for _ in range(workers):
+            worker_pids.add(fork_worker(sock, shared_index))
+
+        while worker_pids:
+            pid, status = os.wait()
+            worker_pids.discard(pid)
+            if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+                multiprocess.mark_process_dead(pid)
+            if not stopping:
+                logger.warning(
+                    f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}, restarting it."
+                )
+                worker_pids.add(fork_worker(sock, shared_index))
+    finally:
+        shared_index.close()
+        sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=app_config.SERVER_WORKERS)
+    args = parser.parse_args()
+
+    serve(host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
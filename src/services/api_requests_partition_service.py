@@ -0,0 +1,243 @@
+import logging
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = "api_requests"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+PARTITION_NAME_PATTERN = re.compile(rf"^{PARTITIONED_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def add_months(month_start: date, months: int) -> date:
+    """
+    Returns the first day of the month `months` months after `month_start`.
+
+    Parameters
+    ----------
+    month_start: (date)
+        Any day of the starting month.
+    months: (int)
+        The number of months to add, may be negative.
+
+    Returns
+    -------
+    (date)
+    """
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_partition_name(month_start: date) -> str:
+    """
+    Returns the name of the partition of the `api_requests` table holding the
+    requests of the month, e.g. `api_requests_y2024m06`.
+
+    Parameters
+    ----------
+    month_start: (date)
+        Any day of the month.
+
+    Returns
+    -------
+    (str)
+    """
+    return f"{PARTITIONED_TABLE}_y{month_start.year:04d}m{month_start.month:02d}"
+
+
+def get_partition_month(partition_name: str) -> date | None:
+    """
+    Returns the month of a monthly partition, or None if the name isn't one of
+    a monthly partition (e.g. the default partition).
+
+    Parameters
+    ----------
+    partition_name: (str)
+        The name of the partition.
+
+    Returns
+    -------
+    (date | None)
+    """
+    match = PARTITION_NAME_PATTERN.match(partition_name)
+    if match is None:
+        return None
+
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def list_partitions(db: Session) -> list[str]:
+    """
+    Returns the names of the partitions of the `api_requests` table.
+
+    Parameters
+    ----------
+    db: (Session)
+        An SQLAlchemy Session object connected to PostgreSQL.
+
+    Returns
+    -------
+    (list[str])
+    """
+    return list(
+        db.scalars(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+                "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+                "WHERE parent.relname = :table_name ORDER BY child.relname"
+            ),
+            {"table_name": PARTITIONED_TABLE},
+        )
+    )
+
+
+def create_monthly_partition(db: Session, month_start: date, has_default_partition: bool) -> None:
+    """
+    Creates the partition of a month. Requests of the month that were stored in
+    the default partition while it was missing, e.g. when the retention job
+    didn't run, are moved to it: PostgreSQL refuses to create a partition for
+    a range the default partition holds rows of, so the default partition is
+    detached meanwhile and attached again afterwards.
+
+    Parameters
+    ----------
+    db: (Session)
+        An SQLAlchemy Session object connected to PostgreSQL.
+    month_start: (date)
+        Any day of the month.
+    has_default_partition: (bool)
+        Whether the table has a default partition.
+    """
+    month_start = month_start.replace(day=1)
+    partition_name = get_partition_name(month_start)
+    range_start = f"{month_start.isoformat()} 00:00:00+00"
+    range_stop = f"{add_months(month_start, 1).isoformat()} 00:00:00+00"
+    create_partition = text(
+        f"CREATE TABLE {partition_name} PARTITION OF {PARTITIONED_TABLE} "
+        f"FOR VALUES FROM ('{range_start}') TO ('{range_stop}')"
+    )
+    in_range = f"created_at >= '{range_start}' AND created_at < '{range_stop}'"
+
+    if not has_default_partition or not db.scalar(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})")
+    ):
+        db.execute(create_partition)
+        return
+
+    logger.warning(
+        f"Moving the requests of {month_start:%Y-%m} from {DEFAULT_PARTITION} to {partition_name}."
+    )
+    db.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    db.execute(create_partition)
+    db.execute(text(f"INSERT INTO {partition_name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    db.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+def create_monthly_partitions(db: Session, first_month: date, months: int) -> list[str]:
+    """
+    Creates the missing monthly partitions from `first_month` on, in UTC, in
+    a single transaction.
+
+    Parameters
+    ----------
+    db: (Session)
+        An SQLAlchemy Session object connected to PostgreSQL.
+    first_month: (date)
+        Any day of the first month.
+    months: (int)
+        The number of months to create partitions for.
+
+    Returns
+    -------
+    (list[str])
+        The names of the partitions that were created.
+    """
+    existing_partitions = set(list_partitions(db))
+    created_partitions = []
+    for offset in range(months):
+        month_start = add_months(first_month, offset)
+        partition_name = get_partition_name(month_start)
+        if partition_name in existing_partitions:
+            continue
+
+        create_monthly_partition(
+            db, month_start, has_default_partition=DEFAULT_PARTITION in existing_partitions
+        )
+        created_partitions.append(partition_name)
+
+    db.commit()
+    return created_partitions
+
+
+def drop_partitions_before(db: Session, cutoff_month: date) -> list[str]:
+    """
+    Drops the monthly partitions of the months before `cutoff_month`.
+
+    Each partition is detached and dropped as a whole table, which takes the
+    same time however many requests it holds and leaves no dead rows behind.
+
+    Parameters
+    ----------
+    db: (Session)
+        An SQLAlchemy Session object connected to PostgreSQL.
+    cutoff_month: (date)
+        Any day of the oldest month to keep.
+
+    Returns
+    -------
+    (list[str])
+        The names of the partitions that were dropped.
+    """
+    cutoff_month = cutoff_month.replace(day=1)
+    dropped_partitions = []
+    for partition_name in list_partitions(db):
+        partition_month = get_partition_month(partition_name)
+        if partition_month is None or partition_month >= cutoff_month:
+            continue
+
+        db.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {partition_name}"))
+        db.execute(text(f"DROP TABLE {partition_name}"))
+        dropped_partitions.append(partition_name)
+
+    db.commit()
+    return dropped_partitions
+
+
+def apply_retention(
+    db: Session, today: date, retention_months: int, partitions_ahead_months: int
+) -> tuple[list[str], list[str]]:
+    """
+    Creates the partitions of the current and the next `partitions_ahead_months`
+    months and drops the ones older than `retention_months` months.
+
+    Parameters
+    ----------
+    db: (Session)
+        An SQLAlchemy Session object connected to PostgreSQL.
+    today: (date)
+        The current date, in UTC.
+    retention_months: (int)
+        The number of months kept, including the current one.
+    partitions_ahead_months: (int)
+        The number of future months that must already have a partition.
+
+    Returns
+    -------
+    (tuple[list[str], list[str]])
+        The names of the created and of the dropped partitions.
+    """
+    created_partitions = create_monthly_partitions(
+        db, first_month=today, months=partitions_ahead_months + 1
+    )
+    dropped_partitions = drop_partitions_before(
+        db, cutoff_month=add_months(today, 1 - retention_months)
+    )
+    logger.info(
+        f"api_requests partitions created: {created_partitions}, dropped: {dropped_partitions}."
+    )
+    return created_partitions, dropped_partitions
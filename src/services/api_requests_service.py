@@ -1,7 +1,54 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from src.config import app_config
+from src.config.database_config import SessionLocal
 from src.models.api_request_model import APIrequestModel
-from src.schemas.api_requests_schema import ApiRequestsSchema
+from src.schemas.api_requests_schema import (
+    ApiRequestsLogWriterStatsSchema,
+    ApiRequestsSchema,
+)
+from src.services import metrics_service
+from src.utils.response_codec import encode_response
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def create_api_request_record(request_data: dict) -> dict:
+    """
+    Creates the columns of an `api_requests` row, with the response compressed
+    and capped to `AUDIT_LOG_RESPONSE_MAX_BYTES`.
+
+    Parameters
+    ----------
+    request_data: (dict)
+        The fields of an `ApiRequestsSchema`.
+
+    Returns
+    -------
+    (dict)
+    """
+    return {
+        "request_type": request_data["request_type"],
+        "path": request_data["path"],
+        "created_at": request_data["created_at"],
+        "status_code": request_data["status_code"],
+        "model_version": request_data.get("model_version"),
+        **encode_response(
+            request_data["response"],
+            max_bytes=app_config.AUDIT_LOG_RESPONSE_MAX_BYTES,
+            compression_level=app_config.AUDIT_LOG_COMPRESSION_LEVEL,
+        ),
+    }
 
 
 def save_api_requests_to_database(db: Session, request_data: ApiRequestsSchema) -> None:
@@ -12,18 +59,256 @@ def save_api_requests_to_database(db: Session, request_data: ApiRequestsSchema)
     ----------
     db: (Session)
         An SQLAlchemy Session object used to interact with the database.
-    request_data: (ApiRequestsSchema) 
+    request_data: (ApiRequestsSchema)
         An instance of the `ApiRequestsSchema` class containing the API request data to be saved.
-    
+
     Returns
     -------
     None
     """
-    
+
     return APIrequestModel(
-        request_type=request_data.request_type,
-        path=request_data.path,
-        created_at=request_data.created_at,
-        response=request_data.response,
-        status_code=request_data.status_code,
+        **create_api_request_record(request_data.model_dump())
     ).save(db)
+
+
+async def save_api_requests_to_database_async(
+    db: AsyncSession, request_data: ApiRequestsSchema
+) -> None:
+    """
+    Saves API request data to the database through an async session.
+
+    Parameters
+    ----------
+    db: (AsyncSession)
+        An SQLAlchemy AsyncSession object used to interact with the database.
+    request_data: (ApiRequestsSchema)
+        An instance of the `ApiRequestsSchema` class containing the API request data to be saved.
+
+    Returns
+    -------
+    None
+    """
+
+    return await APIrequestModel(
+        **create_api_request_record(request_data.model_dump())
+    ).save_async(db)
+
+
+class ApiRequestsLogWriter:
+    """
+    Writes API requests to the database in bulk, off the request path.
+
+    Requests are put in a bounded in-process queue and a background thread
+    compresses their responses and inserts them with a single multi-row INSERT
+    every `flush_max_records` records or `flush_interval_ms` milliseconds,
+    whichever comes first.
+    When the queue is full, the record is dropped and counted instead of
+    blocking the request. Stopping the writer flushes everything queued.
+
+    Parameters
+    ----------
+    session_factory: (Callable[[], Session])
+        Creates the sessions used to write the records.
+    max_queue_size: (int)
+        The maximum number of records waiting to be written.
+    flush_max_records: (int)
+        The maximum number of records written by a single INSERT.
+    flush_interval_ms: (int)
+        The maximum time a record waits in the queue before being written.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_queue_size: int,
+        flush_max_records: int,
+        flush_interval_ms: int,
+    ):
+        self.session_factory = session_factory
+        self.flush_max_records = flush_max_records
+        self.flush_interval_seconds = flush_interval_ms / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: threading.Thread | None = None
+        self._stats_lock = threading.Lock()
+        self._enqueued_records = 0
+        self._written_records = 0
+        self._dropped_records = 0
+        self._flushes = 0
+        self._flush_latency_seconds_total = 0.0
+        self._flush_latency_seconds_max = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts the background thread that writes the queued records.
+        """
+        if self.is_running:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run, name="api-requests-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Writes every queued record and stops the background thread.
+        """
+        if not self.is_running:
+            return
+
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def enqueue(self, request_data: ApiRequestsSchema) -> bool:
+        """
+        Queues an API request to be written to the database.
+
+        Parameters
+        ----------
+        request_data: (ApiRequestsSchema)
+            The API request data to be saved.
+
+        Returns
+        -------
+        (bool)
+            False if the queue was full and the record was dropped.
+        """
+        try:
+            self._queue.put_nowait(request_data.model_dump())
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped_records += 1
+            return False
+
+        with self._stats_lock:
+            self._enqueued_records += 1
+        return True
+
+    def get_stats(self) -> ApiRequestsLogWriterStatsSchema:
+        """
+        Returns the writer counters.
+        """
+        with self._stats_lock:
+            return ApiRequestsLogWriterStatsSchema(
+                running=self.is_running,
+                queue_depth=self._queue.qsize(),
+                enqueued_records=self._enqueued_records,
+                written_records=self._written_records,
+                dropped_records=self._dropped_records,
+                flushes=self._flushes,
+                flush_latency_seconds_total=self._flush_latency_seconds_total,
+                flush_latency_seconds_max=self._flush_latency_seconds_max,
+            )
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: list[dict] = []
+            deadline: float | None = None
+            while len(batch) < self.flush_max_records:
+                if deadline is None:
+                    timeout = self.flush_interval_seconds
+                else:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+                if record is _STOP:
+                    stopping = True
+                    break
+
+                batch.append(record)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval_seconds
+
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: list[dict]) -> None:
+        start = time.perf_counter()
+        try:
+            records = [create_api_request_record(request_data) for request_data in batch]
+            with self.session_factory() as db:
+                db.execute(insert(APIrequestModel), records)
+                db.commit()
+        except Exception as e:
+            # Any error drops the batch only, so the writer thread keeps running.
+            logger.error(f"Error writing {len(batch)} API requests to the database. [Details]: {e}")
+            with self._stats_lock:
+                self._dropped_records += len(batch)
+            return
+
+        latency = time.perf_counter() - start
+        metrics_service.get_stage_histogram("audit_log", "flush").observe(latency)
+        with self._stats_lock:
+            self._written_records += len(batch)
+            self._flushes += 1
+            self._flush_latency_seconds_total += latency
+            self._flush_latency_seconds_max = max(self._flush_latency_seconds_max, latency)
+
+
+api_requests_log_writer = ApiRequestsLogWriter(
+    session_factory=SessionLocal,
+    max_queue_size=app_config.AUDIT_LOG_QUEUE_MAX_SIZE,
+    flush_max_records=app_config.AUDIT_LOG_FLUSH_MAX_RECORDS,
+    flush_interval_ms=app_config.AUDIT_LOG_FLUSH_INTERVAL_MS,
+)
+
+
+def log_api_request(db: Session, request_data: ApiRequestsSchema) -> None:
+    """
+    Logs an API request, through the background writer when it's running or
+    directly to the database otherwise.
+
+    Parameters
+    ----------
+    db: (Session)
+        An SQLAlchemy Session object, used when the background writer isn't running.
+    request_data: (ApiRequestsSchema)
+        The API request data to be saved.
+
+    Returns
+    -------
+    None
+    """
+    with metrics_service.StageTimer("audit_log", "log"):
+        if api_requests_log_writer.is_running:
+            api_requests_log_writer.enqueue(request_data)
+            return
+
+        save_api_requests_to_database(db=db, request_data=request_data)
+
+
+async def log_api_request_async(db: AsyncSession, request_data: ApiRequestsSchema) -> None:
+    """
+    Logs an API request from an async endpoint, through the background writer
+    when it's running or by awaiting the insert otherwise.
+
+    Parameters
+    ----------
+    db: (AsyncSession)
+        An SQLAlchemy AsyncSession object, used when the background writer isn't running.
+    request_data: (ApiRequestsSchema)
+        The API request data to be saved.
+
+    Returns
+    -------
+    None
+    """
+    with metrics_service.StageTimer("audit_log", "log"):
+        if api_requests_log_writer.is_running:
+            api_requests_log_writer.enqueue(request_data)
+            return
+
+        await save_api_requests_to_database_async(db=db, request_data=request_data)
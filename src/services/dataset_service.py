@@ -1,9 +1,49 @@
-import pandas as pd
+import fcntl
+import hashlib
 import logging
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
 
+from src.config import app_config
+from src.schemas.diamond_schema import DatasetIngestionSchema
+from src.utils.enums.diamonds_enums import (
+    DiamondClarityEnum,
+    DiamondColorEnum,
+    DiamondColumnsEnum,
+    DiamondCutEnum,
+)
 
 logger = logging.getLogger(__name__)
 
+COLUMNAR_DATASET_EXTENSION = ".arrow"
+DATASET_LOCK_EXTENSION = ".lock"
+DATASET_DTYPES = {
+    DiamondColumnsEnum.CARAT.value: "float32",
+    DiamondColumnsEnum.CUT.value: pd.CategoricalDtype(
+        [cut.value for cut in DiamondCutEnum], ordered=True
+    ),
+    DiamondColumnsEnum.COLOR.value: pd.CategoricalDtype(
+        [color.value for color in DiamondColorEnum], ordered=True
+    ),
+    DiamondColumnsEnum.CLARITY.value: pd.CategoricalDtype(
+        [clarity.value for clarity in DiamondClarityEnum], ordered=True
+    ),
+    DiamondColumnsEnum.DEPTH.value: "float32",
+    DiamondColumnsEnum.TABLE.value: "float32",
+    DiamondColumnsEnum.PRICE.value: "int32",
+    DiamondColumnsEnum.X.value: "float32",
+    DiamondColumnsEnum.Y.value: "float32",
+    DiamondColumnsEnum.Z.value: "float32",
+}
+# The metadata of the columnar dataset that identifies the CSV it was converted from.
+SOURCE_MTIME_KEY = b"source_mtime_ns"
+SOURCE_SIZE_KEY = b"source_size"
+
 def convert_column_into_ordinal_categorical_data_type(
     df: pd.DataFrame, column_name: str, categories_list: list[str]
 ) -> pd.Categorical:
@@ -68,4 +108,476 @@ def create_dataframe_from_csv(path: str) -> pd.DataFrame:
         return pd.read_csv(path)
     except FileNotFoundError as e:
         logger.error(f"Error converting csv from path {path} to dataframe. [Details]: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+def remove_invalid_diamonds(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Removes the diamonds with a zero dimension (x, y or z) or a non-positive price.
+
+    Parameters
+    ----------
+    df: (DataFrame)
+        The diamonds dataframe.
+
+    Returns
+    -------
+    (DataFrame)
+        The valid diamonds.
+    """
+    return df[(df.x * df.y * df.z != 0) & (df.price > 0)]
+
+
+def get_columnar_dataset_path(csv_path: str) -> str:
+    """
+    Returns the path of the columnar dataset converted from a CSV, in
+    `DATASET_CACHE_DIR`, named after the CSV and a hash of its absolute path
+    so CSVs with the same name don't share it. The directory is created if
+    it doesn't exist.
+    """
+    os.makedirs(app_config.DATASET_CACHE_DIR, exist_ok=True)
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    path_hash = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:12]
+
+    return os.path.join(
+        app_config.DATASET_CACHE_DIR, f"{name}-{path_hash}{COLUMNAR_DATASET_EXTENSION}"
+    )
+
+
+@contextmanager
+def dataset_lock(csv_path: str, blocking: bool = True) -> Iterator[None]:
+    """
+    Holds the lock of the dataset, shared by every process: an exclusive
+    `flock` on a file next to its columnar dataset. Ingestions hold it while
+    they append to the CSV and rewrite the columnar dataset, and conversions
+    while they write it, so a process never converts a CSV whose rows are
+    still being appended.
+
+    Each acquisition opens the file again, so threads of the same process
+    exclude each other too.
+
+    Parameters
+    ----------
+    csv_path: (str)
+        The dataset CSV path.
+    blocking: (bool)
+        Whether to wait for the lock when another process holds it.
+
+    Raises
+    ------
+    BlockingIOError:
+        Raises if `blocking` is False and another process holds the lock.
+    """
+    with open(get_columnar_dataset_path(csv_path) + DATASET_LOCK_EXTENSION, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_source_metadata(stat: os.stat_result) -> dict[bytes, str]:
+    """
+    Returns the metadata of a columnar dataset converted from a CSV with the received stat.
+    """
+    return {SOURCE_MTIME_KEY: str(stat.st_mtime_ns), SOURCE_SIZE_KEY: str(stat.st_size)}
+
+
+def convert_csv_to_columnar_dataset(csv_path: str, path: str) -> None:
+    """
+    Converts the diamonds CSV into an Arrow IPC file, with the categorical
+    columns as ordered dictionaries of int8 codes and the numeric columns as
+    float32 and int32. The file is written to a temporary path and renamed, so
+    concurrent readers never see a partial file.
+
+    Parameters
+    ----------
+    csv_path: (str)
+        The CSV's path.
+    path: (str)
+        The path of the Arrow IPC file.
+
+    Raises
+    ------
+    FileNotFoundError:
+        Raises when the CSV's path is not found.
+    ValueError:
+        Raises if a numeric column has missing or non-numeric values.
+    """
+    try:
+        stat = os.stat(csv_path)
+        df = pd.read_csv(csv_path, dtype=DATASET_DTYPES)
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(f"Error converting csv from path {csv_path} to a columnar dataset. [Details]: {e}")
+        raise e
+
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(
+        get_source_metadata(stat)
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table.combine_chunks())
+    os.replace(tmp_path, path)
+
+
+def is_columnar_dataset_up_to_date(csv_path: str, path: str) -> bool:
+    """
+    Returns whether the columnar dataset exists and was converted from the
+    current version of the CSV, according to the CSV's mtime and size.
+
+    Parameters
+    ----------
+    csv_path: (str)
+        The CSV's path.
+    path: (str)
+        The path of the Arrow IPC file.
+
+    Returns
+    -------
+    (bool)
+    """
+    try:
+        metadata = pa.ipc.open_file(pa.memory_map(path)).schema.metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return False
+
+    stat = os.stat(csv_path)
+    return (
+        metadata.get(SOURCE_MTIME_KEY) == str(stat.st_mtime_ns).encode()
+        and metadata.get(SOURCE_SIZE_KEY) == str(stat.st_size).encode()
+    )
+
+
+def create_dataframe_from_columnar_dataset(path: str) -> pd.DataFrame:
+    """
+    Opens the Arrow IPC file memory-mapped and creates a dataframe on top of it.
+    The numeric columns are views of the mapped file, so they're read from the
+    page cache, shared between processes, instead of being parsed and copied.
+
+    Parameters
+    ----------
+    path: (str)
+        The path of the Arrow IPC file.
+
+    Returns
+    -------
+    (DataFrame)
+        The dataframe, with ordered categoricals and float32/int32 numerics.
+
+    Raises
+    ------
+    FileNotFoundError:
+        Raises when the path is not found.
+    """
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    except FileNotFoundError as e:
+        logger.error(f"Error opening columnar dataset from path {path}. [Details]: {e}")
+        raise e
+
+    return table.to_pandas(split_blocks=True)
+
+
+def load_dataset(csv_path: str, blocking: bool = True) -> pd.DataFrame:
+    """
+    Loads the diamonds dataset from its columnar version, converting the CSV
+    first if it wasn't converted yet or changed since. If the columnar dataset
+    can't be written, the CSV is read with the same types.
+
+    Parameters
+    ----------
+    csv_path: (str)
+        The CSV's path.
+    blocking: (bool)
+        Whether to wait for an ingestion of another process to finish if the
+        CSV has to be converted, instead of raising BlockingIOError.
+
+    Returns
+    -------
+    (DataFrame)
+        The dataframe, with ordered categoricals and float32/int32 numerics.
+
+    Raises
+    ------
+    FileNotFoundError:
+        Raises when the CSV's path is not found.
+    BlockingIOError:
+        Raises if `blocking` is False and the dataset is being ingested.
+    """
+    try:
+        path = get_columnar_dataset_path(csv_path)
+        if not is_columnar_dataset_up_to_date(csv_path, path):
+            with dataset_lock(csv_path, blocking):
+                update_columnar_dataset(csv_path, path)
+    except (FileNotFoundError, BlockingIOError) as e:
+        raise e
+    except OSError as e:
+        logger.warning(f"Columnar dataset not written, reading the CSV. [Details]: {e}")
+        return pd.read_csv(csv_path, dtype=DATASET_DTYPES)
+
+    return create_dataframe_from_columnar_dataset(path)
+
+
+def update_columnar_dataset(csv_path: str, path: str) -> None:
+    """
+    Converts the CSV to the columnar dataset if it wasn't converted yet or
+    changed since. Called with the dataset lock held, so a conversion that
+    waited for another process to finish one isn't done again.
+
+    Parameters
+    ----------
+    csv_path: (str)
+        The CSV's path.
+    path: (str)
+        The path of the Arrow IPC file.
+    """
+    if not is_columnar_dataset_up_to_date(csv_path, path):
+        convert_csv_to_columnar_dataset(csv_path, path)
+        logger.info(f"Converted {csv_path} to the columnar dataset {path}.")
+
+
+def get_float32_decimals(values: np.ndarray) -> int:
+    """
+    Returns the number of decimals of the 6 significant digits a float32 holds,
+    for the largest magnitude of the values.
+
+    Parameters
+    ----------
+    values: (np.ndarray)
+        The float32 values.
+
+    Returns
+    -------
+    (int)
+    """
+    magnitude = max(
+        abs(float(np.nanmax(values, initial=0.0))), abs(float(np.nanmin(values, initial=0.0)))
+    )
+    integer_digits = int(np.floor(np.log10(magnitude))) + 1 if magnitude > 0 else 1
+    precision = np.finfo(np.float32).precision
+
+    return max(precision - integer_digits, 0)
+
+
+def widen_float32_values(values: np.ndarray, decimals: int | None = None) -> np.ndarray:
+    """
+    Returns float32 values as float64, rounded to the 6 significant digits a
+    float32 holds, so a value read as 1.1 stays 1.1 instead of 1.100000023841858.
+
+    Parameters
+    ----------
+    values: (np.ndarray)
+        The float32 values.
+    decimals: (int | None)
+        The decimals to round to, by default those of the values themselves.
+        Rows of a column are widened with the decimals of the whole column, so
+        every row is rounded the same.
+
+    Returns
+    -------
+    (np.ndarray)
+    """
+    if decimals is None:
+        decimals = get_float32_decimals(values)
+
+    return np.round(values.astype(np.float64), decimals)
+
+
+def validate_diamonds(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keeps the rows with a category of the enums for cut, color and clarity, a
+    number for every numeric column and an integer price, typed as the dataset.
+
+    Parameters
+    ----------
+    df: (DataFrame)
+        The diamonds, with the values as read from the CSV.
+
+    Returns
+    -------
+    (DataFrame)
+        The valid diamonds, with the columns in the order of the dataset.
+
+    Raises
+    ------
+    ValueError:
+        Raises if a column of the dataset is missing.
+    """
+    missing_columns = [column_name for column_name in DATASET_DTYPES if column_name not in df.columns]
+    if missing_columns:
+        logger.error(f"Error validating diamonds. [Details]: missing columns {missing_columns}")
+        raise ValueError(f"Missing columns: {', '.join(missing_columns)}.")
+
+    columns = {}
+    for column_name, dtype in DATASET_DTYPES.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns[column_name] = pd.Series(pd.Categorical(df[column_name], dtype=dtype), index=df.index)
+        else:
+            columns[column_name] = pd.to_numeric(df[column_name], errors="coerce")
+    typed = pd.DataFrame(columns)
+    price = typed[DiamondColumnsEnum.PRICE.value]
+    valid = typed.notna().all(axis=1) & (price % 1 == 0)
+
+    return typed[valid].astype(DATASET_DTYPES)
+
+
+def hash_diamonds(df: pd.DataFrame) -> np.ndarray:
+    """
+    Returns a 64-bit hash of every row, equal for rows with the same values.
+    """
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def is_hash_known(known_hashes: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """
+    Returns whether each hash is in the sorted array of known hashes.
+    """
+    if len(known_hashes) == 0:
+        return np.zeros(len(hashes), dtype=bool)
+
+    positions = np.searchsorted(known_hashes, hashes)
+    found = known_hashes[np.minimum(positions, len(known_hashes) - 1)] == hashes
+    return found & (positions < len(known_hashes))
+
+
+def ingest_csv(source_path: str, csv_path: str, chunk_size: int) -> DatasetIngestionSchema:
+    """
+    Appends the new diamonds of a CSV to the dataset, reading `chunk_size` rows
+    at a time, so the memory used doesn't depend on the size of the file.
+
+    Each chunk is validated against the enums, cleaned with the rules of the
+    notebook and deduplicated against the dataset and the previous chunks, by
+    the hash of the rows. Its new rows are staged, and once the whole file is
+    read they're appended to the dataset CSV, and the columnar dataset is
+    rewritten from its memory-mapped batches and the staged ones. A file that
+    fails to be read leaves the dataset as it was. The ingestion holds the
+    dataset lock, so ingestions of every process run one at a time.
+
+    Parameters
+    ----------
+    source_path: (str)
+        The path of the CSV with the new diamonds.
+    csv_path: (str)
+        The dataset CSV path.
+    chunk_size: (int)
+        The number of rows read at a time.
+
+    Returns
+    -------
+    (DatasetIngestionSchema)
+
+    Raises
+    ------
+    FileNotFoundError:
+        Raises when the source path or the dataset CSV path is not found.
+    ValueError:
+        Raises if a column of the dataset is missing from the source CSV or it
+        can't be parsed (pandas.errors.ParserError).
+    """
+    with dataset_lock(csv_path):
+        path = get_columnar_dataset_path(csv_path)
+        update_columnar_dataset(csv_path, path)
+        dataset = create_dataframe_from_columnar_dataset(path)
+        known_hashes = np.sort(hash_diamonds(dataset))
+        schema = pa.ipc.open_file(pa.memory_map(path)).schema.remove_metadata()
+        staging_path = f"{path}.{os.getpid()}.staging"
+        report = DatasetIngestionSchema(
+            rows_read=0, invalid_rows=0, duplicate_rows=0, appended_rows=0, dataset_rows=len(dataset)
+        )
+        del dataset
+
+        try:
+            with pa.OSFile(staging_path, "wb") as staging, pa.ipc.new_stream(staging, schema) as stager:
+                for chunk in pd.read_csv(source_path, chunksize=chunk_size, dtype=str):
+                    report.rows_read += len(chunk)
+                    valid = remove_invalid_diamonds(validate_diamonds(chunk))
+                    report.invalid_rows += len(chunk) - len(valid)
+
+                    hashes = hash_diamonds(valid)
+                    is_new = ~is_hash_known(known_hashes, hashes) & ~pd.Series(hashes).duplicated().to_numpy()
+                    new_diamonds = valid[is_new]
+                    report.duplicate_rows += len(valid) - len(new_diamonds)
+                    if new_diamonds.empty:
+                        continue
+                    new_hashes = np.sort(hashes[is_new])
+                    known_hashes = np.insert(
+                        known_hashes, np.searchsorted(known_hashes, new_hashes), new_hashes
+                    )
+
+                    stager.write_table(pa.Table.from_pandas(new_diamonds, schema=schema, preserve_index=False))
+                    report.appended_rows += len(new_diamonds)
+
+            if report.appended_rows:
+                append_to_csv(csv_path, staging_path)
+                append_to_columnar_dataset(csv_path, path, staging_path)
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(f"Error ingesting csv from path {source_path}. [Details]: {e}")
+            raise e
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+
+    report.dataset_rows += report.appended_rows
+    logger.info(
+        f"Ingested {source_path}: {report.appended_rows} diamonds appended, "
+        f"{report.duplicate_rows} duplicates and {report.invalid_rows} invalid rows skipped."
+    )
+    return report
+
+
+def append_to_csv(csv_path: str, staging_path: str) -> None:
+    """
+    Appends the staged rows to the dataset CSV, one batch at a time. If writing
+    them fails, the CSV is truncated back to its previous size.
+
+    Parameters
+    ----------
+    csv_path: (str)
+        The dataset CSV path.
+    staging_path: (str)
+        The path of the Arrow IPC stream with the staged rows.
+    """
+    with open(csv_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        needs_newline = f.read(1) != b"\n"
+
+    size = os.path.getsize(csv_path)
+    try:
+        with open(csv_path, "a", newline="") as f:
+            if needs_newline:
+                f.write("\n")
+            for batch in pa.ipc.open_stream(pa.memory_map(staging_path)):
+                batch.to_pandas().to_csv(f, header=False, index=False)
+    except OSError as e:
+        logger.error(f"Error appending the staged rows to {csv_path}. [Details]: {e}")
+        os.truncate(csv_path, size)
+        raise e
+
+
+def append_to_columnar_dataset(csv_path: str, path: str, staging_path: str) -> None:
+    """
+    Rewrites the columnar dataset with its batches followed by the staged ones,
+    with the metadata of the current CSV. The batches are read memory-mapped and
+    written one at a time.
+
+    Parameters
+    ----------
+    csv_path: (str)
+        The dataset CSV path, with the staged rows already appended.
+    path: (str)
+        The path of the Arrow IPC file.
+    staging_path: (str)
+        The path of the Arrow IPC stream with the staged rows.
+    """
+    reader = pa.ipc.open_file(pa.memory_map(path))
+    staged = pa.ipc.open_stream(pa.memory_map(staging_path))
+    schema = reader.schema.with_metadata(get_source_metadata(os.stat(csv_path)))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            for position in range(reader.num_record_batches):
+                writer.write_batch(reader.get_batch(position))
+            for batch in staged:
+                writer.write_batch(batch)
+    os.replace(tmp_path, path)
@@ -1,21 +1,41 @@
+import io
 import logging
 import pickle
+from typing import Iterator
+
+import numpy as np
 import pandas as pd
-import statistics
 
+from pydantic import ValidationError
 from xgboost.sklearn import XGBRegressor
+from src.config import app_config
 from src.schemas.diamond_schema import (
+    DiamondBatchPricePredictionRowSchema,
+    DiamondBatchPricePredictionSchema,
     DiamondFeaturesForPredictionSchema,
     DiamondFeaturesForSearchSchema,
+    DiamondFeaturesForSimilaritySearchSchema,
+    DiamondPriceModelSchema,
+    DiamondPricePredictionSchema,
+)
+from src.services import (
+    dataset_service,
+    encoding_service,
+    metrics_service,
+    model_service,
+    prediction_batching_service,
+    prediction_cache_service,
+    search_index_service,
 )
-from src.services import dataset_service, model_service
+from src.services.search_index_service import DiamondSearchIndex
 from src.utils.enums.diamonds_enums import (
     DiamondClarityEnum,
     DiamondColorEnum,
     DiamondCutEnum,
     DiamondColumnsEnum,
+    DiamondPriceModelEnum,
 )
-from src.utils.helpers import validate_data_has_no_zero_values
+from src.utils.helpers import get_zero_value_errors, validate_data_has_no_zero_values
 
 logger = logging.getLogger(__name__)
 
@@ -36,18 +56,37 @@ def create_dataframe_from_diamond_schema_for_prediction(
     DataFrame
     """
 
+    return create_dataframe_from_diamond_schemas_for_prediction([data])
+
+
+def create_dataframe_from_diamond_schemas_for_prediction(
+    data: list[DiamondFeaturesForPredictionSchema],
+) -> pd.DataFrame:
+    """
+    Creates a single columnar dataframe for the price prediction of many diamonds.
+
+    Parameters
+    ----------
+    data: (list[DiamondFeaturesForPredictionSchema])
+        The schemas with the necessary columns to create the dataframe, one per row.
+
+    Returns
+    -------
+    DataFrame
+    """
+
     return pd.DataFrame(
         {
-            DiamondColumnsEnum.CARAT.value: [data.carat],
-            DiamondColumnsEnum.CUT.value: [data.cut],
-            DiamondColumnsEnum.COLOR.value: [data.color],
-            DiamondColumnsEnum.CLARITY.value: [data.clarity],
-            DiamondColumnsEnum.DEPTH.value: [data.depth],
-            DiamondColumnsEnum.TABLE.value: [data.table],
-            DiamondColumnsEnum.PRICE.value: [0],
-            DiamondColumnsEnum.X.value: [data.x],
-            DiamondColumnsEnum.Y.value: [data.y],
-            DiamondColumnsEnum.Z.value: [data.z],
+            DiamondColumnsEnum.CARAT.value: [row.carat for row in data],
+            DiamondColumnsEnum.CUT.value: [row.cut for row in data],
+            DiamondColumnsEnum.COLOR.value: [row.color for row in data],
+            DiamondColumnsEnum.CLARITY.value: [row.clarity for row in data],
+            DiamondColumnsEnum.DEPTH.value: [row.depth for row in data],
+            DiamondColumnsEnum.TABLE.value: [row.table for row in data],
+            DiamondColumnsEnum.PRICE.value: [0] * len(data),
+            DiamondColumnsEnum.X.value: [row.x for row in data],
+            DiamondColumnsEnum.Y.value: [row.y for row in data],
+            DiamondColumnsEnum.Z.value: [row.z for row in data],
         }
     )
 
@@ -108,116 +147,531 @@ def prepare_diamond_df_for_xgboost_model(df: pd.DataFrame) -> pd.DataFrame:
         raise e
 
 
-def predict_diamond_price(data: DiamondFeaturesForPredictionSchema) -> str:
+PRICE_MODEL_DESCRIPTIONS = {
+    DiamondPriceModelEnum.xgboost: (
+        "XGBoost model trained on every feature. The most accurate model."
+    ),
+    DiamondPriceModelEnum.linear: (
+        "Log-linear regression on carat, x, cut, color and clarity. Much faster "
+        "and less accurate, for high-volume uses."
+    ),
+}
+
+
+def get_price_model_cache(model_name: DiamondPriceModelEnum) -> model_service.ModelCache:
+    """
+    Returns the cache of the price model with the received name.
+    """
+    if model_name == DiamondPriceModelEnum.linear:
+        return model_service.linear_model_cache
+
+    return model_service.model_cache
+
+
+def list_price_models() -> list[DiamondPriceModelSchema]:
+    """
+    Returns the models that can predict prices, loading the ones that weren't
+    used yet to tell whether they are available.
+
+    Returns
+    -------
+    (list[DiamondPriceModelSchema])
+    """
+    price_models = []
+    for model_name in DiamondPriceModelEnum:
+        price_model = DiamondPriceModelSchema(
+            name=model_name,
+            description=PRICE_MODEL_DESCRIPTIONS[model_name],
+            default=model_name == DiamondPriceModelEnum.xgboost,
+            available=False,
+        )
+        try:
+            served_model = get_price_model_cache(model_name).get()
+            price_model.available = True
+            price_model.version = served_model.version
+            price_model.path = served_model.path
+        except (ValueError, pickle.UnpicklingError, FileNotFoundError) as e:
+            logger.warning(f"Price model {model_name.value} is not available. [Details]: {e}")
+        price_models.append(price_model)
+
+    return price_models
+
+
+def predict_diamond_price(
+    data: DiamondFeaturesForPredictionSchema,
+    model_name: DiamondPriceModelEnum = DiamondPriceModelEnum.xgboost,
+) -> DiamondPricePredictionSchema:
     """
     Receives the data with the values of the diamond to have price predicted
-    and returns a string with the predicted price.
+    and returns the predicted price with the version of the model that served it.
+    Prices already predicted by the same XGBoost model version are served from
+    the prediction cache, and the other ones are predicted together with the
+    concurrent requests by the prediction batcher. The linear model is cheaper than a cache lookup, so
+    its prices are always computed.
 
     Parameters
     ----------
     data: (DiamondFeaturesForPredictionSchema)
         Data of the diamond.
+    model_name: (DiamondPriceModelEnum)
+        The model that predicts the price.
 
     Returns
     -------
-    response: (str)
-        A string with the price predicted.
+    response: (DiamondPricePredictionSchema)
+        The message with the price predicted, the price and the model version.
 
     Raises
     ------
-    (ValueError, TypeError, pickle.UnpicklingError, FileNotFoundError):
-        Raises if some error occurs during preparing of dataframe or unpickling the model.
+    (ValueError, TypeError, KeyError, pickle.UnpicklingError, FileNotFoundError):
+        Raises if some error occurs during encoding of features or unpickling the model.
     """
+    time_stage = metrics_service.StageTimer
+    operation = f"predict_{model_name.value}"
     try:
-        validate_data_has_no_zero_values(data)
-        diamond_df: pd.DataFrame = create_dataframe_from_diamond_schema_for_prediction(
-            data
-        )
-        model: XGBRegressor = model_service.load_pickle_model(
-            path="data/models/model_xcgboost.pkl"
-        )
+        with time_stage(operation, "validation"):
+            validate_data_has_no_zero_values(data)
+        if model_name == DiamondPriceModelEnum.linear:
+            with time_stage(operation, "model"):
+                served_model = model_service.linear_model_cache.get()
+            with time_stage(operation, "inference"):
+                price = served_model.model.predict_price(data)
+            return DiamondPricePredictionSchema(
+                message=f"The predicted value for the diamond is: ${price}",
+                price=price,
+                model_version=served_model.version,
+            )
 
-        new_diamond_df = diamond_df.copy()
-        new_diamond_df = prepare_diamond_df_for_xgboost_model(new_diamond_df)
+        with time_stage(operation, "model"):
+            served_model = model_service.model_cache.get()
+        model: XGBRegressor = served_model.model
+
+        prediction_cache = prediction_cache_service.prediction_cache
+        with time_stage(operation, "cache_lookup"):
+            cache_key = prediction_cache.make_key(data)
+            price = prediction_cache.get(model_version=served_model.version, key=cache_key)
+
+        if price is None:
+            with time_stage(operation, "encoding"):
+                encoder = encoding_service.get_model_encoder(model)
+                features = encoder.encode(data)
+
+            with time_stage(operation, "inference"):
+                price = prediction_batching_service.prediction_batcher.predict(
+                    features=features, model=model
+                )
+            prediction_cache.put(
+                model_version=served_model.version, key=cache_key, price=price
+            )
 
-        prediction = model_service.predict(df=new_diamond_df, model=model)
-        response = f"The predicted value for the diamond is: ${prediction[0]}"
+        # The message shows the price as the float32 the model predicts, e.g. 4641.396.
+        response = DiamondPricePredictionSchema(
+            message=f"The predicted value for the diamond is: ${str(np.float32(price))}",
+            price=price,
+            model_version=served_model.version,
+        )
 
         return response
-    except (ValueError, TypeError, pickle.UnpicklingError, FileNotFoundError) as e:
+    except (ValueError, TypeError, KeyError, pickle.UnpicklingError, FileNotFoundError) as e:
         logger.error(f"Error trying to predic diamond price. [Details]: {e}")
         raise e
 
 
-def filter_diamonds_df_by_features(
-    df: pd.DataFrame, features: DiamondFeaturesForSearchSchema
-) -> pd.DataFrame:
+def format_validation_error(error: ValidationError) -> str:
     """
-    Filter the diamonds df values with the same features (cut, color, clarity).
+    Formats a pydantic validation error as a single readable line.
 
     Parameters
     ----------
-    df: (DataFrame)
-        The diamonds dataframe.
-    features: (DiamondFeaturesForSearchSchema)
-        Data with the features values.
+    error: (ValidationError)
+        The validation error raised by the schema.
+
+    Returns
+    -------
+    (str)
+        The error details, as "field: message" separated by semicolons.
+    """
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def predict_diamonds_prices_in_batch(
+    data: list[DiamondFeaturesForPredictionSchema | dict],
+    model_name: DiamondPriceModelEnum = DiamondPriceModelEnum.xgboost,
+) -> DiamondBatchPricePredictionSchema:
+    """
+    Predicts the prices of many diamonds with a single model call.
+
+    Each row is validated on its own, so invalid rows are reported with their
+    error and don't fail the rest of the batch. The valid rows are encoded into
+    one feature matrix and predicted together.
+
+    Parameters
+    ----------
+    data: (list[DiamondFeaturesForPredictionSchema | dict])
+        The features of each diamond, validated or as expected by
+        DiamondFeaturesForPredictionSchema.
+    model_name: (DiamondPriceModelEnum)
+        The model that predicts the prices.
 
     Returns
     -------
-    DataFrame:
-        Returns the diamonds dataframe with the filtered values.
+    response: (DiamondBatchPricePredictionSchema)
+        The price or the error of each row, in the order received, and the model version.
 
     Raises
     ------
     ValueError:
-        Raises if the filter found no diamonds.
+        Raises if the batch is empty or larger than the configured limit.
+    (TypeError, KeyError, pickle.UnpicklingError, FileNotFoundError):
+        Raises if some error occurs during encoding of features or unpickling the model.
+    """
+    time_stage = metrics_service.StageTimer
+    operation = f"predict_batch_{model_name.value}"
+    try:
+        if not data:
+            raise ValueError("The batch must have at least one diamond.")
+        if len(data) > app_config.BATCH_PREDICTION_MAX_SIZE:
+            raise ValueError(
+                f"The batch must have at most {app_config.BATCH_PREDICTION_MAX_SIZE} diamonds."
+            )
+
+        rows: list[DiamondBatchPricePredictionRowSchema] = []
+        valid_rows: list[DiamondBatchPricePredictionRowSchema] = []
+        valid_diamonds: list[DiamondFeaturesForPredictionSchema] = []
+        with time_stage(operation, "validation"):
+            for index, row_data in enumerate(data):
+                row = DiamondBatchPricePredictionRowSchema(index=index)
+                try:
+                    diamond = DiamondFeaturesForPredictionSchema.model_validate(row_data)
+                    validate_data_has_no_zero_values(diamond)
+                    valid_rows.append(row)
+                    valid_diamonds.append(diamond)
+                except ValidationError as e:
+                    row.error = format_validation_error(e)
+                except ValueError as e:
+                    row.error = str(e)
+                rows.append(row)
+
+        with time_stage(operation, "model"):
+            served_model = get_price_model_cache(model_name).get()
+
+        if valid_diamonds:
+            if model_name == DiamondPriceModelEnum.linear:
+                with time_stage(operation, "inference"):
+                    predictions = served_model.model.predict_prices(valid_diamonds)
+            else:
+                with time_stage(operation, "encoding"):
+                    encoder = encoding_service.get_model_encoder(served_model.model)
+                    features = encoder.encode_many(valid_diamonds)
+                with time_stage(operation, "inference"):
+                    predictions = model_service.predict_features(
+                        features=features, model=served_model.model
+                    )
+
+            for row, prediction in zip(valid_rows, predictions):
+                row.price = float(prediction)
+
+        return DiamondBatchPricePredictionSchema(
+            model_version=served_model.version, predictions=rows
+        )
+    except (ValueError, TypeError, KeyError, pickle.UnpicklingError, FileNotFoundError) as e:
+        logger.error(f"Error trying to predict diamonds prices in batch. [Details]: {e}")
+        raise e
+
+
+PREDICTION_FEATURES = [
+    DiamondColumnsEnum.CARAT.value,
+    DiamondColumnsEnum.CUT.value,
+    DiamondColumnsEnum.COLOR.value,
+    DiamondColumnsEnum.CLARITY.value,
+    DiamondColumnsEnum.DEPTH.value,
+    DiamondColumnsEnum.TABLE.value,
+    DiamondColumnsEnum.X.value,
+    DiamondColumnsEnum.Y.value,
+    DiamondColumnsEnum.Z.value,
+]
+PREDICTED_PRICE_COLUMN = "predicted_price"
+ERROR_COLUMN = "error"
+
+
+def validate_diamonds_df_for_prediction(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Validates the features of every row one column at a time: the categories
+    against the enums, the numeric values and the zero values.
+
+    Parameters
+    ----------
+    df: (DataFrame)
+        The diamonds, with the values as read from the CSV.
+
+    Returns
+    -------
+    (tuple[DataFrame, Series])
+        The features, with the categorical columns as ordered categoricals and
+        the numeric columns as floats, and the error of each row, empty for the
+        valid ones.
     """
-    new_df = df[
-        (df[DiamondColumnsEnum.CLARITY.value] == features.clarity)
-        & (df[DiamondColumnsEnum.COLOR.value] == features.color)
-        & (df[DiamondColumnsEnum.CUT.value] == features.cut)
+    features = {}
+    errors = pd.Series("", index=df.index, dtype=object)
+    for column_name in PREDICTION_FEATURES:
+        dtype = dataset_service.DATASET_DTYPES[column_name]
+        if isinstance(dtype, pd.CategoricalDtype):
+            values = pd.Series(pd.Categorical(df[column_name], dtype=dtype), index=df.index)
+            message = f"{column_name}: must be one of {', '.join(dtype.categories)}; "
+        else:
+            values = pd.to_numeric(df[column_name], errors="coerce")
+            message = f"{column_name}: must be a number; "
+        errors[values.isna().to_numpy()] += message
+        features[column_name] = values
+
+    features = pd.DataFrame(features)
+    numeric_columns = [
+        column_name
+        for column_name in PREDICTION_FEATURES
+        if not isinstance(dataset_service.DATASET_DTYPES[column_name], pd.CategoricalDtype)
     ]
-    if new_df.empty:
-        raise ValueError("It was not found diamonds for the chosen features.")
-    
-    return new_df
+    zero_value_errors = get_zero_value_errors(features[numeric_columns])
+    has_zero_value = (zero_value_errors != "").to_numpy()
+    errors[has_zero_value] += zero_value_errors[has_zero_value] + "; "
 
+    has_error = (errors != "").to_numpy()
+    errors[has_error] = errors[has_error].str.removesuffix("; ")
 
-def diamonds_df_filtered_by_similar_weight(
-    df: pd.DataFrame, weight: float
+    return features, errors
+
+
+def predict_diamonds_prices_from_df(
+    df: pd.DataFrame, served_model: model_service.ServedModel, model_name: DiamondPriceModelEnum
 ) -> pd.DataFrame:
     """
-    Filter the diamonds dataframe by similar weight.
+    Validates and prices a chunk of diamonds, adding the predicted price and the
+    error of each row to it. Invalid rows get an error instead of a price.
 
     Parameters
     ----------
     df: (DataFrame)
-        The diamonds dataframe to be filtered.
+        The diamonds, with the values as read from the CSV.
+    served_model: (ServedModel)
+        The model that predicts the prices.
+    model_name: (DiamondPriceModelEnum)
+        The name of the model.
+
+    Returns
+    -------
+    (DataFrame)
+        The received rows with the `predicted_price` and `error` columns.
+    """
+    time_stage = metrics_service.StageTimer
+    operation = f"predict_csv_{model_name.value}"
+    with time_stage(operation, "validation"):
+        features, errors = validate_diamonds_df_for_prediction(df)
+        is_valid = (errors == "").to_numpy()
+        valid_features = features[is_valid]
+
+    prices = np.full(len(df), np.nan)
+    if len(valid_features):
+        if model_name == DiamondPriceModelEnum.linear:
+            with time_stage(operation, "inference"):
+                prices[is_valid] = served_model.model.predict_dataframe(valid_features)
+        else:
+            with time_stage(operation, "encoding"):
+                encoder = encoding_service.get_model_encoder(served_model.model)
+                encoded_features = encoder.encode_dataframe(valid_features)
+            with time_stage(operation, "inference"):
+                prices[is_valid] = model_service.predict_features(
+                    features=encoded_features, model=served_model.model
+                )
+
+    return df.assign(**{PREDICTED_PRICE_COLUMN: prices, ERROR_COLUMN: errors})
+
+
+def predict_diamonds_prices_from_csv(
+    path: str,
+    model_name: DiamondPriceModelEnum = DiamondPriceModelEnum.xgboost,
+    chunk_size: int = app_config.CSV_PREDICTION_CHUNK_SIZE,
+) -> tuple[str, Iterator[bytes]]:
+    """
+    Prices the diamonds of a CSV `chunk_size` rows at a time, so the memory used
+    doesn't depend on the size of the file.
+
+    The header, the model and the structure of every row are checked before
+    returning, reading the file once without converting its values, so a
+    malformed row is reported as an error before the response starts instead
+    of ending the stream early. The priced CSV is produced while it's iterated:
+    the received columns, in the same order, followed by `predicted_price` and
+    `error`.
+
+    Parameters
+    ----------
+    path: (str)
+        The path of the CSV with the diamonds.
+    model_name: (DiamondPriceModelEnum)
+        The model that predicts the prices.
+    chunk_size: (int)
+        The number of rows read and predicted at a time.
+
+    Returns
+    -------
+    (tuple[str, Iterator[bytes]])
+        The version of the model and the chunks of the priced CSV.
+
+    Raises
+    ------
+    ValueError:
+        Raises if the CSV is empty, misses a feature column or can't be parsed,
+        e.g. a row has more fields than the header (pandas.errors.ParserError).
+    (pickle.UnpicklingError, FileNotFoundError):
+        Raises if the model can't be loaded.
+    """
+    try:
+        column_names = pd.read_csv(path, nrows=0).columns.tolist()
+        missing_columns = [name for name in PREDICTION_FEATURES if name not in column_names]
+        if missing_columns:
+            raise ValueError(f"Missing columns: {', '.join(missing_columns)}.")
+        if PREDICTED_PRICE_COLUMN in column_names or ERROR_COLUMN in column_names:
+            raise ValueError(f"The columns {PREDICTED_PRICE_COLUMN} and {ERROR_COLUMN} are reserved.")
+        served_model = get_price_model_cache(model_name).get()
+        for _ in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            pass
+    except (ValueError, pickle.UnpicklingError, FileNotFoundError) as e:
+        logger.error(f"Error trying to predict diamonds prices from csv. [Details]: {e}")
+        raise e
+
+    def iter_priced_csv() -> Iterator[bytes]:
+        header = True
+        for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            priced_chunk = predict_diamonds_prices_from_df(chunk, served_model, model_name)
+            buffer = io.StringIO()
+            priced_chunk.to_csv(buffer, header=header, index=False)
+            header = False
+            yield buffer.getvalue().encode()
+
+    return served_model.version, iter_priced_csv()
+
+
+def find_positions_with_most_similar_weight(
+    sorted_carats: np.ndarray, weight: float, n: int
+) -> np.ndarray:
+    """
+    Finds the n carats closest to the weight in a sorted array of carats.
+
+    The n closest values of a sorted array are contiguous, so they are all within
+    n positions of the point where the weight would be inserted. Only that window
+    is compared, which keeps the search in O(log N + n).
+
+    Parameters
+    ----------
+    sorted_carats: (np.ndarray)
+        The carats, sorted in ascending order.
     weight: (float)
         The weight to be compared.
+    n: (int)
+        The number of carats to find.
 
     Returns
     -------
-    (DataFrame)
-        Returns a dataframe with the results of the filtered values.
+    (np.ndarray)
+        The positions of the found carats in `sorted_carats`.
+    """
+    insertion_point = np.searchsorted(sorted_carats, weight)
+    start = max(insertion_point - n, 0)
+    stop = min(insertion_point + n, len(sorted_carats))
+
+    distances = np.abs(sorted_carats[start:stop] - weight)
+    if len(distances) > n:
+        return start + np.argpartition(distances, n - 1)[:n]
+
+    return np.arange(start, stop)
+
+
+def find_rows_with_most_similar_weight(
+    index: DiamondSearchIndex, partition_id: int, weight: float, n: int
+) -> np.ndarray:
     """
-    weight_average: float = statistics.mean(df["carat"])
-    similar_weight_limit: float = weight_average - weight
-    filtered_diamonds: list[pd.DataFrame] = []
+    Finds the n rows of a partition of the search index with the most similar weight.
+
+    Parameters
+    ----------
+    index: (DiamondSearchIndex)
+        The search index.
+    partition_id: (int)
+        The id of the (cut, color, clarity) partition in the index.
+    weight: (float)
+        The weight to be compared.
+    n: (int)
+        The number of rows to find.
+
+    Returns
+    -------
+    (np.ndarray)
+        The found rows, in the dataset order.
+    """
+    partition = index.get_partition_slice(partition_id)
+    positions = find_positions_with_most_similar_weight(
+        sorted_carats=index.sorted_carats[partition], weight=weight, n=n
+    )
 
-    for carat in df[DiamondColumnsEnum.CARAT.value]:
-        if abs((carat - weight)) <= similar_weight_limit:
-            filtered_diamonds.append(df[df["carat"] == carat])
+    return np.sort(index.row_offsets[partition][positions])
 
-    return pd.concat(filtered_diamonds)
+
+def find_diamonds_by_features_and_similar_weight(
+    data: DiamondFeaturesForSearchSchema,
+) -> tuple[DiamondSearchIndex, np.ndarray]:
+    """
+    Finds in the diamonds search index the n rows with the same features
+    (cut, color, clarity) and the most similar weight (carat).
+
+    Parameters
+    ----------
+    data: (DiamondFeaturesForSearchSchema)
+        Schema with the expected features values to search.
+
+    Returns
+    -------
+    (tuple[DiamondSearchIndex, np.ndarray])
+        The search index and the found rows, in the dataset order.
+
+    Raises
+    ------
+    ValueError:
+        Raises when the received carat's value is zero or there is no result for the applied filter.
+    """
+    time_stage = metrics_service.StageTimer
+    try:
+        with time_stage("search", "validation"):
+            validate_data_has_no_zero_values(data)
+
+        with time_stage("search", "index"):
+            index = search_index_service.search_index_cache.get()
+
+        with time_stage("search", "feature_filter"):
+            partition_id = search_index_service.get_partition_id(
+                cut=data.cut, color=data.color, clarity=data.clarity
+            )
+            if index.is_partition_empty(partition_id):
+                raise ValueError("It was not found diamonds for the chosen features.")
+
+        with time_stage("search", "weight_filter"):
+            rows = find_rows_with_most_similar_weight(
+                index=index, partition_id=partition_id, weight=data.carat, n=data.n
+            )
+
+        return index, rows
+
+    except ValueError as e:
+        logger.error(f"Error trying to search diamond. [Details]: {e}")
+        raise e
 
 
 def search_diamond_by_features_and_similar_weight(
     data: DiamondFeaturesForSearchSchema,
 ) -> list[dict]:
     """
-    Search in the diamonds csv for values with the same features (cut, color, clarity)
-    and similar weight (carat).
+    Search in the diamonds search index for the n values with the same features
+    (cut, color, clarity) and the most similar weight (carat).
 
     Parameters
     ----------
@@ -234,20 +688,76 @@ def search_diamond_by_features_and_similar_weight(
         Raises when the received carat's value is zero or there is no result for the applied filter.
 
     """
+    index, rows = find_diamonds_by_features_and_similar_weight(data)
+
+    with metrics_service.StageTimer("search", "to_dict"):
+        list_of_dataframes_as_dict = index.get_records(rows)
+
+    return list_of_dataframes_as_dict
+
+
+def search_similar_diamonds(data: DiamondFeaturesForSimilaritySearchSchema) -> list[dict]:
+    """
+    Search in the diamonds search index for the n diamonds with the same
+    features (cut, color, clarity) nearest to the received carat, depth, table
+    and dimensions, each numeric feature weighted by `data.weights`.
+
+    Parameters
+    ----------
+    data: (DiamondFeaturesForSimilaritySearchSchema)
+        Schema with the expected features values and weights to search.
+
+    Returns
+    -------
+    (list[dict])
+        The found diamonds, nearest first, each with its `distance`.
+
+    Raises
+    ------
+    ValueError:
+        Raises when a received feature's value or every weight is zero, or
+        there is no result for the applied filter.
+    """
+    time_stage = metrics_service.StageTimer
     try:
-        validate_data_has_no_zero_values(data)
+        with time_stage("similarity_search", "validation"):
+            validate_data_has_no_zero_values(data)
+            features = np.array(
+                [getattr(data, feature) for feature in search_index_service.SIMILARITY_FEATURES],
+                dtype=np.float64,
+            )
+            weights = np.array(
+                [
+                    getattr(data.weights, feature)
+                    for feature in search_index_service.SIMILARITY_FEATURES
+                ],
+                dtype=np.float64,
+            )
+            if not weights.any():
+                raise ValueError("At least one weight must have value grather than 0.")
 
-        df = dataset_service.create_dataframe_from_csv("data/diamonds.csv")
+        with time_stage("similarity_search", "index"):
+            index = search_index_service.search_index_cache.get()
 
-        filtered_df = filter_diamonds_df_by_features(df=df, features=data)
-        filtered_df = diamonds_df_filtered_by_similar_weight(
-            df=filtered_df, weight=data.carat
-        )
+        with time_stage("similarity_search", "feature_filter"):
+            partition_id = search_index_service.get_partition_id(
+                cut=data.cut, color=data.color, clarity=data.clarity
+            )
+            if index.is_partition_empty(partition_id):
+                raise ValueError("It was not found diamonds for the chosen features.")
 
-        list_of_dataframes_as_dict = filtered_df.to_dict("records")
+        with time_stage("similarity_search", "nearest_neighbors"):
+            rows, distances = index.find_most_similar_rows(
+                partition_id=partition_id, features=features, weights=weights, n=data.n
+            )
 
-        return list_of_dataframes_as_dict
+        with time_stage("similarity_search", "to_dict"):
+            records = index.get_records(rows)
+            for record, distance in zip(records, distances.tolist()):
+                record["distance"] = distance
+
+        return records
 
     except ValueError as e:
-        logger.error(f"Error trying to search diamond. [Details]: {e}")
+        logger.error(f"Error trying to search similar diamonds. [Details]: {e}")
         raise e
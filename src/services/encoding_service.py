@@ -0,0 +1,186 @@
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.schemas.diamond_schema import DiamondFeaturesForPredictionSchema
+from src.utils.enums.diamonds_enums import (
+    DiamondClarityEnum,
+    DiamondColorEnum,
+    DiamondColumnsEnum,
+    DiamondCutEnum,
+)
+
+
+def create_category_codes(enum: type) -> dict:
+    """
+    Maps each category of the enum, and its value, to its ordinal code.
+
+    Parameters
+    ----------
+    enum: (type)
+        The enum with the categories, in order.
+
+    Returns
+    -------
+    (dict)
+        The code of each category, keyed by both the enum member and its value.
+    """
+    codes = {}
+    for code, category in enumerate(enum):
+        codes[category] = code
+        codes[category.value] = code
+
+    return codes
+
+
+CATEGORY_CODES: dict[str, dict] = {
+    DiamondColumnsEnum.CUT.value: create_category_codes(DiamondCutEnum),
+    DiamondColumnsEnum.COLOR.value: create_category_codes(DiamondColorEnum),
+    DiamondColumnsEnum.CLARITY.value: create_category_codes(DiamondClarityEnum),
+}
+
+
+class DiamondFeatureEncoder:
+    """
+    Encodes diamonds into the numeric input of the model, without pandas.
+
+    The categorical features are written as the same ordinal codes used by
+    `prepare_diamond_df_for_xgboost_model`, and every feature is written as
+    float32 in the model's feature order, so the predictions are the same as
+    the ones made from the prepared dataframe.
+
+    Parameters
+    ----------
+    feature_names: (tuple[str, ...])
+        The features of the model, in order.
+    """
+
+    def __init__(self, feature_names: tuple[str, ...]):
+        self.feature_names = feature_names
+        self._features = [
+            (position, feature_name, CATEGORY_CODES.get(feature_name))
+            for position, feature_name in enumerate(feature_names)
+        ]
+        self._local = threading.local()
+
+    def encode(self, data: DiamondFeaturesForPredictionSchema) -> np.ndarray:
+        """
+        Encodes a single diamond into a (1, n_features) array.
+
+        The array is a buffer reused by the next call in the same thread, so
+        it must be used before encoding another diamond.
+
+        Parameters
+        ----------
+        data: (DiamondFeaturesForPredictionSchema)
+            Data of the diamond.
+
+        Returns
+        -------
+        (np.ndarray)
+            The encoded features.
+
+        Raises
+        ------
+        KeyError:
+            Raises if a categorical feature has an unknown category.
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = np.empty((1, len(self.feature_names)), dtype=np.float32)
+            self._local.buffer = buffer
+
+        row = buffer[0]
+        for position, feature_name, codes in self._features:
+            value = getattr(data, feature_name)
+            row[position] = value if codes is None else codes[value]
+
+        return buffer
+
+    def encode_many(self, data: list[DiamondFeaturesForPredictionSchema]) -> np.ndarray:
+        """
+        Encodes many diamonds into a (n_diamonds, n_features) array.
+
+        Parameters
+        ----------
+        data: (list[DiamondFeaturesForPredictionSchema])
+            Data of the diamonds.
+
+        Returns
+        -------
+        (np.ndarray)
+            The encoded features, one row per diamond.
+
+        Raises
+        ------
+        KeyError:
+            Raises if a categorical feature has an unknown category.
+        """
+        features = np.empty((len(data), len(self.feature_names)), dtype=np.float32)
+        for position, feature_name, codes in self._features:
+            if codes is None:
+                features[:, position] = [getattr(row, feature_name) for row in data]
+            else:
+                features[:, position] = [codes[getattr(row, feature_name)] for row in data]
+
+        return features
+
+    def encode_dataframe(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Encodes the rows of a dataframe into a (n_rows, n_features) array, one
+        column at a time.
+
+        Parameters
+        ----------
+        df: (DataFrame)
+            The diamonds, with numeric columns and the categorical columns as
+            categoricals of the categories of the enums, in order.
+
+        Returns
+        -------
+        (np.ndarray)
+            The encoded features, one row per diamond.
+        """
+        features = np.empty((len(df), len(self.feature_names)), dtype=np.float32)
+        for position, feature_name, codes in self._features:
+            if codes is None:
+                features[:, position] = df[feature_name].to_numpy(dtype=np.float32)
+            else:
+                features[:, position] = df[feature_name].cat.codes.to_numpy()
+
+        return features
+
+
+@lru_cache(maxsize=8)
+def get_encoder(feature_names: tuple[str, ...]) -> DiamondFeatureEncoder:
+    """
+    Returns the encoder for the received feature order, creating it on first use.
+
+    Parameters
+    ----------
+    feature_names: (tuple[str, ...])
+        The features of the model, in order.
+
+    Returns
+    -------
+    (DiamondFeatureEncoder)
+    """
+    return DiamondFeatureEncoder(feature_names)
+
+
+def get_model_encoder(model) -> DiamondFeatureEncoder:
+    """
+    Returns the encoder for the features the model was fitted with.
+
+    Parameters
+    ----------
+    model: (XGBRegressor)
+        A fitted model with `feature_names_in_`.
+
+    Returns
+    -------
+    (DiamondFeatureEncoder)
+    """
+    return get_encoder(tuple(model.feature_names_in_))
@@ -0,0 +1,224 @@
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.schemas.diamond_schema import DiamondFeaturesForPredictionSchema
+from src.utils.enums.diamonds_enums import (
+    DiamondClarityEnum,
+    DiamondColorEnum,
+    DiamondColumnsEnum,
+    DiamondCutEnum,
+)
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES: dict[str, list[str]] = {
+    DiamondColumnsEnum.CUT.value: [cut.value for cut in DiamondCutEnum],
+    DiamondColumnsEnum.COLOR.value: [color.value for color in DiamondColorEnum],
+    DiamondColumnsEnum.CLARITY.value: [clarity.value for clarity in DiamondClarityEnum],
+}
+NUMERIC_FEATURES = [
+    DiamondColumnsEnum.CARAT.value,
+    DiamondColumnsEnum.DEPTH.value,
+    DiamondColumnsEnum.TABLE.value,
+    DiamondColumnsEnum.X.value,
+    DiamondColumnsEnum.Y.value,
+    DiamondColumnsEnum.Z.value,
+]
+
+
+@dataclass(frozen=True)
+class LinearPriceModel:
+    """
+    The log-linear price model, reduced to its coefficients.
+
+    The categorical features are one-hot encoded at training time, so their
+    coefficients are stored as a weight per category, 0 for the dropped
+    reference category. A prediction is the intercept plus the weighted
+    numeric features plus the weight of each category, and the exponential of
+    that sum, with no sklearn or pandas involved.
+
+    Attributes
+    ----------
+    intercept: (float)
+        The intercept of the regression on the log of the price.
+    numeric_weights: (tuple[tuple[str, float], ...])
+        The coefficient of each numeric feature.
+    category_weights: (tuple[tuple[str, dict[str, float]], ...])
+        The weight of each category of each categorical feature.
+    """
+
+    intercept: float
+    numeric_weights: tuple[tuple[str, float], ...]
+    category_weights: tuple[tuple[str, dict[str, float]], ...]
+
+    @classmethod
+    def from_coefficients(
+        cls, intercept: float, coefficients: dict[str, float]
+    ) -> "LinearPriceModel":
+        """
+        Builds the model from the coefficients of the regression, keyed by the
+        names of its features: the numeric columns and the `<column>_<category>`
+        dummies of `pd.get_dummies`.
+
+        Parameters
+        ----------
+        intercept: (float)
+            The intercept of the regression.
+        coefficients: (dict[str, float])
+            The coefficient of each feature.
+
+        Returns
+        -------
+        (LinearPriceModel)
+
+        Raises
+        ------
+        ValueError:
+            Raises if a feature isn't a diamond feature or a known category.
+        """
+        numeric_weights = []
+        category_weights = {}
+        for feature_name, weight in coefficients.items():
+            if feature_name in NUMERIC_FEATURES:
+                numeric_weights.append((feature_name, float(weight)))
+                continue
+
+            column_name, _, category = feature_name.partition("_")
+            if category not in CATEGORIES.get(column_name, []):
+                raise ValueError(f"Unknown feature of the linear model: {feature_name}.")
+            category_weights.setdefault(
+                column_name, dict.fromkeys(CATEGORIES[column_name], 0.0)
+            )[category] = float(weight)
+
+        return cls(
+            intercept=float(intercept),
+            numeric_weights=tuple(numeric_weights),
+            category_weights=tuple(category_weights.items()),
+        )
+
+    def predict_price(self, data: DiamondFeaturesForPredictionSchema) -> float:
+        """
+        Predicts the price of a single diamond.
+
+        Parameters
+        ----------
+        data: (DiamondFeaturesForPredictionSchema)
+            Data of the diamond.
+
+        Returns
+        -------
+        (float)
+        """
+        log_price = self.intercept
+        for feature_name, weight in self.numeric_weights:
+            log_price += weight * getattr(data, feature_name)
+        for column_name, weights in self.category_weights:
+            log_price += weights[getattr(data, column_name).value]
+
+        return math.exp(log_price)
+
+    def predict_prices(self, data: list[DiamondFeaturesForPredictionSchema]) -> np.ndarray:
+        """
+        Predicts the prices of many diamonds, one feature column at a time.
+
+        Parameters
+        ----------
+        data: (list[DiamondFeaturesForPredictionSchema])
+            Data of the diamonds.
+
+        Returns
+        -------
+        (np.ndarray)
+        """
+        log_prices = np.full(len(data), self.intercept)
+        for feature_name, weight in self.numeric_weights:
+            log_prices += weight * np.array([getattr(row, feature_name) for row in data])
+        for column_name, weights in self.category_weights:
+            log_prices += np.array([weights[getattr(row, column_name).value] for row in data])
+
+        return np.exp(log_prices)
+
+    def predict_dataframe(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Predicts the prices of the rows of a dataframe, one column at a time.
+
+        Parameters
+        ----------
+        df: (DataFrame)
+            The diamonds, with numeric columns and the categorical columns as
+            categoricals of the categories of the enums, in order.
+
+        Returns
+        -------
+        (np.ndarray)
+        """
+        log_prices = np.full(len(df), self.intercept)
+        for feature_name, weight in self.numeric_weights:
+            log_prices += weight * df[feature_name].to_numpy(dtype=np.float64)
+        for column_name, weights in self.category_weights:
+            category_weights = np.array([weights[category] for category in CATEGORIES[column_name]])
+            log_prices += category_weights[df[column_name].cat.codes.to_numpy()]
+
+        return np.exp(log_prices)
+
+
+def load_linear_model_from_bytes(raw_model: bytes) -> LinearPriceModel:
+    """
+    Loads the linear model from the JSON written by the training pipeline,
+    with its `intercept` and its `coefficients` keyed by feature name.
+
+    Parameters
+    ----------
+    raw_model: (bytes)
+        The content of the JSON file.
+
+    Returns
+    -------
+    (LinearPriceModel)
+
+    Raises
+    ------
+    ValueError:
+        Raises if the content isn't a valid linear model.
+    """
+    try:
+        content = json.loads(raw_model)
+        return LinearPriceModel.from_coefficients(
+            intercept=content["intercept"], coefficients=content["coefficients"]
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        logger.error(f"Error loading linear model. [Details]: {e}")
+        raise ValueError(f"Invalid linear model: {e}") from e
+
+
+def get_linear_model_format(raw_model: bytes) -> str:
+    """
+    Returns the format of a linear model artifact, which is always JSON.
+    """
+    return "json"
+
+
+def warm_up_linear_model(model: LinearPriceModel) -> float:
+    """
+    Runs a synthetic prediction and returns how long it took, in seconds.
+    """
+    data = DiamondFeaturesForPredictionSchema(
+        carat=1.0,
+        cut=DiamondCutEnum.ideal,
+        color=DiamondColorEnum.g,
+        clarity=DiamondClarityEnum.vs1,
+        depth=61.8,
+        table=57.0,
+        x=5.7,
+        y=5.7,
+        z=3.5,
+    )
+    start = time.perf_counter()
+    model.predict_price(data)
+    return time.perf_counter() - start
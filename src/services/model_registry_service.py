@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+import pandas as pd
+from xgboost.sklearn import XGBModel
+
+from src.config import app_config
+from src.schemas.model_registry_schema import (
+    ModelFeatureSchema,
+    ModelLivePointerSchema,
+    ModelMetricsSchema,
+    ModelVersionSchema,
+)
+
+logger = logging.getLogger(__name__)
+
+NATIVE_ARTIFACT_FILE_NAME = "model.ubj"
+PICKLE_ARTIFACT_FILE_NAME = "model.pkl"
+METADATA_FILE_NAME = "metadata.json"
+LIVE_POINTER_FILE_NAME = "LIVE"
+
+
+def compute_file_sha256(path: str) -> str:
+    """
+    Returns the SHA-256 hash of the content of a file.
+
+    Parameters
+    ----------
+    path: (str)
+        The file path.
+
+    Returns
+    -------
+    (str)
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def create_feature_schema(df: pd.DataFrame) -> list[ModelFeatureSchema]:
+    """
+    Describes the features a model was trained with: their names and types, in
+    order, and the categories of the categorical ones.
+
+    Parameters
+    ----------
+    df: (DataFrame)
+        The features the model was trained with.
+
+    Returns
+    -------
+    (list[ModelFeatureSchema])
+    """
+    feature_schema = []
+    for column_name, dtype in df.dtypes.items():
+        categories = None
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = [str(category) for category in dtype.categories]
+        feature_schema.append(
+            ModelFeatureSchema(name=column_name, dtype=str(dtype), categories=categories)
+        )
+
+    return feature_schema
+
+
+def serialize_model(
+    model, native_file_name: str = NATIVE_ARTIFACT_FILE_NAME
+) -> tuple[bytes, str]:
+    """
+    Serializes a model for the registry: XGBoost models in XGBoost's native
+    format, which loads faster and doesn't depend on the Python and xgboost
+    versions, and any other model pickled.
+
+    Parameters
+    ----------
+    model: (Any)
+        The fitted model.
+    native_file_name: (str)
+        The file name of XGBoost models, whose extension (`.ubj` or `.json`)
+        chooses the native format.
+
+    Returns
+    -------
+    (tuple[bytes, str])
+        The content of the artifact and its file name.
+    """
+    if isinstance(model, XGBModel):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, native_file_name)
+            model.save_model(path)
+            with open(path, "rb") as f:
+                return f.read(), native_file_name
+
+    return pickle.dumps(model), PICKLE_ARTIFACT_FILE_NAME
+
+
+def write_file_atomically(path: str, content: bytes) -> None:
+    """
+    Writes the content to a temporary file and renames it to `path`, so readers
+    see either the previous or the new content, never a partial one.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """
+    Local registry of versioned model artifacts.
+
+    Each version is stored in `<root>/<name>/<version>/` with the artifact and
+    a `metadata.json` holding its training metrics, the hash of the training
+    data and the feature schema. The version is the short content hash of the
+    artifact, the same one the API returns in the `X-Model-Version` header.
+    The `LIVE` file points to the version that is served and to the previous
+    one, and it's replaced atomically on every promotion.
+
+    Parameters
+    ----------
+    root: (str)
+        The directory of the registry.
+    name: (str)
+        The name of the model.
+    """
+
+    def __init__(self, root: str, name: str):
+        self.root = root
+        self.name = name
+        self.model_dir = os.path.join(root, name)
+
+    def register(
+        self,
+        model,
+        metrics: ModelMetricsSchema,
+        data_sha256: str,
+        feature_schema: list[ModelFeatureSchema],
+    ) -> ModelVersionSchema:
+        """
+        Stores a new version of the model. Registering the same artifact again
+        returns the existing version.
+
+        Parameters
+        ----------
+        model: (Any)
+            The fitted model.
+        metrics: (ModelMetricsSchema)
+            The metrics of the model on the test data.
+        data_sha256: (str)
+            The hash of the data the model was trained with.
+        feature_schema: (list[ModelFeatureSchema])
+            The features of the model, in order.
+
+        Returns
+        -------
+        (ModelVersionSchema)
+        """
+        raw_model, artifact_file_name = serialize_model(model)
+        version = hashlib.sha256(raw_model).hexdigest()[:12]
+        version_dir = os.path.join(self.model_dir, version)
+        if os.path.exists(version_dir):
+            return self.get_version(version)
+
+        model_version = ModelVersionSchema(
+            name=self.name,
+            version=version,
+            created_at=datetime.now(timezone.utc),
+            artifact=artifact_file_name,
+            metrics=metrics,
+            data_sha256=data_sha256,
+            feature_schema=feature_schema,
+        )
+
+        tmp_dir = os.path.join(self.model_dir, f".{version}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        with open(os.path.join(tmp_dir, artifact_file_name), "wb") as f:
+            f.write(raw_model)
+        with open(os.path.join(tmp_dir, METADATA_FILE_NAME), "w") as f:
+            f.write(model_version.model_dump_json(indent=2))
+        os.replace(tmp_dir, version_dir)
+
+        logger.info(f"Registered {self.name} version {version}.")
+        return model_version
+
+    def list_versions(self) -> list[ModelVersionSchema]:
+        """
+        Returns the registered versions, from the oldest to the newest.
+        """
+        if not os.path.isdir(self.model_dir):
+            return []
+
+        versions = [
+            self.get_version(version)
+            for version in os.listdir(self.model_dir)
+            if not version.startswith(".")
+            and os.path.isfile(os.path.join(self.model_dir, version, METADATA_FILE_NAME))
+        ]
+        return sorted(versions, key=lambda model_version: model_version.created_at)
+
+    def get_version(self, version: str) -> ModelVersionSchema:
+        """
+        Returns the metadata of a version.
+
+        Raises
+        ------
+        KeyError:
+            Raises if the version isn't registered.
+        """
+        metadata_path = os.path.join(self.model_dir, version, METADATA_FILE_NAME)
+        if version.startswith(".") or os.path.sep in version or not os.path.isfile(metadata_path):
+            raise KeyError(f"Model version {version} is not registered.")
+
+        with open(metadata_path) as f:
+            return ModelVersionSchema.model_validate_json(f.read())
+
+    def get_artifact_path(self, version: str) -> str:
+        """
+        Returns the path of the artifact of a version.
+
+        Raises
+        ------
+        KeyError:
+            Raises if the version isn't registered.
+        """
+        model_version = self.get_version(version)
+        return os.path.join(self.model_dir, version, model_version.artifact)
+
+    def get_live(self) -> ModelLivePointerSchema | None:
+        """
+        Returns the live pointer, or None if no version was promoted.
+        """
+        try:
+            with open(os.path.join(self.model_dir, LIVE_POINTER_FILE_NAME)) as f:
+                return ModelLivePointerSchema.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def get_live_artifact_path(self) -> str | None:
+        """
+        Returns the path of the artifact of the live version, or None if no
+        version was promoted.
+        """
+        live = self.get_live()
+        if live is None:
+            return None
+
+        return self.get_artifact_path(live.version)
+
+    def promote(self, version: str) -> ModelLivePointerSchema:
+        """
+        Makes a version live, keeping the current live version as the previous one.
+
+        Raises
+        ------
+        KeyError:
+            Raises if the version isn't registered.
+        """
+        self.get_version(version)
+        live = self.get_live()
+        if live is not None and live.version == version:
+            return live
+
+        new_live = ModelLivePointerSchema(
+            version=version,
+            previous_version=live.version if live is not None else None,
+            promoted_at=datetime.now(timezone.utc),
+        )
+        write_file_atomically(
+            os.path.join(self.model_dir, LIVE_POINTER_FILE_NAME),
+            new_live.model_dump_json(indent=2).encode("utf-8"),
+        )
+        logger.info(f"Promoted {self.name} version {version} to live.")
+        return new_live
+
+
+model_registry = ModelRegistry(
+    root=app_config.MODEL_REGISTRY_PATH,
+    name=app_config.MODEL_NAME,
+)
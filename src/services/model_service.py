@@ -1,8 +1,25 @@
+import asyncio
+import hashlib
 import logging
-import pandas as pd
+import os
 import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+from xgboost.core import XGBoostError
 from xgboost.sklearn import XGBRegressor
 
+from src.config import app_config
+from src.schemas.model_registry_schema import ServedModelSchema
+from src.services import linear_model_service, metrics_service
+from src.services.model_registry_service import ModelRegistry, model_registry
+
 
 logger = logging.getLogger(__name__)
 
@@ -13,14 +30,14 @@ def load_pickle_model(path: str) -> any:
 
     Parameters
     ----------
-    path: (str) 
+    path: (str)
         The file path of the pickle file containing the model.
 
     Returns
     -------
     model: (Any)
         The loaded model object.
-    
+
     Raises
     ------
     FileNotFoundError:
@@ -37,6 +54,490 @@ def load_pickle_model(path: str) -> any:
         raise e
 
 
+def load_pickle_model_from_bytes(raw_model: bytes) -> any:
+    """
+    Loads a pickled model from the raw content of its artifact.
+
+    Parameters
+    ----------
+    raw_model: (bytes)
+        The content of the pickle file containing the model.
+
+    Returns
+    -------
+    model: (Any)
+        The loaded model object.
+
+    Raises
+    ------
+    pickle.UnpicklingError:
+        Raises if there is an error during the unpickling process.
+    """
+    try:
+        return pickle.loads(raw_model)
+    except (pickle.UnpicklingError, EOFError) as e:
+        logger.error(f"Error unpickling model. [Details]: {e}")
+        raise pickle.UnpicklingError(str(e)) from e
+
+
+def load_native_xgboost_model_from_bytes(raw_model: bytes) -> XGBRegressor:
+    """
+    Loads an XGBoost model saved in XGBoost's native UBJSON or JSON format.
+
+    Parameters
+    ----------
+    raw_model: (bytes)
+        The content of the `.ubj` or `.json` file saved by `XGBRegressor.save_model`.
+
+    Returns
+    -------
+    model: (XGBRegressor)
+        The loaded model.
+
+    Raises
+    ------
+    ValueError:
+        Raises if the content isn't a valid XGBoost model.
+    """
+    try:
+        model = XGBRegressor()
+        model.load_model(bytearray(raw_model))
+        return model
+    except XGBoostError as e:
+        logger.error(f"Error loading XGBoost model. [Details]: {e}")
+        raise ValueError(f"Invalid XGBoost model: {e}") from e
+
+
+def get_model_format(raw_model: bytes) -> str:
+    """
+    Returns the format of a model artifact: "pickle" or "xgboost" for the
+    native UBJSON and JSON formats.
+
+    Parameters
+    ----------
+    raw_model: (bytes)
+        The content of the artifact.
+
+    Returns
+    -------
+    (str)
+    """
+    if raw_model[:1] == b"\x80":
+        return "pickle"
+
+    return "xgboost"
+
+
+def load_model_from_bytes(raw_model: bytes) -> Any:
+    """
+    Loads a model from the content of its artifact, in XGBoost's native format
+    or, as a fallback, pickled.
+
+    Parameters
+    ----------
+    raw_model: (bytes)
+        The content of the artifact.
+
+    Returns
+    -------
+    model: (Any)
+        The loaded model object.
+
+    Raises
+    ------
+    pickle.UnpicklingError:
+        Raises if the pickled model can't be unpickled.
+    ValueError:
+        Raises if the native model can't be loaded.
+    """
+    if get_model_format(raw_model) == "pickle":
+        return load_pickle_model_from_bytes(raw_model)
+
+    return load_native_xgboost_model_from_bytes(raw_model)
+
+
+def warm_up_model(model: Any) -> float | None:
+    """
+    Runs a synthetic prediction, so the lazy initialization of the model is
+    paid before it serves requests.
+
+    Parameters
+    ----------
+    model: (Any)
+        The loaded model.
+
+    Returns
+    -------
+    (float | None)
+        How long the first prediction took, in seconds, or None if the model
+        doesn't describe its features.
+    """
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features is None:
+        return None
+
+    start = time.perf_counter()
+    predict_features(np.zeros((1, n_features), dtype=np.float32), model)
+    return time.perf_counter() - start
+
+
+@dataclass(frozen=True)
+class ServedModel:
+    """
+    A loaded model together with the identity of the artifact it came from.
+
+    Attributes
+    ----------
+    model: (Any)
+        The loaded model object.
+    version: (str)
+        Short content hash (sha256) of the artifact, used as the model version.
+    path: (str)
+        The artifact path.
+    mtime_ns: (int)
+        Modification time of the artifact when it was loaded.
+    loaded_at: (datetime)
+        When the model was loaded into memory.
+    format: (str)
+        The format of the artifact, "pickle", "xgboost" or "json" for the linear model.
+    load_seconds: (float)
+        How long reading and loading the artifact took.
+    first_inference_seconds: (float | None)
+        How long the warm-up prediction took.
+    """
+
+    model: Any
+    version: str
+    path: str
+    mtime_ns: int
+    loaded_at: datetime
+    format: str = "pickle"
+    load_seconds: float = 0.0
+    first_inference_seconds: float | None = None
+
+
+class ModelCache:
+    """
+    Process-wide cache of the served model.
+
+    The artifact is loaded once and shared by every request. A background
+    watcher polls the artifact's mtime and, when it changes and the content
+    hash differs, loads the new model and swaps it in with a single reference
+    assignment, so in-flight requests keep the model they already got.
+    If the new artifact can't be loaded, the current model keeps being served.
+    Every model runs a warm-up prediction when it's loaded, before serving.
+
+    With a registry, the served artifact is the one of the registry's live
+    version, falling back to `path` while no version was promoted. The model
+    that was served before the last swap is kept loaded, so rolling back to it
+    doesn't load it again.
+
+    Parameters
+    ----------
+    path: (str)
+        The artifact path.
+    reload_interval_seconds: (float)
+        How often the watcher checks the artifact for changes.
+    loader: (Callable[[bytes], Any])
+        Builds the model from the artifact content.
+    warm_up: (Callable[[Any], float | None])
+        Runs the warm-up prediction of a loaded model and returns its duration.
+    get_format: (Callable[[bytes], str])
+        Returns the format of the artifact content.
+    registry: (ModelRegistry | None)
+        The registry whose live version is served.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reload_interval_seconds: float,
+        loader: Callable[[bytes], Any] = load_model_from_bytes,
+        registry: ModelRegistry | None = None,
+        warm_up: Callable[[Any], float | None] = warm_up_model,
+        get_format: Callable[[bytes], str] = get_model_format,
+    ):
+        self.path = path
+        self.reload_interval_seconds = reload_interval_seconds
+        self.registry = registry
+        self._loader = loader
+        self._warm_up = warm_up
+        self._get_format = get_format
+        self._served_model: ServedModel | None = None
+        self._previous_model: ServedModel | None = None
+        # Whether the last reload found no artifact, so it's logged once.
+        self._is_artifact_missing = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher: threading.Thread | None = None
+
+    def get(self) -> ServedModel:
+        """
+        Returns the served model, loading it on first use.
+
+        Raises
+        ------
+        FileNotFoundError:
+            Raises if there is no model loaded and the artifact doesn't exist.
+        pickle.UnpicklingError:
+            Raises if there is no model loaded and the pickled artifact can't be loaded.
+        ValueError:
+            Raises if there is no model loaded and the native artifact can't be loaded.
+        """
+        served_model = self._served_model
+        if served_model is None:
+            with self._lock:
+                if self._served_model is None:
+                    path = self._get_artifact_path()
+                    self._served_model = self._load(path, os.stat(path).st_mtime_ns)
+                served_model = self._served_model
+
+        return served_model
+
+    def get_if_loaded(self) -> ServedModel | None:
+        """
+        Returns the served model, or None if it wasn't loaded yet.
+        """
+        return self._served_model
+
+    def get_previous(self) -> ServedModel | None:
+        """
+        Returns the model served before the last swap, kept loaded for rollbacks.
+        """
+        return self._previous_model
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the model if the artifact, or the registry's live version, changed
+        since it was loaded.
+
+        Returns
+        -------
+        (bool)
+            True if a new model version was swapped in.
+        """
+        with self._lock:
+            current = self._served_model
+            try:
+                path = self._get_artifact_path()
+                mtime_ns = os.stat(path).st_mtime_ns
+            except (FileNotFoundError, KeyError) as e:
+                if current is None:
+                    # Optional artifacts, e.g. the linear model, may never be deployed.
+                    logger.debug(f"Model artifact not found. [Details]: {e}")
+                elif not self._is_artifact_missing:
+                    logger.warning(f"Model artifact not found, keeping current model. [Details]: {e}")
+                self._is_artifact_missing = True
+                return False
+            self._is_artifact_missing = False
+
+            if current is not None and (current.path, current.mtime_ns) == (path, mtime_ns):
+                return False
+
+            previous = self._previous_model
+            if previous is not None and (previous.path, previous.mtime_ns) == (path, mtime_ns):
+                self._served_model, self._previous_model = previous, current
+                logger.info(f"Serving warm model version {previous.version} from {path}.")
+                return True
+
+            try:
+                new_model = self._load(path, mtime_ns)
+            except (pickle.UnpicklingError, ValueError, FileNotFoundError) as e:
+                logger.error(f"Error reloading model, keeping current model. [Details]: {e}")
+                return False
+
+            if current is not None and current.version == new_model.version:
+                self._served_model = replace(current, path=path, mtime_ns=mtime_ns)
+                return False
+
+            self._served_model = new_model
+            if current is not None:
+                self._previous_model = current
+            logger.info(f"Serving model version {new_model.version} from {path}.")
+            return True
+
+    def start_watcher(self) -> None:
+        """
+        Starts the background thread that reloads the model when the artifact changes.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, name="model-cache-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        """
+        Stops the background watcher and waits for it to finish.
+        """
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.reload_interval_seconds):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"Error watching model artifact. [Details]: {e}")
+
+    def _get_artifact_path(self) -> str:
+        if self.registry is not None:
+            live_artifact_path = self.registry.get_live_artifact_path()
+            if live_artifact_path is not None:
+                return live_artifact_path
+
+        return self.path
+
+    def _load(self, path: str, mtime_ns: int) -> ServedModel:
+        start = time.perf_counter()
+        with metrics_service.StageTimer("model", "load"):
+            with open(path, "rb") as f:
+                raw_model = f.read()
+            model = self._loader(raw_model)
+        load_seconds = time.perf_counter() - start
+        with metrics_service.StageTimer("model", "warm_up"):
+            first_inference_seconds = self._warm_up(model)
+
+        served_model = ServedModel(
+            model=model,
+            version=hashlib.sha256(raw_model).hexdigest()[:12],
+            path=path,
+            mtime_ns=mtime_ns,
+            loaded_at=datetime.now(),
+            format=self._get_format(raw_model),
+            load_seconds=load_seconds,
+            first_inference_seconds=first_inference_seconds,
+        )
+        logger.info(
+            f"Loaded model version {served_model.version} ({served_model.format}) in "
+            f"{load_seconds:.3f}s, first inference took "
+            f"{'-' if first_inference_seconds is None else f'{first_inference_seconds:.3f}s'}."
+        )
+        return served_model
+
+
+model_cache = ModelCache(
+    path=app_config.MODEL_PATH,
+    reload_interval_seconds=app_config.MODEL_RELOAD_INTERVAL_SECONDS,
+    registry=model_registry,
+)
+
+linear_model_cache = ModelCache(
+    path=app_config.LINEAR_MODEL_PATH,
+    reload_interval_seconds=app_config.MODEL_RELOAD_INTERVAL_SECONDS,
+    loader=linear_model_service.load_linear_model_from_bytes,
+    warm_up=linear_model_service.warm_up_linear_model,
+    get_format=linear_model_service.get_linear_model_format,
+)
+
+def get_served_model_info() -> ServedModelSchema:
+    """
+    Returns the live version of the registry and the model versions loaded in
+    this worker: the served one and the previous one kept warm for rollbacks.
+    """
+    served_model = model_cache.get_if_loaded()
+    previous_model = model_cache.get_previous()
+    return ServedModelSchema(
+        live=model_registry.get_live(),
+        served_version=served_model.version if served_model is not None else None,
+        served_path=served_model.path if served_model is not None else None,
+        served_format=served_model.format if served_model is not None else None,
+        served_load_seconds=served_model.load_seconds if served_model is not None else None,
+        served_first_inference_seconds=(
+            served_model.first_inference_seconds if served_model is not None else None
+        ),
+        warm_previous_version=previous_model.version if previous_model is not None else None,
+    )
+
+
+def promote_model_version(version: str) -> ServedModelSchema:
+    """
+    Makes a registered version live and swaps it in right away in this worker.
+    The other workers swap it in on their next artifact check.
+
+    If the version can't be loaded, the previous live version is restored.
+
+    Parameters
+    ----------
+    version: (str)
+        The version to promote.
+
+    Returns
+    -------
+    (ServedModelSchema)
+
+    Raises
+    ------
+    KeyError:
+        Raises if the version isn't registered.
+    ValueError:
+        Raises if the version can't be loaded.
+    """
+    previous_live = model_registry.get_live()
+    model_registry.promote(version)
+    model_cache.reload_if_changed()
+    if model_cache.get().version != version:
+        if previous_live is not None:
+            model_registry.promote(previous_live.version)
+        model_cache.reload_if_changed()
+        raise ValueError(f"Model version {version} could not be loaded.")
+
+    return get_served_model_info()
+
+
+def rollback_model_version() -> ServedModelSchema:
+    """
+    Makes the previous live version live again. When this worker still has it
+    loaded, the swap doesn't load the model again.
+
+    Returns
+    -------
+    (ServedModelSchema)
+
+    Raises
+    ------
+    ValueError:
+        Raises if there is no previous version to roll back to.
+    """
+    live = model_registry.get_live()
+    if live is None or live.previous_version is None:
+        raise ValueError("There is no previous model version to roll back to.")
+
+    return promote_model_version(live.previous_version)
+
+
+inference_executor = ThreadPoolExecutor(
+    max_workers=app_config.INFERENCE_EXECUTOR_MAX_WORKERS,
+    thread_name_prefix="inference",
+)
+
+
+async def run_in_inference_executor(func: Callable, *args) -> Any:
+    """
+    Runs a CPU-bound function, such as a prediction, in the inference executor,
+    so the event loop keeps serving other requests meanwhile.
+
+    Parameters
+    ----------
+    func: (Callable)
+        The function to run.
+    *args:
+        The arguments of the function.
+
+    Returns
+    -------
+    (Any)
+        The value returned by the function. Exceptions raised by the function are re-raised.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_executor, func, *args)
+
+
 def predict(df: pd.DataFrame, model: XGBRegressor) -> list:
     """
     Makes predictions using a fitted XGBRegressor model.
@@ -70,3 +571,34 @@ def predict(df: pd.DataFrame, model: XGBRegressor) -> list:
     except (ValueError, TypeError) as e:
         logger.error(f"Error during prediction. [Details]: {e}")
         raise e
+
+
+def predict_features(features: np.ndarray, model: XGBRegressor) -> np.ndarray:
+    """
+    Makes predictions using a fitted XGBRegressor model from already encoded features.
+
+    Parameters
+    ----------
+    features: (np.ndarray)
+        A (n_rows, n_features) array in the model's feature order, with the categorical
+        features as ordinal codes, as built by `encoding_service.DiamondFeatureEncoder`.
+    model: (XGBRegressor)
+        A fitted XGBRegressor model object.
+
+    Returns
+    -------
+    np.ndarray:
+        The predicted target values for each row.
+
+    Raises
+    ------
+    ValueError:
+        Raises if the number of features doesn't match the model.
+    TypeError:
+        Raises if the model is not a valid XCGBoost model.
+    """
+    try:
+        return model.predict(features)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Error during prediction. [Details]: {e}")
+        raise e
@@ -0,0 +1,253 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import numpy as np
+
+from src.config import app_config
+from src.schemas.diamond_schema import PredictionBatcherStatsSchema
+from src.services import model_service
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class PendingPrediction:
+    """
+    A single-row prediction waiting to be batched.
+
+    Attributes
+    ----------
+    features: (np.ndarray)
+        The encoded features of the row.
+    model: (Any)
+        The model that predicts the row.
+    future: (Future)
+        Resolved with the predicted price, or the error of the batch.
+    """
+
+    features: np.ndarray
+    model: Any
+    future: Future
+
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent single-row predictions into batched model calls.
+
+    Callers submit one encoded row and wait for its price. A background thread
+    takes the first pending row, collects the rows submitted until the current
+    wait time ends or `max_batch_size` rows are collected, and predicts them
+    with a single call per model, resolving each caller with its own price.
+
+    The wait adapts to the load: it's halved after a batch of a single row, down
+    to no wait at all, and doubled, up to `max_wait_ms`, after a batch of many
+    rows. With light traffic a request is predicted right away, and bursts are
+    coalesced into large batches.
+    When the batcher isn't running, rows are predicted right away by the caller.
+
+    Parameters
+    ----------
+    max_batch_size: (int)
+        The maximum number of rows predicted by a single call. 1 disables batching.
+    max_wait_ms: (float)
+        The maximum time the first row of a batch waits for other rows.
+    timeout_seconds: (float)
+        The maximum time a caller waits for the price of its row.
+    predict: (Callable[[np.ndarray, Any], np.ndarray])
+        Predicts a (n_rows, n_features) array with a model.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        max_wait_ms: float,
+        timeout_seconds: float = 30.0,
+        predict: Callable[[np.ndarray, Any], np.ndarray] = model_service.predict_features,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.timeout_seconds = timeout_seconds
+        self._predict = predict
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        # Held to submit a row and to stop, so no row is queued after the stop sentinel.
+        self._lifecycle_lock = threading.Lock()
+        self._wait_seconds = 0.0
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._predictions = 0
+        self._largest_batch_size = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts the background thread that predicts the batches.
+        """
+        with self._lifecycle_lock:
+            if self.is_running or self.max_batch_size <= 1:
+                return
+
+            self._thread = threading.Thread(
+                target=self._run, name="prediction-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Predicts every pending row and stops the background thread. Rows
+        submitted from now on are predicted right away by their caller.
+        """
+        with self._lifecycle_lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._thread = None
+            self._queue.put(_STOP)
+
+        thread.join()
+        self._predict_pending()
+
+    def predict(self, features: np.ndarray, model: Any) -> float:
+        """
+        Predicts the price of a single row, batched with the rows submitted
+        concurrently by other requests.
+
+        Parameters
+        ----------
+        features: (np.ndarray)
+            A (1, n_features) array, as built by `DiamondFeatureEncoder.encode`.
+        model: (Any)
+            The model that predicts the row.
+
+        Returns
+        -------
+        (float)
+
+        Raises
+        ------
+        (ValueError, TypeError):
+            Raises if the model can't predict the batch of the row.
+        TimeoutError:
+            Raises if the row isn't predicted within `timeout_seconds`.
+        """
+        future = Future()
+        with self._lifecycle_lock:
+            is_running = self.is_running
+            if is_running:
+                self._queue.put(
+                    PendingPrediction(features=features[0].copy(), model=model, future=future)
+                )
+
+        if not is_running:
+            return float(self._predict(features, model)[0])
+
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except TimeoutError as e:
+            logger.error(f"Batched prediction not done in {self.timeout_seconds} s. [Details]: {e}")
+            raise e
+
+    def get_stats(self) -> PredictionBatcherStatsSchema:
+        """
+        Returns the batcher counters.
+        """
+        with self._stats_lock:
+            return PredictionBatcherStatsSchema(
+                running=self.is_running,
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_wait_seconds * 1000,
+                current_wait_ms=self._wait_seconds * 1000,
+                batches=self._batches,
+                predictions=self._predictions,
+                mean_batch_size=self._predictions / self._batches if self._batches else 0.0,
+                largest_batch_size=self._largest_batch_size,
+            )
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            pending = self._queue.get()
+            if pending is _STOP:
+                break
+
+            batch = [pending]
+            deadline = time.monotonic() + self._wait_seconds
+            while len(batch) < self.max_batch_size:
+                try:
+                    pending = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+
+                if pending is _STOP:
+                    stopping = True
+                    break
+                batch.append(pending)
+
+            self._predict_batch(batch)
+            self._adapt_wait(len(batch))
+
+        self._predict_pending()
+
+    def _predict_pending(self) -> None:
+        leftover = []
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is not _STOP:
+                leftover.append(pending)
+        if leftover:
+            self._predict_batch(leftover)
+
+    def _predict_batch(self, batch: list[PendingPrediction]) -> None:
+        batches_by_model: dict[int, list[PendingPrediction]] = {}
+        for pending in batch:
+            batches_by_model.setdefault(id(pending.model), []).append(pending)
+
+        for model_batch in batches_by_model.values():
+            try:
+                prices = self._predict(
+                    np.stack([pending.features for pending in model_batch]),
+                    model_batch[0].model,
+                )
+            except Exception as e:
+                logger.error(f"Error predicting a batch of {len(model_batch)} rows. [Details]: {e}")
+                for pending in model_batch:
+                    pending.future.set_exception(e)
+                continue
+
+            for pending, price in zip(model_batch, prices):
+                pending.future.set_result(float(price))
+
+        with self._stats_lock:
+            self._batches += 1
+            self._predictions += len(batch)
+            self._largest_batch_size = max(self._largest_batch_size, len(batch))
+
+    def _adapt_wait(self, batch_size: int) -> None:
+        if batch_size > 1:
+            self._wait_seconds = min(
+                max(self._wait_seconds * 2, self.max_wait_seconds / 8), self.max_wait_seconds
+            )
+        elif self._wait_seconds > self.max_wait_seconds / 64:
+            self._wait_seconds /= 2
+        else:
+            self._wait_seconds = 0.0
+
+
+prediction_batcher = PredictionBatcher(
+    max_batch_size=app_config.PREDICTION_BATCH_MAX_SIZE,
+    max_wait_ms=app_config.PREDICTION_BATCH_MAX_WAIT_MS,
+    timeout_seconds=app_config.PREDICTION_BATCH_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import OrderedDict
+
+from src.config import app_config
+from src.schemas.diamond_schema import (
+    DiamondFeaturesForPredictionSchema,
+    PredictionCacheStatsSchema,
+)
+from src.utils.enums.diamonds_enums import DiamondColumnsEnum
+
+PREDICTION_KEY_COLUMNS = [
+    DiamondColumnsEnum.CARAT.value,
+    DiamondColumnsEnum.CUT.value,
+    DiamondColumnsEnum.COLOR.value,
+    DiamondColumnsEnum.CLARITY.value,
+    DiamondColumnsEnum.DEPTH.value,
+    DiamondColumnsEnum.TABLE.value,
+    DiamondColumnsEnum.X.value,
+    DiamondColumnsEnum.Y.value,
+    DiamondColumnsEnum.Z.value,
+]
+
+
+class PredictionCache:
+    """
+    LRU cache of predicted prices, keyed on the canonical features of the diamond.
+
+    The cache belongs to a single model version: when it's used with a different
+    version, every entry is dropped, so a new model never serves the prices of
+    the previous one.
+
+    Parameters
+    ----------
+    max_entries: (int)
+        The maximum number of cached prices. 0 disables the cache.
+    ttl_seconds: (float | None)
+        How long a price stays cached. None keeps it until evicted.
+    float_precision: (int)
+        The number of decimals the numeric features are rounded to in the key.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float | None, float_precision: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.float_precision = float_precision
+        self._entries: OrderedDict[tuple, tuple[float, float | None]] = OrderedDict()
+        self._model_version: str | None = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def make_key(self, data: DiamondFeaturesForPredictionSchema) -> tuple:
+        """
+        Returns the canonical key of the diamond: its categories and its numeric
+        features rounded to `float_precision` decimals.
+
+        Parameters
+        ----------
+        data: (DiamondFeaturesForPredictionSchema)
+            Data of the diamond.
+
+        Returns
+        -------
+        (tuple)
+        """
+        key = []
+        for column_name in PREDICTION_KEY_COLUMNS:
+            value = getattr(data, column_name)
+            if isinstance(value, float):
+                key.append(round(value, self.float_precision) + 0.0)
+            else:
+                key.append(getattr(value, "value", value))
+
+        return tuple(key)
+
+    def get(self, model_version: str, key: tuple) -> float | None:
+        """
+        Returns the cached price of the key, or None if it's not cached for this model version.
+
+        Parameters
+        ----------
+        model_version: (str)
+            The version of the served model.
+        key: (tuple)
+            The key built by `make_key`.
+
+        Returns
+        -------
+        (float | None)
+        """
+        if self.max_entries <= 0:
+            return None
+
+        with self._lock:
+            self._set_model_version(model_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            price, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return price
+
+    def put(self, model_version: str, key: tuple, price: float) -> None:
+        """
+        Caches the price of the key for the model version, evicting the least
+        recently used price if the cache is full.
+
+        Parameters
+        ----------
+        model_version: (str)
+            The version of the model that predicted the price.
+        key: (tuple)
+            The key built by `make_key`.
+        price: (float)
+            The predicted price.
+        """
+        if self.max_entries <= 0:
+            return
+
+        expires_at = None
+        if self.ttl_seconds:
+            expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            self._set_model_version(model_version)
+            self._entries[key] = (price, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_stats(self) -> PredictionCacheStatsSchema:
+        """
+        Returns the cache counters.
+        """
+        with self._lock:
+            return PredictionCacheStatsSchema(
+                model_version=self._model_version,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                invalidations=self._invalidations,
+            )
+
+    def _set_model_version(self, model_version: str) -> None:
+        if model_version == self._model_version:
+            return
+
+        if self._entries:
+            self._entries.clear()
+            self._invalidations += 1
+        self._model_version = model_version
+
+
+prediction_cache = PredictionCache(
+    max_entries=app_config.PREDICTION_CACHE_MAX_ENTRIES,
+    ttl_seconds=app_config.PREDICTION_CACHE_TTL_SECONDS or None,
+    float_precision=app_config.PREDICTION_CACHE_FLOAT_PRECISION,
+)
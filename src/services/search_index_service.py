@@ -0,0 +1,723 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from src.config import app_config
+from src.services import dataset_service, metrics_service
+from src.utils.enums.diamonds_enums import (
+    DiamondClarityEnum,
+    DiamondColorEnum,
+    DiamondColumnsEnum,
+    DiamondCutEnum,
+)
+
+logger = logging.getLogger(__name__)
+
+CATEGORICAL_COLUMNS: dict[str, list[str]] = {
+    DiamondColumnsEnum.CUT.value: [cut.value for cut in DiamondCutEnum],
+    DiamondColumnsEnum.COLOR.value: [color.value for color in DiamondColorEnum],
+    DiamondColumnsEnum.CLARITY.value: [clarity.value for clarity in DiamondClarityEnum],
+}
+
+N_PARTITIONS = (
+    len(DiamondCutEnum) * len(DiamondColorEnum) * len(DiamondClarityEnum)
+)
+
+SIMILARITY_FEATURES = [
+    DiamondColumnsEnum.CARAT.value,
+    DiamondColumnsEnum.DEPTH.value,
+    DiamondColumnsEnum.TABLE.value,
+    DiamondColumnsEnum.X.value,
+    DiamondColumnsEnum.Y.value,
+    DiamondColumnsEnum.Z.value,
+]
+# The rows of the KD-tree ranked by weighted distance per row searched by similarity.
+SIMILARITY_CANDIDATES_PER_ROW = 16
+
+
+def get_partition_id(cut: str, color: str, clarity: str) -> int:
+    """
+    Returns the id of the (cut, color, clarity) partition.
+
+    Parameters
+    ----------
+    cut: (str)
+        The cut of the diamond.
+    color: (str)
+        The color of the diamond.
+    clarity: (str)
+        The clarity of the diamond.
+
+    Returns
+    -------
+    (int)
+        The partition id, between 0 and N_PARTITIONS - 1.
+
+    Raises
+    ------
+    ValueError:
+        Raises if one of the features is not a valid category.
+    """
+    cut_code = CATEGORICAL_COLUMNS[DiamondColumnsEnum.CUT.value].index(cut)
+    color_code = CATEGORICAL_COLUMNS[DiamondColumnsEnum.COLOR.value].index(color)
+    clarity_code = CATEGORICAL_COLUMNS[DiamondColumnsEnum.CLARITY.value].index(clarity)
+
+    return (cut_code * len(DiamondColorEnum) + color_code) * len(
+        DiamondClarityEnum
+    ) + clarity_code
+
+
+def get_partition_ids(columns: dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Returns the partition id of every row, or N_PARTITIONS for rows with an
+    unknown category.
+
+    Parameters
+    ----------
+    columns: (dict[str, np.ndarray])
+        The dataset columns, with the categorical columns as codes.
+
+    Returns
+    -------
+    (np.ndarray)
+        The partition id of each row.
+    """
+    cut_codes = columns[DiamondColumnsEnum.CUT.value].astype(np.int64)
+    color_codes = columns[DiamondColumnsEnum.COLOR.value].astype(np.int64)
+    clarity_codes = columns[DiamondColumnsEnum.CLARITY.value].astype(np.int64)
+
+    partition_ids = (cut_codes * len(DiamondColorEnum) + color_codes) * len(
+        DiamondClarityEnum
+    ) + clarity_codes
+    unknown_category = (cut_codes < 0) | (color_codes < 0) | (clarity_codes < 0)
+    partition_ids[unknown_category] = N_PARTITIONS
+
+    return partition_ids
+
+
+def get_index_columns(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """
+    Returns the columns of the dataframe as stored by the index: the categorical
+    columns as codes and the numeric columns as they are. The float32 columns of
+    the columnar dataset are kept as views of it instead of float64 copies.
+
+    Parameters
+    ----------
+    df: (DataFrame)
+        The diamonds dataframe.
+
+    Returns
+    -------
+    (dict[str, np.ndarray])
+    """
+    columns = {}
+    for column_name in df.columns:
+        if column_name in CATEGORICAL_COLUMNS:
+            columns[column_name] = pd.Categorical(
+                df[column_name], categories=CATEGORICAL_COLUMNS[column_name]
+            ).codes
+        else:
+            columns[column_name] = df[column_name].to_numpy()
+
+    return columns
+
+
+class SimilarityTreeCache:
+    """
+    LRU cache of the KD-trees of the similarity search, keyed on the partition
+    and the features with a weight greater than 0.
+
+    A tree is built without the cache's lock, so searches of other trees aren't
+    blocked by it, and once, by the first of the searches that miss it.
+
+    Parameters
+    ----------
+    max_entries: (int)
+        The maximum number of cached trees.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._trees: OrderedDict[tuple, cKDTree] = OrderedDict()
+        self._build_locks: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _get_cached(self, key: tuple) -> cKDTree | None:
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self._trees.move_to_end(key)
+
+            return tree
+
+    def get_or_build(self, key: tuple, build: Callable[[], cKDTree]) -> cKDTree:
+        """
+        Returns the cached tree of the key, building it on a miss.
+
+        Parameters
+        ----------
+        key: (tuple)
+            The partition id and the mask of the weighted features.
+        build: (Callable[[], cKDTree])
+            Builds the tree of the key.
+
+        Returns
+        -------
+        (cKDTree)
+        """
+        tree = self._get_cached(key)
+        if tree is not None:
+            return tree
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            tree = self._get_cached(key)
+            if tree is not None:
+                return tree
+
+            tree = build()
+            with self._lock:
+                self._trees[key] = tree
+                if len(self._trees) > self.max_entries:
+                    self._trees.popitem(last=False)
+                self._build_locks.pop(key, None)
+
+            return tree
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+
+@dataclass(frozen=True)
+class DiamondSearchIndex:
+    """
+    The diamonds dataset held in memory, partitioned by (cut, color, clarity).
+
+    Rows are sorted by partition and then by carat. A partition is the slice
+    `partition_bounds[id]:partition_bounds[id + 1]` of `sorted_carats`, and
+    `row_offsets` maps each sorted position back to its row in `columns`.
+
+    Attributes
+    ----------
+    column_names: (list[str])
+        The dataset columns, in the same order as the CSV.
+    columns: (dict[str, np.ndarray])
+        The values of each column. Categorical columns are stored as codes of
+        the categories in CATEGORICAL_COLUMNS, with -1 for unknown values, and
+        float32 columns as float32, widened only for the returned rows.
+    sorted_carats: (np.ndarray)
+        The carats sorted by partition and carat, widened to their decimal values.
+    row_offsets: (np.ndarray)
+        The row of each value in `sorted_carats`.
+    partition_bounds: (np.ndarray)
+        The start of each partition in `sorted_carats`, plus the end of the last one.
+    similarity_trees: (SimilarityTreeCache)
+        The KD-trees of the partitions searched by similarity, built on first use
+        for each set of weighted features.
+    """
+
+    column_names: list[str]
+    columns: dict[str, np.ndarray]
+    sorted_carats: np.ndarray
+    row_offsets: np.ndarray
+    partition_bounds: np.ndarray
+    similarity_trees: SimilarityTreeCache = field(
+        default_factory=lambda: SimilarityTreeCache(app_config.SIMILARITY_TREE_CACHE_MAX_ENTRIES),
+        init=False,
+        repr=False,
+        compare=False,
+    )
+
+    @classmethod
+    def from_columns(
+        cls, column_names: list[str], columns: dict[str, np.ndarray]
+    ) -> "DiamondSearchIndex":
+        """
+        Builds the index from the dataset columns.
+
+        Parameters
+        ----------
+        column_names: (list[str])
+            The dataset columns, in the same order as the CSV.
+        columns: (dict[str, np.ndarray])
+            The values of each column, with the categorical columns as codes.
+
+        Returns
+        -------
+        (DiamondSearchIndex)
+        """
+        carats = columns[DiamondColumnsEnum.CARAT.value]
+        partition_ids = get_partition_ids(columns)
+        row_offsets = np.lexsort((carats, partition_ids))
+        sorted_carats = carats[row_offsets]
+        if sorted_carats.dtype == np.float32:
+            sorted_carats = dataset_service.widen_float32_values(sorted_carats)
+        partition_bounds = np.searchsorted(
+            partition_ids[row_offsets], np.arange(N_PARTITIONS + 1)
+        )
+
+        return cls(
+            column_names=column_names,
+            columns=columns,
+            sorted_carats=sorted_carats,
+            row_offsets=row_offsets,
+            partition_bounds=partition_bounds,
+        )
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "DiamondSearchIndex":
+        """
+        Builds the index from the diamonds dataframe.
+
+        Parameters
+        ----------
+        df: (DataFrame)
+            The diamonds dataframe, as read from the CSV or the columnar dataset.
+
+        Returns
+        -------
+        (DiamondSearchIndex)
+        """
+        return cls.from_columns(column_names=list(df.columns), columns=get_index_columns(df))
+
+    def append_dataframe(self, df: pd.DataFrame) -> "DiamondSearchIndex":
+        """
+        Returns a new index with the rows of the dataframe appended, inserting
+        them in the sorted carats of their partitions instead of sorting the
+        whole dataset again.
+
+        Parameters
+        ----------
+        df: (DataFrame)
+            The diamonds to append, with the same columns as the index.
+
+        Returns
+        -------
+        (DiamondSearchIndex)
+        """
+        new_columns = get_index_columns(df[self.column_names])
+        new_carats = new_columns[DiamondColumnsEnum.CARAT.value]
+        new_partition_ids = get_partition_ids(new_columns)
+        new_order = np.lexsort((new_carats, new_partition_ids))
+        new_partition_ids = new_partition_ids[new_order]
+        new_carats = self.widen_column_values(DiamondColumnsEnum.CARAT.value, new_carats[new_order])
+
+        # Rows with an unknown category are kept after the last partition.
+        bounds = np.append(self.partition_bounds, len(self.sorted_carats))
+        insert_positions = np.empty(len(new_order), dtype=np.int64)
+        for partition_id in np.unique(new_partition_ids):
+            in_partition = new_partition_ids == partition_id
+            partition_start, partition_stop = bounds[partition_id], bounds[partition_id + 1]
+            insert_positions[in_partition] = partition_start + np.searchsorted(
+                self.sorted_carats[partition_start:partition_stop],
+                new_carats[in_partition],
+                side="right",
+            )
+
+        n_rows = len(self.row_offsets)
+        new_rows_by_partition = np.bincount(new_partition_ids, minlength=N_PARTITIONS + 1)
+
+        return DiamondSearchIndex(
+            column_names=self.column_names,
+            columns={
+                column_name: np.concatenate(
+                    [self.columns[column_name], new_columns[column_name]]
+                )
+                for column_name in self.column_names
+            },
+            sorted_carats=np.insert(self.sorted_carats, insert_positions, new_carats),
+            row_offsets=np.insert(self.row_offsets, insert_positions, new_order + n_rows),
+            partition_bounds=self.partition_bounds
+            + np.concatenate([[0], np.cumsum(new_rows_by_partition)[:N_PARTITIONS]]),
+        )
+
+    def is_prefix_of(self, df: pd.DataFrame) -> bool:
+        """
+        Returns whether the dataframe starts with the rows of the index, e.g.
+        the dataset after rows were appended to the CSV the index was built from.
+
+        Parameters
+        ----------
+        df: (DataFrame)
+            The diamonds dataframe.
+
+        Returns
+        -------
+        (bool)
+        """
+        n_rows = len(self.row_offsets)
+        if list(df.columns) != self.column_names or len(df) < n_rows:
+            return False
+
+        head = get_index_columns(df.iloc[:n_rows])
+        return all(
+            np.array_equal(self.columns[column_name], head[column_name])
+            for column_name in self.column_names
+        )
+
+    def get_partition_slice(self, partition_id: int) -> slice:
+        """
+        Returns the positions of the partition in `sorted_carats`.
+
+        Parameters
+        ----------
+        partition_id: (int)
+            The id of the (cut, color, clarity) partition.
+
+        Returns
+        -------
+        (slice)
+        """
+        return slice(
+            self.partition_bounds[partition_id], self.partition_bounds[partition_id + 1]
+        )
+
+    def is_partition_empty(self, partition_id: int) -> bool:
+        """
+        Returns whether there are no diamonds in the partition.
+
+        Parameters
+        ----------
+        partition_id: (int)
+            The id of the (cut, color, clarity) partition.
+
+        Returns
+        -------
+        (bool)
+        """
+        return self.partition_bounds[partition_id] == self.partition_bounds[partition_id + 1]
+
+    @cached_property
+    def float32_decimals(self) -> dict[str, int]:
+        """
+        The decimals each float32 column is widened to, computed once from the
+        whole column.
+        """
+        return {
+            column_name: dataset_service.get_float32_decimals(values)
+            for column_name, values in self.columns.items()
+            if values.dtype == np.float32
+        }
+
+    def widen_column_values(self, column_name: str, values: np.ndarray) -> np.ndarray:
+        """
+        Returns values of a column as float64 decimal values if the column is
+        float32, and unchanged otherwise.
+
+        Parameters
+        ----------
+        column_name: (str)
+            The column of the values.
+        values: (np.ndarray)
+            Values of the column, e.g. of the returned rows.
+
+        Returns
+        -------
+        (np.ndarray)
+        """
+        decimals = self.float32_decimals.get(column_name)
+        if decimals is None:
+            return values
+
+        return dataset_service.widen_float32_values(values, decimals)
+
+    @cached_property
+    def similarity_scales(self) -> np.ndarray:
+        """
+        The standard deviation of each similarity feature in the dataset, which
+        its differences are divided by, so that every feature weighs the same
+        with equal weights. Constant features keep a scale of 1.
+        """
+        scales = np.array(
+            [np.std(self.columns[feature], dtype=np.float64) for feature in SIMILARITY_FEATURES],
+            dtype=np.float64,
+        )
+        scales[scales == 0] = 1.0
+
+        return scales
+
+    def find_most_similar_rows(
+        self, partition_id: int, features: np.ndarray, weights: np.ndarray, n: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the n rows of a partition nearest to the features, in the weighted
+        Euclidean distance of the normalized SIMILARITY_FEATURES.
+
+        The rows of the partition are held in a KD-tree of the normalized
+        features with a weight greater than 0, built on the first search of the
+        partition with those features, so any weights of them share the tree.
+        With equal weights the nearest rows of the tree are the result. Otherwise
+        the `SIMILARITY_CANDIDATES_PER_ROW * n` rows nearest in the unweighted
+        distance are ranked by their weighted distance, which is exact if the
+        n-th of them is nearer than any other row can be: the unweighted
+        distance of the last candidate times the square root of the smallest
+        weight. If it isn't, the weights are too uneven for the tree and every
+        row of the partition is ranked.
+
+        Parameters
+        ----------
+        partition_id: (int)
+            The id of the (cut, color, clarity) partition in the index.
+        features: (np.ndarray)
+            The SIMILARITY_FEATURES of the searched diamond.
+        weights: (np.ndarray)
+            The weight of each feature, at least one of them greater than 0.
+        n: (int)
+            The number of rows to find.
+
+        Returns
+        -------
+        (tuple[np.ndarray, np.ndarray])
+            The found rows and their distances, nearest first.
+        """
+        is_weighted = weights > 0
+        scales = self.similarity_scales[is_weighted]
+        partition = self.get_partition_slice(partition_id)
+
+        def build_tree() -> cKDTree:
+            rows = self.row_offsets[partition]
+            points = np.column_stack(
+                [
+                    self.widen_column_values(feature, self.columns[feature][rows])
+                    for feature, weighted in zip(SIMILARITY_FEATURES, is_weighted)
+                    if weighted
+                ]
+            )
+            return cKDTree(points / scales)
+
+        tree = self.similarity_trees.get_or_build(
+            (partition_id, tuple(is_weighted.tolist())), build_tree
+        )
+        query = features[is_weighted] / scales
+        feature_weights = weights[is_weighted]
+
+        n = min(n, tree.n)
+        if np.all(feature_weights == feature_weights[0]):
+            # Equal weights keep the order of the tree, e.g. the default ones.
+            distances, positions = tree.query(query, k=n)
+            return (
+                self.row_offsets[partition][np.atleast_1d(positions)],
+                np.atleast_1d(distances) * np.sqrt(feature_weights[0]),
+            )
+
+        unweighted_distances, positions = tree.query(
+            query, k=min(n * SIMILARITY_CANDIDATES_PER_ROW, tree.n)
+        )
+        unweighted_distances = np.atleast_1d(unweighted_distances)
+        positions = np.atleast_1d(positions)
+        distances = np.sqrt(((tree.data[positions] - query) ** 2) @ feature_weights)
+        # Rows out of the candidates are at least this far in the weighted distance.
+        min_distance_left = unweighted_distances[-1] * np.sqrt(feature_weights.min())
+        if len(positions) < tree.n and np.partition(distances, n - 1)[n - 1] > min_distance_left:
+            # The weights are too uneven for the candidates: rank the whole partition.
+            positions = np.arange(tree.n)
+            distances = np.sqrt(((tree.data - query) ** 2) @ feature_weights)
+
+        nearest = np.argpartition(distances, n - 1)[:n] if n < len(distances) else np.arange(n)
+        nearest = nearest[np.lexsort((positions[nearest], distances[nearest]))]
+
+        return self.row_offsets[partition][positions[nearest]], distances[nearest]
+
+    def get_records(self, rows: np.ndarray) -> list[dict]:
+        """
+        Returns the received rows as dicts, in the same format as `DataFrame.to_dict("records")`.
+
+        Parameters
+        ----------
+        rows: (np.ndarray)
+            The rows to return.
+
+        Returns
+        -------
+        (list[dict])
+        """
+        values_by_column = [
+            self.get_column_values(column_name, rows) for column_name in self.column_names
+        ]
+
+        return [dict(zip(self.column_names, row)) for row in zip(*values_by_column)]
+
+    def get_column_values(self, column_name: str, rows: np.ndarray) -> list:
+        """
+        Returns the values of a column for the received rows, with the categories
+        as strings.
+
+        Parameters
+        ----------
+        column_name: (str)
+            The column to return.
+        rows: (np.ndarray)
+            The rows to return.
+
+        Returns
+        -------
+        (list)
+        """
+        values = self.widen_column_values(column_name, self.columns[column_name][rows]).tolist()
+        if column_name in CATEGORICAL_COLUMNS:
+            categories = CATEGORICAL_COLUMNS[column_name]
+            values = [categories[code] for code in values]
+
+        return values
+
+    def iter_ndjson(self, rows: np.ndarray, chunk_size: int) -> Iterator[bytes]:
+        """
+        Serializes the received rows as newline-delimited JSON, one record per line,
+        converting `chunk_size` rows at a time.
+
+        Parameters
+        ----------
+        rows: (np.ndarray)
+            The rows to serialize.
+        chunk_size: (int)
+            The number of rows converted at a time.
+
+        Returns
+        -------
+        (Iterator[bytes])
+            The serialized chunks.
+        """
+        for start in range(0, len(rows), chunk_size):
+            records = self.get_records(rows[start : start + chunk_size])
+            yield "".join(
+                json.dumps(record, separators=(",", ":")) + "\n" for record in records
+            ).encode()
+
+    def iter_columnar_json(self, rows: np.ndarray, chunk_size: int) -> Iterator[bytes]:
+        """
+        Serializes the received rows as a JSON object with one array per column,
+        converting `chunk_size` values at a time.
+
+        Parameters
+        ----------
+        rows: (np.ndarray)
+            The rows to serialize.
+        chunk_size: (int)
+            The number of values converted at a time.
+
+        Returns
+        -------
+        (Iterator[bytes])
+            The serialized chunks.
+        """
+        for position, column_name in enumerate(self.column_names):
+            separator = "{" if position == 0 else "],"
+            yield f"{separator}{json.dumps(column_name)}:[".encode()
+
+            for start in range(0, len(rows), chunk_size):
+                values = self.get_column_values(column_name, rows[start : start + chunk_size])
+                chunk = json.dumps(values, separators=(",", ":"))[1:-1]
+                yield (chunk if start == 0 else "," + chunk).encode()
+
+        yield b"]}" if self.column_names else b"{}"
+
+
+class DiamondSearchIndexCache:
+    """
+    Process-wide cache of the search index.
+
+    The dataset is loaded from its columnar version and indexed once. When the
+    CSV's mtime changes, e.g. after an ingestion served by any process, the next
+    search loads the dataset again and appends its new rows to the index if it
+    starts with the indexed ones, or rebuilds the index otherwise. While another
+    process holds the dataset lock to ingest, the current index is served.
+
+    Parameters
+    ----------
+    path: (str)
+        The dataset CSV path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._indexed: tuple[int | None, DiamondSearchIndex] | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> DiamondSearchIndex:
+        """
+        Returns the search index, updating it if the CSV changed since it was built.
+
+        Raises
+        ------
+        FileNotFoundError:
+            Raises when the CSV's path is not found.
+        """
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        indexed = self._indexed
+        if indexed is not None and indexed[0] == mtime_ns:
+            return indexed[1]
+
+        with self._lock:
+            if self._indexed is None or self._indexed[0] != mtime_ns:
+                self._indexed = self._update(self._indexed, mtime_ns)
+
+            return self._indexed[1]
+
+    def _update(
+        self, indexed: tuple[int | None, DiamondSearchIndex] | None, mtime_ns: int
+    ) -> tuple[int | None, DiamondSearchIndex]:
+        """
+        Returns the index of the current dataset with the CSV's mtime, built
+        from the current index if the dataset starts with its rows. Returns the
+        current index if the dataset is being ingested by another process.
+
+        Parameters
+        ----------
+        indexed: (tuple[int | None, DiamondSearchIndex] | None)
+            The CSV's mtime the current index was built at, and the index.
+        mtime_ns: (int)
+            The CSV's current mtime.
+
+        Returns
+        -------
+        (tuple[int | None, DiamondSearchIndex])
+        """
+        try:
+            with metrics_service.StageTimer("search", "dataset_load"):
+                df = dataset_service.load_dataset(self.path, blocking=indexed is None)
+        except BlockingIOError:
+            return indexed
+
+        if indexed is not None and indexed[1].is_prefix_of(df):
+            index = indexed[1]
+            n_rows = len(index.row_offsets)
+            if len(df) > n_rows:
+                with metrics_service.StageTimer("search", "index_append"):
+                    index = index.append_dataframe(df.iloc[n_rows:])
+                logger.info(f"Appended {len(df) - n_rows} diamonds from {self.path} to the search index.")
+            return mtime_ns, index
+
+        with metrics_service.StageTimer("search", "index_build"):
+            index = DiamondSearchIndex.from_dataframe(df)
+        logger.info(f"Built search index with {len(df)} diamonds from {self.path}.")
+
+        return mtime_ns, index
+
+    def pin(self, index: DiamondSearchIndex) -> None:
+        """
+        Serves the received index, without building one. The pre-fork workers
+        pin the index the server shared before forking them. The next search
+        checks it against the dataset, and it's updated like a built index
+        once the CSV changes, in a private copy.
+
+        Parameters
+        ----------
+        index: (DiamondSearchIndex)
+            The index to serve.
+        """
+        with self._lock:
+            self._indexed = (None, index)
+
+
+search_index_cache = DiamondSearchIndexCache(path=app_config.DATASET_PATH)
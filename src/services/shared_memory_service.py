@@ -0,0 +1,102 @@
+import logging
+from dataclasses import replace
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.services.search_index_service import DiamondSearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+class SharedSearchIndex:
+    """
+    A search index whose arrays live in shared memory.
+
+    Every array of the index is copied once into a POSIX shared memory block
+    and exposed as a read-only view of it. Processes forked afterwards map the
+    same pages instead of holding their own copy of the dataset, so the memory
+    doesn't grow with the number of workers. The process that created the
+    blocks owns them and unlinks them on `close`.
+
+    Parameters
+    ----------
+    index: (DiamondSearchIndex)
+        The index to share.
+
+    Raises
+    ------
+    ValueError:
+        Raises if one of the arrays holds Python objects, which can't be shared.
+    """
+
+    def __init__(self, index: DiamondSearchIndex):
+        self._blocks: list[shared_memory.SharedMemory] = []
+        try:
+            self.index = replace(
+                index,
+                columns={
+                    column_name: self._share_array(values)
+                    for column_name, values in index.columns.items()
+                },
+                sorted_carats=self._share_array(index.sorted_carats),
+                row_offsets=self._share_array(index.row_offsets),
+                partition_bounds=self._share_array(index.partition_bounds),
+            )
+        except (ValueError, OSError) as e:
+            logger.error(f"Error sharing the search index. [Details]: {e}")
+            self.close()
+            raise e
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the size of the shared memory blocks.
+        """
+        return sum(block.size for block in self._blocks)
+
+    def _share_array(self, values: np.ndarray) -> np.ndarray:
+        """
+        Copies an array into a new shared memory block and returns a read-only
+        view of the block.
+
+        Parameters
+        ----------
+        values: (np.ndarray)
+            The array to share.
+
+        Returns
+        -------
+        (np.ndarray)
+        """
+        if values.dtype.hasobject:
+            raise ValueError(f"Arrays of {values.dtype} can't be shared.")
+
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self._blocks.append(block)
+        shared_values = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+        shared_values[...] = values
+        shared_values.flags.writeable = False
+
+        return shared_values
+
+    def close(self) -> None:
+        """
+        Closes and unlinks the shared memory blocks. The pages are released
+        once every process that maps them exits.
+
+        The arrays of `index` are views of the blocks, so the index is released
+        first. A block still viewed elsewhere in this process is unlinked and
+        stays mapped until those views are collected.
+        """
+        self.index = None
+        for block in self._blocks:
+            try:
+                block.close()
+            except BufferError as e:
+                logger.warning(f"Shared memory block {block.name} is still in use. [Details]: {e}")
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
@@ -0,0 +1,240 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.config import app_config
+from src.config.database_config import AsyncSessionLocal, SessionLocal
+from src.schemas.startup_schema import StartupReportSchema, StartupStageSchema
+from src.services import model_service, search_index_service
+from src.utils.enums.api_enums import ApiModeEnum
+
+logger = logging.getLogger(__name__)
+
+DATABASE_ERRORS = (SQLAlchemyError, OSError)
+MODEL_ERRORS = (pickle.UnpicklingError, ValueError, FileNotFoundError)
+DATASET_ERRORS = (OSError, ValueError)
+# The stages the process can't serve without: it isn't ready while one of them failed.
+REQUIRED_STAGES = ("model_load", "data_load")
+
+
+class StartupTracker:
+    """
+    Startup state of the process: the time spent in each startup stage, e.g.
+    "imports" or "model_load", and whether the warm-up finished. The process is
+    ready, which is what the readiness probe reports, once the warm-up finished
+    and none of the required stages failed.
+
+    The pre-fork server records the stages it runs before forking, and the
+    workers inherit them and only run the remaining ones.
+
+    Parameters
+    ----------
+    required_stages: (tuple[str, ...])
+        The stages the process isn't ready without.
+    """
+
+    def __init__(self, required_stages: tuple[str, ...] = REQUIRED_STAGES):
+        self.required_stages = required_stages
+        self._stages: dict[str, StartupStageSchema] = {}
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_warmed_up(self) -> bool:
+        return self._ready
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready and not self.get_failed_stages()
+
+    def set_ready(self, ready: bool) -> None:
+        """
+        Marks the warm-up as finished, or the process as shutting down.
+        """
+        self._ready = ready
+
+    def get_failed_stages(self) -> list[str]:
+        """
+        Returns the required stages that failed.
+        """
+        with self._lock:
+            return [
+                name
+                for name in self.required_stages
+                if name in self._stages and self._stages[name].error is not None
+            ]
+
+    def has_stage(self, name: str) -> bool:
+        return name in self._stages
+
+    def record(self, name: str, seconds: float, error: str | None = None) -> None:
+        """
+        Records the duration of a startup stage, and its error if it failed.
+
+        Parameters
+        ----------
+        name: (str)
+            The stage name.
+        seconds: (float)
+            The time spent in the stage.
+        error: (str | None)
+            The error of the stage, if it failed.
+        """
+        with self._lock:
+            self._stages[name] = StartupStageSchema(name=name, seconds=seconds, error=error)
+
+    @contextmanager
+    def stage(self, name: str, errors: tuple[type[Exception], ...] = ()) -> Iterator[None]:
+        """
+        Times the block as a startup stage. The listed errors are logged and
+        recorded without stopping the startup, so the failing resource is
+        loaded on first use instead. Other errors are raised.
+
+        Parameters
+        ----------
+        name: (str)
+            The stage name.
+        errors: (tuple[type[Exception], ...])
+            The errors the startup goes on after.
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except errors as e:
+            logger.warning(f"Startup stage {name} failed, continuing. [Details]: {e}")
+            error = str(e)
+        self.record(name, time.perf_counter() - start, error)
+
+    def get_report(self) -> StartupReportSchema:
+        """
+        Returns the startup report of the process.
+        """
+        with self._lock:
+            stages = list(self._stages.values())
+
+        return StartupReportSchema(
+            pid=os.getpid(),
+            ready=self.is_ready,
+            total_seconds=sum(stage.seconds for stage in stages),
+            stages=stages,
+        )
+
+
+startup_tracker = StartupTracker()
+
+
+def connect_to_database() -> None:
+    """
+    Opens the first connection of the blocking engine's pool.
+    """
+    with SessionLocal() as db:
+        db.execute(text("SELECT 1"))
+
+
+async def connect_to_async_database() -> None:
+    """
+    Opens the first connection of the async engine's pool.
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+
+
+def load_models(tracker: StartupTracker) -> None:
+    """
+    Loads and warms up the served models, the XGBoost one as the "model_load"
+    stage and the linear one as the "linear_model_load" stage.
+
+    Parameters
+    ----------
+    tracker: (StartupTracker)
+        The tracker the stages are recorded in.
+    """
+    for name, cache in (
+        ("model_load", model_service.model_cache),
+        ("linear_model_load", model_service.linear_model_cache),
+    ):
+        if not tracker.has_stage(name):
+            with tracker.stage(name, MODEL_ERRORS):
+                cache.get()
+
+
+async def warm_up(tracker: StartupTracker = startup_tracker) -> StartupReportSchema:
+    """
+    Runs the startup stages the process didn't run yet, connecting to the
+    database ("db_connect"), loading the models and building the search index
+    ("data_load"), and marks the process as ready.
+
+    Parameters
+    ----------
+    tracker: (StartupTracker)
+        The tracker the stages are recorded in.
+
+    Returns
+    -------
+    (StartupReportSchema)
+    """
+    if not tracker.has_stage("db_connect"):
+        with tracker.stage("db_connect", DATABASE_ERRORS):
+            connect_to_database()
+            if ApiModeEnum(app_config.API_MODE) == ApiModeEnum.async_:
+                await connect_to_async_database()
+
+    load_models(tracker)
+
+    if not tracker.has_stage("data_load"):
+        load_data(tracker)
+
+    tracker.set_ready(True)
+    report = tracker.get_report()
+    stages = ", ".join(
+        f"{stage.name} {stage.seconds * 1000:.0f} ms{' (failed)' if stage.error else ''}"
+        for stage in report.stages
+    )
+    if report.ready:
+        logger.info(f"Ready in {report.total_seconds:.2f} s: {stages}.")
+    else:
+        logger.error(
+            f"Warmed up in {report.total_seconds:.2f} s but not ready, "
+            f"{', '.join(tracker.get_failed_stages())} failed: {stages}."
+        )
+
+    return report
+
+
+def load_data(tracker: StartupTracker) -> None:
+    """
+    Loads the dataset and builds the search index as the "data_load" stage.
+
+    Parameters
+    ----------
+    tracker: (StartupTracker)
+        The tracker the stage is recorded in.
+    """
+    with tracker.stage("data_load", DATASET_ERRORS):
+        search_index_service.search_index_cache.get()
+
+
+def retry_failed_stages(tracker: StartupTracker = startup_tracker) -> None:
+    """
+    Runs again the required stages that failed during the warm-up, e.g. once
+    the model file is deployed, so the process becomes ready without a restart.
+
+    Parameters
+    ----------
+    tracker: (StartupTracker)
+        The tracker the stages are recorded in.
+    """
+    failed_stages = tracker.get_failed_stages()
+    if "model_load" in failed_stages:
+        with tracker.stage("model_load", MODEL_ERRORS):
+            model_service.model_cache.get()
+    if "data_load" in failed_stages:
+        load_data(tracker)
@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class ApiModeEnum(str, Enum):
+    sync = "sync"
+    async_ = "async"
+
+
+class ResponseEncodingEnum(str, Enum):
+    identity = "identity"
+    zlib = "zlib"
@@ -26,6 +26,10 @@ class DiamondCutEnum(str, Enum):
     ideal = "Ideal"
     premium = "Premium"
 
+class DiamondPriceModelEnum(str, Enum):
+    xgboost = "xgboost"
+    linear = "linear"
+
 class DiamondColumnsEnum(str, Enum):
     CARAT = 'carat'
     COLOR = 'color'
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class SearchResponseFormatEnum(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+    columnar = "columnar"
@@ -1,7 +1,39 @@
+import tempfile
+
+import pandas as pd
 from pydantic import BaseModel
+from starlette.requests import Request
 
 
 def validate_data_has_no_zero_values(data: BaseModel) -> None:
     for value in data:
         if 0 in value:
-            raise ValueError(f"{value[0]} must have value grather than 0.")
\ No newline at end of file
+            raise ValueError(f"{value[0]} must have value grather than 0.")
+
+
+def get_zero_value_errors(df: pd.DataFrame) -> pd.Series:
+    """
+    Column-wise version of `validate_data_has_no_zero_values` for many rows:
+    returns the error of each row with a zero value, or an empty string.
+    """
+    errors = pd.Series("", index=df.index, dtype=object)
+    for column_name in df.columns:
+        has_zero = (df[column_name] == 0).to_numpy()
+        errors[has_zero] += f"{column_name} must have value grather than 0.; "
+
+    has_error = (errors != "").to_numpy()
+    errors[has_error] = errors[has_error].str.removesuffix("; ")
+
+    return errors
+
+
+async def write_request_body_to_temporary_file(request: Request, suffix: str) -> str:
+    """
+    Streams the request body to a temporary file, so large uploads aren't held
+    in memory, and returns its path. The caller removes the file.
+    """
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        async for body_chunk in request.stream():
+            f.write(body_chunk)
+
+    return f.name
@@ -0,0 +1,69 @@
+import hashlib
+import zlib
+
+from src.utils.enums.api_enums import ResponseEncodingEnum
+
+
+def encode_response(response: str, max_bytes: int, compression_level: int) -> dict:
+    """
+    Encodes the response of an API request to be stored in the requests log.
+
+    The UTF-8 bytes of the response are truncated to `max_bytes` and compressed
+    with zlib. The hash and the size are computed from the whole response, so
+    equal responses can be found even when they were truncated.
+
+    Parameters
+    ----------
+    response: (str)
+        The response of the API request.
+    max_bytes: (int)
+        The maximum number of bytes of the response that are stored.
+    compression_level: (int)
+        The zlib compression level, from 0 to 9.
+
+    Returns
+    -------
+    (dict)
+        The `response`, `response_encoding`, `response_sha256`, `response_size`
+        and `response_truncated` columns of the request.
+    """
+    raw_response = response.encode("utf-8")
+    stored_response = raw_response[:max_bytes]
+
+    return {
+        "response": zlib.compress(stored_response, compression_level),
+        "response_encoding": ResponseEncodingEnum.zlib.value,
+        "response_sha256": hashlib.sha256(raw_response).hexdigest(),
+        "response_size": len(raw_response),
+        "response_truncated": len(stored_response) < len(raw_response),
+    }
+
+
+def decode_response(response: bytes, encoding: str) -> str:
+    """
+    Decodes a response stored by `encode_response`.
+
+    A truncated response may end in the middle of a character, which is dropped.
+
+    Parameters
+    ----------
+    response: (bytes)
+        The stored response.
+    encoding: (str)
+        How the response was stored, one of `ResponseEncodingEnum`.
+
+    Returns
+    -------
+    (str)
+
+    Raises
+    ------
+    ValueError:
+        Raises if the encoding is unknown.
+    """
+    if encoding == ResponseEncodingEnum.zlib:
+        response = zlib.decompress(response)
+    elif encoding != ResponseEncodingEnum.identity:
+        raise ValueError(f"Unknown response encoding: {encoding}.")
+
+    return response.decode("utf-8", errors="ignore")
@@ -0,0 +1,151 @@
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+Frame = tuple[str, int, str]
+"""The (filename, first line, function name) of a function, as keyed by pstats."""
+
+
+class StackSampler:
+    """
+    Sampling profiler of the threads running application code.
+
+    A background thread takes a snapshot of the stack of every thread each
+    `interval_seconds` and counts the stacks that have at least one frame under
+    `root_dir`, so idle threads of the server and of the libraries are left
+    out. The profiled code runs unchanged, whichever thread runs it, and the
+    cost is paid by the sampling thread.
+
+    Parameters
+    ----------
+    root_dir: (str)
+        The directory of the application code.
+    interval_seconds: (float)
+        The time between two samples.
+    ignored_thread_prefixes: (tuple[str, ...])
+        The names of background threads that are never sampled.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        interval_seconds: float,
+        ignored_thread_prefixes: tuple[str, ...] = (),
+    ):
+        self.root_dir = os.path.abspath(root_dir) + os.sep
+        self.interval_seconds = interval_seconds
+        self.ignored_thread_prefixes = ignored_thread_prefixes
+        self.samples: Counter[tuple[str, tuple[Frame, ...]]] = Counter()
+        self.duration_seconds = 0.0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start = 0.0
+
+    def start(self) -> None:
+        """
+        Starts sampling.
+        """
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling and waits for the sampling thread to finish.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration_seconds = time.perf_counter() - self._start
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._sample()
+            self._stop_event.wait(self.interval_seconds)
+
+    def _sample(self) -> None:
+        own_thread_id = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            thread_name = thread_names.get(thread_id, str(thread_id))
+            if thread_id == own_thread_id or thread_name.startswith(self.ignored_thread_prefixes):
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if any(filename.startswith(self.root_dir) for filename, _, _ in stack):
+                self.samples[(thread_name, tuple(reversed(stack)))] += 1
+
+    def format_frame(self, frame: Frame) -> str:
+        """
+        Returns the label of a frame, with its path relative to the application
+        or to the import path of its library.
+        """
+        filename, line, function_name = frame
+        if filename.startswith(self.root_dir):
+            filename = os.path.relpath(filename, os.path.dirname(self.root_dir.rstrip(os.sep)))
+        else:
+            import_dirs = [path for path in sys.path if path and filename.startswith(path + os.sep)]
+            if import_dirs:
+                filename = os.path.relpath(filename, max(import_dirs, key=len))
+        return f"{function_name} ({filename}:{line})"
+
+    def get_collapsed_stacks(self) -> str:
+        """
+        Returns the samples as collapsed stacks, one `frame;frame;... count` line
+        per stack from the root to the leaf, the input of flamegraph.pl and
+        speedscope.
+        """
+        lines = []
+        for (thread_name, stack), count in sorted(self.samples.items()):
+            frames = [thread_name, *(self.format_frame(frame).replace(";", ":") for frame in stack)]
+            lines.append(f"{';'.join(frames)} {count}")
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def get_pstats(self) -> dict:
+        """
+        Returns the samples as the statistics dict of `cProfile`, which
+        `pstats.Stats` and its viewers load. Times are the number of samples
+        multiplied by the interval, and calls are the number of samples.
+        """
+        stats: dict[Frame, list] = {}
+        for (_, stack), count in self.samples.items():
+            seconds = count * self.interval_seconds
+            seen = set()
+            for position, frame in enumerate(stack):
+                entry = stats.setdefault(frame, [0, 0, 0.0, 0.0, {}])
+                if frame not in seen:
+                    seen.add(frame)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += seconds
+                if position == len(stack) - 1:
+                    entry[2] += seconds
+                if position > 0:
+                    caller = stack[position - 1]
+                    calls, primitive_calls, total_time, cumulative_time = entry[4].get(
+                        caller, (0, 0, 0.0, 0.0)
+                    )
+                    entry[4][caller] = (
+                        calls + count,
+                        primitive_calls + count,
+                        total_time + (seconds if position == len(stack) - 1 else 0.0),
+                        cumulative_time + seconds,
+                    )
+
+        return {frame: tuple(entry) for frame, entry in stats.items()}
+
+    def dump_pstats(self, path: str) -> None:
+        """
+        Writes the statistics in the format of `cProfile.Profile.dump_stats`.
+        """
+        with open(path, "wb") as f:
+            marshal.dump(self.get_pstats(), f)
@@ -1,11 +1,23 @@
+import asyncio
+import json
+import pickle
+
+import pandas as pd
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from xgboost.sklearn import XGBRegressor
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from src.config.database_config import Base, get_db
+from src.config.database_config import Base, get_async_db, get_db
 from src.main import app
+from src.routers.diamond_async_router import router as diamond_async_router
+from src.services.model_registry_service import ModelRegistry
+from src.services import linear_model_service
+from src.services.model_service import ModelCache
 
 SQLALCHEMY_DATABASE_URL = "sqlite://"
 
@@ -29,6 +41,122 @@ def override_get_db():
 
 app.dependency_overrides[get_db] = override_get_db
 
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite://"
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=StaticPool,
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def create_async_tables():
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+
+asyncio.run(create_async_tables())
+
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+async_app = FastAPI()
+async_app.include_router(diamond_async_router)
+async_app.dependency_overrides[get_async_db] = override_get_async_db
+
+@pytest.fixture(scope="session", autouse=True)
+def dataset_cache_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("dataset-cache"))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr("src.config.app_config.DATASET_CACHE_DIR", path)
+        yield path
+
+
 @pytest.fixture
 def client():
     return TestClient(app)
+
+
+@pytest.fixture
+def async_client():
+    return TestClient(async_app)
+
+
+@pytest.fixture(scope="session")
+def model_path(tmp_path_factory):
+    df = pd.read_csv("data/diamonds.csv")
+    df = df[(df.x * df.y * df.z != 0) & (df.price > 0)]
+    df["cut"] = pd.Categorical(df["cut"], categories=["Fair", "Good", "Very Good", "Ideal", "Premium"], ordered=True)
+    df["color"] = pd.Categorical(df["color"], categories=["D", "E", "F", "G", "H", "I", "J"], ordered=True)
+    df["clarity"] = pd.Categorical(df["clarity"], categories=["IF", "VVS1", "VVS2", "VS1", "VS2", "SI1", "SI2", "I1"], ordered=True)
+
+    model = XGBRegressor(enable_categorical=True, random_state=42, n_estimators=20)
+    model.fit(df.drop(columns="price"), df["price"])
+
+    path = tmp_path_factory.mktemp("models") / "model_xcgboost.pkl"
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+    return str(path)
+
+
+@pytest.fixture
+def model_cache(model_path, mocker):
+    cache = ModelCache(path=model_path, reload_interval_seconds=1)
+    mocker.patch("src.services.model_service.model_cache", cache)
+    return cache
+
+
+LINEAR_MODEL = {
+    "intercept": 5.5,
+    "coefficients": {
+        "carat": -0.7,
+        "x": 1.2,
+        "cut_Ideal": 0.08,
+        "color_J": -0.45,
+        "clarity_IF": 1.3,
+    },
+}
+
+
+@pytest.fixture
+def linear_model_cache(tmp_path, mocker):
+    path = tmp_path / "model_linear.json"
+    path.write_text(json.dumps(LINEAR_MODEL))
+    cache = ModelCache(
+        path=str(path),
+        reload_interval_seconds=1,
+        loader=linear_model_service.load_linear_model_from_bytes,
+        warm_up=linear_model_service.warm_up_linear_model,
+        get_format=linear_model_service.get_linear_model_format,
+    )
+    mocker.patch("src.services.model_service.linear_model_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def model_registry(model_path, tmp_path, mocker):
+    registry = ModelRegistry(root=str(tmp_path / "registry"), name="diamonds-xgboost")
+    cache = ModelCache(path=model_path, reload_interval_seconds=1, registry=registry)
+    mocker.patch("src.services.model_service.model_registry", registry)
+    mocker.patch("src.services.model_service.model_cache", cache)
+    mocker.patch("src.routers.model_router.model_registry", registry)
+    return registry
+
+
+def clear_tables():
+    with TestingSessionLocal() as db:
+        for table in reversed(Base.metadata.sorted_tables):
+            db.execute(table.delete())
+        db.commit()
+
+
+@pytest.fixture
+def db_session_factory():
+    clear_tables()
+    yield TestingSessionLocal
+    clear_tables()
@@ -0,0 +1,80 @@
+from functools import partial
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from src.main import app
+from src.models.api_request_model import APIrequestModel
+from src.services import startup_service
+from src.services.api_requests_service import api_requests_log_writer
+from src.services.prediction_batching_service import prediction_batcher
+from src.services.search_index_service import DiamondSearchIndexCache
+from src.services.startup_service import StartupTracker
+
+
+@pytest.fixture
+def startup_tracker(mocker, model_cache, linear_model_cache, db_session_factory):
+    tracker = StartupTracker()
+    mocker.patch("src.main.startup_tracker", tracker)
+    mocker.patch("src.routers.health_router.startup_tracker", tracker)
+    mocker.patch("src.main.warm_up", partial(startup_service.warm_up, tracker))
+    mocker.patch("src.services.startup_service.SessionLocal", db_session_factory)
+    mocker.patch(
+        "src.services.search_index_service.search_index_cache",
+        DiamondSearchIndexCache("data/diamonds.csv"),
+    )
+    mocker.patch.object(api_requests_log_writer, "session_factory", db_session_factory)
+    mocker.patch(
+        "src.services.prediction_cache_service.prediction_cache.get", return_value=None
+    )
+    return tracker
+
+
+class TestAppLifespan:
+    def test_is_ready_and_predicts_through_the_batcher_and_the_log_writer(
+        self, startup_tracker, db_session_factory
+    ):
+        data = {
+            "carat": 1.1,
+            "cut": "Ideal",
+            "color": "H",
+            "clarity": "SI2",
+            "depth": 62.0,
+            "table": 55.0,
+            "x": 6.61,
+            "y": 6.65,
+            "z": 4.11,
+        }
+        batches = prediction_batcher.get_stats().batches
+
+        with TestClient(app) as client:
+            assert prediction_batcher.is_running
+            assert api_requests_log_writer.is_running
+
+            ready_response = client.get("/ready")
+            response = client.post("/diamond/predict-price", json=data)
+
+            assert prediction_batcher.get_stats().batches == batches + 1
+
+        assert ready_response.status_code == 200
+        assert ready_response.json()["ready"] is True
+        stages = [(stage["name"], stage["error"]) for stage in ready_response.json()["stages"]]
+        assert stages == [
+            ("db_connect", None),
+            ("model_load", None),
+            ("linear_model_load", None),
+            ("data_load", None),
+        ]
+
+        assert response.status_code == 200
+        assert response.json().startswith("The predicted value for the diamond is: $")
+
+        assert not prediction_batcher.is_running
+        assert not api_requests_log_writer.is_running
+        assert not startup_tracker.is_ready
+        with db_session_factory() as db:
+            records = db.scalars(select(APIrequestModel)).all()
+        assert [(record.path, record.status_code) for record in records] == [
+            ("/diamond/predict-price", 200)
+        ]
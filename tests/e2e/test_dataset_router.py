@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from src.services.search_index_service import DiamondSearchIndexCache
+
+
+@pytest.fixture
+def dataset_path(tmp_path, mocker):
+    path = tmp_path / "diamonds.csv"
+    pd.read_csv("data/diamonds.csv").head(100).to_csv(path, index=False)
+    mocker.patch("src.config.app_config.DATASET_PATH", str(path))
+    mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+    return str(path)
+
+
+class TestPostIngestDataset:
+    def test_appends_new_diamonds_and_updates_search_index(self, client, dataset_path, mocker):
+        cache = DiamondSearchIndexCache(path=dataset_path)
+        cache.get()
+        body = pd.read_csv("data/diamonds.csv").iloc[95:120].to_csv(index=False)
+
+        response = client.post(
+            "/dataset/ingest?chunk_size=10",
+            content=body,
+            headers={"Content-Type": "text/csv"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "rows_read": 25,
+            "invalid_rows": 0,
+            "duplicate_rows": 5,
+            "appended_rows": 20,
+            "dataset_rows": 120,
+        }
+        assert len(pd.read_csv(dataset_path)) == 120
+        assert len(cache.get().row_offsets) == 120
+
+    def test_returns_400_when_a_column_is_missing(self, client, dataset_path):
+        body = pd.read_csv("data/diamonds.csv").head(5).drop(columns="cut").to_csv(index=False)
+
+        response = client.post("/dataset/ingest", content=body)
+
+        assert response.status_code == 400
+        assert "cut" in response.json()["detail"]
+
+    def test_returns_400_when_the_csv_is_malformed(self, client, dataset_path):
+        body = pd.read_csv("data/diamonds.csv").head(5).to_csv(index=False) + "1,2,3,4,5,6,7,8,9,10,11,12\n"
+
+        response = client.post("/dataset/ingest", content=body)
+
+        assert response.status_code == 400
+        assert "Expected 10 fields" in response.json()["detail"]
+        assert len(pd.read_csv(dataset_path)) == 100
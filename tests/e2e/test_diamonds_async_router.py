@@ -0,0 +1,188 @@
+import asyncio
+import json
+
+import httpx
+import pandas as pd
+import pytest
+from sqlalchemy import delete, select
+
+from src.models.api_request_model import APIrequestModel
+from tests.conftest import TestingAsyncSessionLocal
+
+DIAMOND = {
+    "carat": 1.1,
+    "cut": "Ideal",
+    "color": "H",
+    "clarity": "SI2",
+    "depth": 62.0,
+    "table": 55.0,
+    "x": 6.61,
+    "y": 6.65,
+    "z": 4.11,
+}
+
+
+def get_logged_requests() -> list[APIrequestModel]:
+    async def get():
+        async with TestingAsyncSessionLocal() as db:
+            return (await db.scalars(select(APIrequestModel))).all()
+
+    return asyncio.run(get())
+
+
+def clear_logged_requests() -> None:
+    async def clear():
+        async with TestingAsyncSessionLocal() as db:
+            await db.execute(delete(APIrequestModel))
+            await db.commit()
+
+    asyncio.run(clear())
+
+
+@pytest.fixture(autouse=True)
+def logged_requests_table():
+    clear_logged_requests()
+    yield
+    clear_logged_requests()
+
+
+class TestAsyncPostPredictedDiamondPrice:
+    def test_post_predicted_diamond_price(self, async_client, model_cache):
+        response = async_client.post("/diamond/predict-price", json=DIAMOND)
+
+        assert response.status_code == 200
+        assert response.json().startswith("The predicted value for the diamond is: $")
+        assert response.headers["X-Model-Version"] == model_cache.get().version
+        logged_requests = get_logged_requests()
+        assert len(logged_requests) == 1
+        assert logged_requests[0].path == "/diamond/predict-price"
+        assert logged_requests[0].status_code == 200
+        assert logged_requests[0].get_response_text() == response.json()
+
+    def test_returns_the_same_price_as_the_sync_endpoint(
+        self, async_client, client, model_cache, mocker
+    ):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+
+        async_response = async_client.post("/diamond/predict-price", json=DIAMOND)
+        response = client.post("/diamond/predict-price", json=DIAMOND)
+
+        assert async_response.json() == response.json()
+
+    def test_raises_400_and_logs_it_when_body_data_has_0_values(self, async_client):
+        response = async_client.post("/diamond/predict-price", json={**DIAMOND, "carat": 0})
+
+        assert response.status_code == 400
+        logged_requests = get_logged_requests()
+        assert [request.status_code for request in logged_requests] == [400]
+
+    def test_returns_503_and_logs_it_when_the_prediction_times_out(
+        self, async_client, model_cache, mocker
+    ):
+        mocker.patch(
+            "src.services.prediction_batching_service.prediction_batcher.predict",
+            side_effect=TimeoutError(),
+        )
+        mocker.patch(
+            "src.services.prediction_cache_service.prediction_cache.get", return_value=None
+        )
+
+        response = async_client.post("/diamond/predict-price", json=DIAMOND)
+
+        assert response.status_code == 503
+        logged_requests = get_logged_requests()
+        assert [request.status_code for request in logged_requests] == [503]
+
+    def test_keeps_concurrent_requests_in_flight(self, async_client, model_cache, mocker):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database_async")
+
+        async def post_concurrently():
+            transport = httpx.ASGITransport(app=async_client.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(
+                    *[client.post("/diamond/predict-price", json=DIAMOND) for _ in range(20)]
+                )
+
+        responses = asyncio.run(post_concurrently())
+
+        assert [response.status_code for response in responses] == [200] * 20
+        assert len({response.json() for response in responses}) == 1
+
+
+class TestAsyncPostPredictedDiamondsPricesInBatch:
+    def test_post_predicted_diamonds_prices_in_batch(self, async_client, model_cache):
+        data = [DIAMOND, {"carat": 1.1, "cut": "Ideal"}]
+
+        response = async_client.post("/diamond/predict-price/batch", json=data)
+
+        assert response.status_code == 200
+        predictions = response.json()["predictions"]
+        assert predictions[0]["price"] > 0
+        assert "color: Field required" in predictions[1]["error"]
+
+class TestAsyncPostPredictedDiamondsPricesFromCsv:
+    def test_returns_the_same_csv_as_the_sync_endpoint(self, async_client, client, model_cache):
+        body = pd.read_csv("data/diamonds.csv").head(15).to_csv(index=False).replace(
+            "price", "list_price", 1
+        )
+
+        expected = client.post("/diamond/predict-price/csv?chunk_size=4", content=body)
+        response = async_client.post("/diamond/predict-price/csv?chunk_size=4", content=body)
+
+        assert response.status_code == 200
+        assert response.text == expected.text
+        assert response.text.splitlines()[0].endswith("list_price,x,y,z,predicted_price,error")
+
+
+class TestAsyncPostSearchDiamondByFeaturesAndSimilarWeight:
+    def test_returns_the_same_diamonds_as_the_sync_endpoint(self, async_client, client, mocker):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+        data = {"carat": 0.96, "cut": "Ideal", "color": "H", "clarity": "SI2", "n": 5}
+
+        async_response = async_client.post("/diamond/search", json=data)
+        response = client.post("/diamond/search", json=data)
+
+        assert async_response.status_code == 200
+        assert async_response.json() == response.json()
+    def test_streams_ndjson_rows(self, async_client):
+        data = {"carat": 0.96, "cut": "Ideal", "color": "H", "clarity": "SI2", "n": 50}
+
+        expected = async_client.post("/diamond/search", json=data).json()
+        response = async_client.post("/diamond/search?format=ndjson", json=data)
+
+        assert response.status_code == 200
+        assert [json.loads(line) for line in response.text.splitlines()] == expected
+    def test_raises_400_when_there_is_no_results(self, async_client):
+        data = {"carat": 1, "cut": "Fair", "color": "D", "clarity": "IF"}
+
+        response = async_client.post("/diamond/search", json=data)
+
+        assert response.status_code == 400
+        assert (
+            response.json()["detail"]
+            == "It was not found diamonds for the chosen features."
+        )
+
+
+class TestAsyncPostSearchSimilarDiamonds:
+    def test_returns_the_same_diamonds_as_the_sync_endpoint(self, async_client, client, mocker):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+        data = {
+            "carat": 0.9,
+            "cut": "Ideal",
+            "color": "H",
+            "clarity": "SI2",
+            "depth": 62.0,
+            "table": 57.0,
+            "x": 6.1,
+            "y": 6.2,
+            "z": 3.8,
+            "n": 5,
+            "weights": {"carat": 2, "table": 0},
+        }
+
+        async_response = async_client.post("/diamond/search/similar", json=data)
+        response = client.post("/diamond/search/similar", json=data)
+
+        assert async_response.status_code == 200
+        assert async_response.json() == response.json()
@@ -1,11 +1,26 @@
+import io
+import json
+
+import pandas as pd
 import pytest
 
+from src.schemas.diamond_schema import (
+    DiamondFeaturesForPredictionSchema,
+    DiamondPricePredictionSchema,
+)
+from src.services.model_service import ModelCache
+
+
 class TestPostPredictedDiamondPrice:
     @pytest.mark.db
     def test_post_predicted_diamond_price(self, mocker, client):
         mocker.patch(
             "src.services.diamond_service.predict_diamond_price",
-            return_value="The predicted value for the diamond is: $5358.2705078125",
+            return_value=DiamondPricePredictionSchema(
+                message="The predicted value for the diamond is: $5358.2705078125",
+                price=5358.2705078125,
+                model_version="3f2a9c1d8e7b",
+            ),
         )
 
         mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
@@ -27,6 +42,7 @@ class TestPostPredictedDiamondPrice:
             response.json()
             == "The predicted value for the diamond is: $5358.2705078125"
         )
+        assert response.headers["X-Model-Version"] == "3f2a9c1d8e7b"
 
     @pytest.mark.parametrize(
         "body_data",
@@ -66,6 +82,228 @@ class TestPostPredictedDiamondPrice:
         assert response.status_code == 400
 
 
+    def test_returns_503_and_logs_it_when_the_prediction_times_out(self, client, mocker):
+        mocker.patch(
+            "src.services.diamond_service.predict_diamond_price", side_effect=TimeoutError()
+        )
+        log_api_request = mocker.patch("src.routers.diamond_router.log_api_request")
+        data = {
+            "carat": 1.1,
+            "cut": "Ideal",
+            "color": "H",
+            "clarity": "SI2",
+            "depth": 62.0,
+            "table": 55.0,
+            "x": 6.61,
+            "y": 6.65,
+            "z": 4.11,
+        }
+
+        response = client.post("/diamond/predict-price", json=data)
+
+        assert response.status_code == 503
+        assert response.json()["detail"] == "The price was not predicted in time, try again later."
+        assert log_api_request.call_args.kwargs["request_data"].status_code == 503
+
+
+class TestPostPredictedDiamondPriceWithLinearModel:
+    def test_predicts_price_with_linear_model(self, client, linear_model_cache):
+        data = {
+            "carat": 1.1,
+            "cut": "Ideal",
+            "color": "J",
+            "clarity": "IF",
+            "depth": 62.0,
+            "table": 55.0,
+            "x": 6.61,
+            "y": 6.65,
+            "z": 4.11,
+        }
+
+        response = client.post("/diamond/predict-price?model=linear", json=data)
+
+        assert response.status_code == 200
+        assert response.headers["X-Model-Version"] == linear_model_cache.get().version
+        price = linear_model_cache.get().model.predict_price(
+            DiamondFeaturesForPredictionSchema.model_validate(data)
+        )
+        assert response.json() == f"The predicted value for the diamond is: ${price}"
+
+    def test_predicts_prices_in_batch_with_linear_model(self, client, linear_model_cache):
+        data = [
+            {
+                "carat": 1.1,
+                "cut": "Ideal",
+                "color": "J",
+                "clarity": "IF",
+                "depth": 62.0,
+                "table": 55.0,
+                "x": 6.61,
+                "y": 6.65,
+                "z": 4.11,
+            },
+            {"carat": 1.1, "cut": "Ideal"},
+        ]
+
+        response = client.post("/diamond/predict-price/batch?model=linear", json=data)
+
+        assert response.status_code == 200
+        predictions = response.json()["predictions"]
+        assert predictions[0]["price"] == pytest.approx(
+            linear_model_cache.get().model.predict_price(
+                DiamondFeaturesForPredictionSchema.model_validate(data[0])
+            )
+        )
+        assert predictions[1]["price"] is None
+
+    def test_raises_422_when_model_is_unknown(self, client):
+        response = client.post("/diamond/predict-price?model=forest", json={})
+
+        assert response.status_code == 422
+
+
+class TestGetPriceModels:
+    def test_lists_available_models_with_their_versions(self, client, model_cache, linear_model_cache):
+        response = client.get("/diamond/models")
+
+        assert response.status_code == 200
+        models = {model["name"]: model for model in response.json()}
+        assert models["xgboost"]["default"] is True
+        assert models["xgboost"]["version"] == model_cache.get().version
+        assert models["linear"]["available"] is True
+        assert models["linear"]["version"] == linear_model_cache.get().version
+
+    def test_lists_unavailable_model(self, client, model_cache, mocker):
+        mocker.patch(
+            "src.services.model_service.linear_model_cache",
+            ModelCache(path="missing/model_linear.json", reload_interval_seconds=1),
+        )
+
+        response = client.get("/diamond/models")
+
+        models = {model["name"]: model for model in response.json()}
+        assert models["linear"]["available"] is False
+        assert models["linear"]["version"] is None
+
+
+class TestPostPredictedDiamondsPricesInBatch:
+    def test_post_predicted_diamonds_prices_in_batch(self, client, model_cache):
+        data = [
+            {
+                "carat": 1.1,
+                "cut": "Ideal",
+                "color": "H",
+                "clarity": "SI2",
+                "depth": 62.0,
+                "table": 55.0,
+                "x": 6.61,
+                "y": 6.65,
+                "z": 4.11,
+            },
+            {"carat": 1.1, "cut": "Ideal"},
+        ]
+
+        response = client.post("/diamond/predict-price/batch", json=data)
+
+        assert response.status_code == 200
+        assert response.headers["X-Model-Version"] == model_cache.get().version
+        predictions = response.json()["predictions"]
+        assert predictions[0]["price"] > 0
+        assert predictions[1]["price"] is None
+        assert "color: Field required" in predictions[1]["error"]
+
+    def test_raises_400_when_batch_is_empty(self, client, model_cache):
+        response = client.post("/diamond/predict-price/batch", json=[])
+
+        assert response.status_code == 400
+
+    def test_rejects_batches_larger_than_the_limit_before_predicting(self, client, mocker):
+        mocker.patch("src.config.app_config.BATCH_PREDICTION_MAX_SIZE", 2)
+        predict = mocker.patch("src.services.diamond_service.predict_diamonds_prices_in_batch")
+
+        response = client.post("/diamond/predict-price/batch", json=[{"carat": 1.1}] * 3)
+
+        assert response.status_code == 422
+        assert "at most 2 diamonds" in response.text
+        predict.assert_not_called()
+
+    def test_documents_the_item_schema(self, client):
+        schema = client.get("/openapi.json").json()
+        body = schema["paths"]["/diamond/predict-price/batch"]["post"]["requestBody"]
+
+        items = body["content"]["application/json"]["schema"]["items"]
+        assert {"$ref": "#/components/schemas/DiamondFeaturesForPredictionSchema"} in items["anyOf"]
+
+
+class TestPostPredictedDiamondsPricesFromCsv:
+    def test_streams_the_prices_of_the_batch_endpoint(self, client, model_cache):
+        df = pd.read_csv("data/diamonds.csv").head(25).drop(columns="price")
+        expected = client.post(
+            "/diamond/predict-price/batch", json=df.to_dict("records")
+        ).json()["predictions"]
+
+        response = client.post(
+            "/diamond/predict-price/csv?chunk_size=10",
+            content=df.to_csv(index=False),
+            headers={"Content-Type": "text/csv"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.headers["X-Model-Version"] == model_cache.get().version
+        priced = pd.read_csv(io.StringIO(response.text), keep_default_na=False)
+        assert priced.columns.tolist() == [*df.columns, "predicted_price", "error"]
+        assert priced.carat.tolist() == df.carat.tolist()
+        assert priced.predicted_price.tolist() == pytest.approx([row["price"] for row in expected])
+        assert (priced.error == "").all()
+
+    def test_reports_invalid_rows_inline(self, client, linear_model_cache):
+        df = pd.read_csv("data/diamonds.csv").head(4).drop(columns="price")
+        df["cut"] = df["cut"].astype(object)
+        df.loc[1, "cut"] = "Flawless"
+        df.loc[2, "x"] = 0
+        df["depth"] = df["depth"].astype(object)
+        df.loc[3, "depth"] = "deep"
+
+        response = client.post(
+            "/diamond/predict-price/csv?model=linear&chunk_size=3", content=df.to_csv(index=False)
+        )
+
+        assert response.status_code == 200
+        priced = pd.read_csv(io.StringIO(response.text), keep_default_na=False)
+        assert float(priced.predicted_price[0]) > 0
+        assert priced.predicted_price[1:].tolist() == ["", "", ""]
+        assert priced.error[0] == ""
+        assert priced.error[1].startswith("cut: must be one of Fair, Good")
+        assert priced.error[2] == "x must have value grather than 0."
+        assert priced.error[3] == "depth: must be a number"
+
+    def test_raises_400_when_a_column_is_missing(self, client, model_cache):
+        df = pd.read_csv("data/diamonds.csv").head(4).drop(columns=["price", "clarity"])
+
+        response = client.post("/diamond/predict-price/csv", content=df.to_csv(index=False))
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Missing columns: clarity."
+
+    def test_raises_400_when_a_later_chunk_is_malformed(self, client, model_cache):
+        df = pd.read_csv("data/diamonds.csv").head(25).drop(columns="price")
+        lines = df.to_csv(index=False).splitlines()
+        lines.insert(20, "0.3,Ideal,H,VVS1,61.2,57.0,4.3,4.39,2.66,1,2")
+
+        response = client.post(
+            "/diamond/predict-price/csv?chunk_size=10", content="\n".join(lines) + "\n"
+        )
+
+        assert response.status_code == 400
+        assert "Expected 9 fields in line 21, saw 11" in response.json()["detail"]
+
+    def test_raises_400_when_the_csv_is_empty(self, client, model_cache):
+        response = client.post("/diamond/predict-price/csv", content=b"")
+
+        assert response.status_code == 400
+
+
 class TestPostSearchDiamondByFeaturesAndSimilarWeight:
     def test_post_search_diamond_by_features_and_similar_weight(self, client):
         data = {"carat": 0.96, "cut": "Ideal", "color": "H", "clarity": "SI2"}
@@ -75,6 +313,46 @@ class TestPostSearchDiamondByFeaturesAndSimilarWeight:
         assert response is not None
         assert response.status_code == 200
 
+    def test_returns_n_diamonds_with_the_most_similar_weight(self, client):
+        data = {"carat": 0.96, "cut": "Ideal", "color": "H", "clarity": "SI2", "n": 3}
+
+        response = client.post("/diamond/search", json=data)
+
+        assert response.status_code == 200
+        assert len(response.json()) == 3
+        assert all(
+            diamond["cut"] == "Ideal" and diamond["color"] == "H" and diamond["clarity"] == "SI2"
+            for diamond in response.json()
+        )
+
+    def test_streams_ndjson_rows(self, client):
+        data = {"carat": 0.96, "cut": "Ideal", "color": "H", "clarity": "SI2", "n": 50}
+
+        expected = client.post("/diamond/search", json=data).json()
+        response = client.post("/diamond/search?format=ndjson", json=data)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [json.loads(line) for line in response.text.splitlines()] == expected
+
+    def test_streams_columnar_json(self, client):
+        data = {"carat": 0.96, "cut": "Ideal", "color": "H", "clarity": "SI2", "n": 50}
+
+        expected = client.post("/diamond/search", json=data).json()
+        response = client.post("/diamond/search?format=columnar", json=data)
+
+        assert response.status_code == 200
+        columns = response.json()
+        assert list(columns) == list(expected[0])
+        assert [dict(zip(columns, row)) for row in zip(*columns.values())] == expected
+
+    def test_raises_400_before_streaming_when_there_is_no_results(self, client):
+        data = {"carat": 1, "cut": "Fair", "color": "D", "clarity": "IF"}
+
+        response = client.post("/diamond/search?format=ndjson", json=data)
+
+        assert response.status_code == 400
+
     def test_raises_400_when_there_is_no_results(self, client):
         data = {"carat": 1, "cut": "Fair", "color": "D", "clarity": "IF"}
 
@@ -93,3 +371,73 @@ class TestPostSearchDiamondByFeaturesAndSimilarWeight:
 
         assert response.status_code == 400
         assert response.json()["detail"] == "carat must have value grather than 0."
+
+
+class TestPostSearchSimilarDiamonds:
+    DIAMOND = {
+        "carat": 0.9,
+        "cut": "Ideal",
+        "color": "H",
+        "clarity": "SI2",
+        "depth": 62.0,
+        "table": 57.0,
+        "x": 6.1,
+        "y": 6.2,
+        "z": 3.8,
+    }
+
+    def test_returns_the_n_nearest_diamonds_with_their_distance(self, client):
+        response = client.post("/diamond/search/similar", json={**self.DIAMOND, "n": 5})
+
+        assert response.status_code == 200
+        assert len(response.json()) == 5
+        assert all(
+            diamond["cut"] == "Ideal" and diamond["color"] == "H" and diamond["clarity"] == "SI2"
+            for diamond in response.json()
+        )
+        distances = [diamond["distance"] for diamond in response.json()]
+        assert distances == sorted(distances)
+
+    def test_only_carat_weighted_finds_the_most_similar_weights(self, client):
+        data = {**self.DIAMOND, "n": 5}
+
+        response = client.post("/diamond/search/similar", json=data)
+        carat_only = client.post(
+            "/diamond/search/similar",
+            json={**data, "weights": {"depth": 0, "table": 0, "x": 0, "y": 0, "z": 0}},
+        )
+
+        assert carat_only.status_code == 200
+        assert carat_only.json() != response.json()
+        by_weight = client.post(
+            "/diamond/search",
+            json={"carat": 0.9, "cut": "Ideal", "color": "H", "clarity": "SI2", "n": 5},
+        )
+        assert sorted(diamond["carat"] for diamond in carat_only.json()) == sorted(
+            diamond["carat"] for diamond in by_weight.json()
+        )
+
+    def test_raises_400_when_there_is_no_results(self, client):
+        data = {**self.DIAMOND, "cut": "Fair", "color": "D", "clarity": "IF"}
+
+        response = client.post("/diamond/search/similar", json=data)
+
+        assert response.status_code == 400
+        assert (
+            response.json()["detail"]
+            == "It was not found diamonds for the chosen features."
+        )
+
+    def test_raises_400_when_every_weight_is_zero(self, client):
+        weights = {"carat": 0, "depth": 0, "table": 0, "x": 0, "y": 0, "z": 0}
+
+        response = client.post("/diamond/search/similar", json={**self.DIAMOND, "weights": weights})
+
+        assert response.status_code == 400
+
+    def test_raises_422_when_a_weight_is_negative(self, client):
+        response = client.post(
+            "/diamond/search/similar", json={**self.DIAMOND, "weights": {"carat": -1}}
+        )
+
+        assert response.status_code == 422
@@ -0,0 +1,49 @@
+import pytest
+
+from src.services.startup_service import StartupTracker, load_models
+
+
+@pytest.fixture
+def startup_tracker(mocker):
+    tracker = StartupTracker()
+    tracker.record("imports", 0.5)
+    mocker.patch("src.routers.health_router.startup_tracker", tracker)
+    return tracker
+
+
+class TestGetReadiness:
+    def test_returns_503_before_the_warm_up(self, client, startup_tracker):
+        response = client.get("/ready")
+
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+
+    def test_returns_200_and_the_startup_report_after_the_warm_up(self, client, startup_tracker):
+        startup_tracker.set_ready(True)
+
+        response = client.get("/ready")
+
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+        assert response.json()["stages"] == [{"name": "imports", "seconds": 0.5, "error": None}]
+
+    def test_returns_503_while_the_model_load_fails(
+        self, client, startup_tracker, model_cache, linear_model_cache, model_path
+    ):
+        model_cache.path = "missing.pkl"
+        load_models(startup_tracker)
+        startup_tracker.set_ready(True)
+
+        response = client.get("/ready")
+
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+        stages = {stage["name"]: stage for stage in response.json()["stages"]}
+        assert "missing.pkl" in stages["model_load"]["error"]
+
+        model_cache.path = model_path
+
+        response = client.get("/ready")
+
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
@@ -0,0 +1,66 @@
+from prometheus_client.parser import text_string_to_metric_families
+
+
+def get_samples(client) -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+class TestGetMetrics:
+    def test_counts_requests_by_route_path_and_status_code(self, client):
+        before = get_samples(client)
+        key = (
+            "diamond_api_requests_total",
+            (("method", "POST"), ("path", "/models/versions/{version}/promote"), ("status_code", "404")),
+        )
+
+        client.post("/models/versions/missing/promote")
+
+        assert get_samples(client)[key] == before.get(key, 0) + 1
+
+    def test_times_the_stages_of_a_prediction(self, client, model_cache, mocker):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+        data = {
+            "carat": 1.1,
+            "cut": "Ideal",
+            "color": "H",
+            "clarity": "SI2",
+            "depth": 62.0,
+            "table": 55.0,
+            "x": 6.61,
+            "y": 6.65,
+            "z": 4.11,
+        }
+
+        client.post("/diamond/predict-price", json=data)
+
+        samples = get_samples(client)
+        for stage in ("validation", "model", "cache_lookup"):
+            key = (
+                "diamond_api_stage_seconds_count",
+                (("operation", "predict_xgboost"), ("stage", stage)),
+            )
+            assert samples[key] >= 1
+        assert samples[
+            ("diamond_api_stage_seconds_count", (("operation", "audit_log"), ("stage", "log")))
+        ] >= 1
+
+    def test_counts_stage_errors(self, client):
+        client.post(
+            "/diamond/search",
+            json={"carat": 0, "cut": "Ideal", "color": "H", "clarity": "SI2", "n": 1},
+        )
+
+        samples = get_samples(client)
+        key = (
+            "diamond_api_stage_errors_total",
+            (("operation", "search"), ("stage", "validation")),
+        )
+        assert samples[key] >= 1
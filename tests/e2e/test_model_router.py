@@ -0,0 +1,92 @@
+import copy
+import pickle
+
+import pytest
+
+from src.schemas.model_registry_schema import ModelMetricsSchema
+
+
+DIAMOND = {
+    "carat": 1.1,
+    "cut": "Ideal",
+    "color": "H",
+    "clarity": "SI2",
+    "depth": 62.0,
+    "table": 55.0,
+    "x": 6.61,
+    "y": 6.65,
+    "z": 4.11,
+}
+
+
+@pytest.fixture
+def model_versions(model_registry, model_path):
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+
+    versions = []
+    for run in ("first", "second"):
+        run_model = copy.deepcopy(model)
+        run_model.get_booster().set_attr(run=run)
+        versions.append(
+            model_registry.register(
+                run_model,
+                metrics=ModelMetricsSchema(r2=0.98, mae=280.5),
+                data_sha256="0" * 64,
+                feature_schema=[],
+            ).version
+        )
+    return versions
+
+
+class TestGetModelVersions:
+    def test_returns_registered_versions(self, client, model_versions):
+        response = client.get("/models/versions")
+
+        assert response.status_code == 200
+        assert sorted(version["version"] for version in response.json()) == sorted(model_versions)
+
+
+class TestPostPromoteModelVersion:
+    def test_serves_promoted_version_right_away(self, client, model_versions, mocker):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+        first, second = model_versions
+
+        client.post(f"/models/versions/{first}/promote")
+        response = client.post(f"/models/versions/{second}/promote")
+
+        assert response.status_code == 200
+        assert response.json()["served_version"] == second
+        assert response.json()["warm_previous_version"] == first
+        assert response.json()["live"]["previous_version"] == first
+        prediction = client.post("/diamond/predict-price", json=DIAMOND)
+        assert prediction.headers["X-Model-Version"] == second
+
+    def test_raises_404_when_version_is_not_registered(self, client, model_registry, mocker):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+
+        response = client.post("/models/versions/123456789abc/promote")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Model version 123456789abc is not registered."
+
+
+class TestPostRollbackModelVersion:
+    def test_serves_previous_version_again(self, client, model_versions, mocker):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+        first, second = model_versions
+        client.post(f"/models/versions/{first}/promote")
+        client.post(f"/models/versions/{second}/promote")
+
+        response = client.post("/models/rollback")
+
+        assert response.status_code == 200
+        assert response.json()["served_version"] == first
+        assert response.json()["warm_previous_version"] == second
+
+    def test_raises_400_when_there_is_no_previous_version(self, client, model_registry, mocker):
+        mocker.patch("src.services.api_requests_service.save_api_requests_to_database")
+
+        response = client.post("/models/rollback")
+
+        assert response.status_code == 400
@@ -0,0 +1,7 @@
+class TestGetDatabasePoolStats:
+    def test_returns_stats_of_the_sync_and_async_pools(self, client):
+        response = client.get("/observability/database-pool")
+
+        assert response.status_code == 200
+        assert set(response.json()) == {"sync", "async"}
+        assert response.json()["sync"]["checked_out"] == 0
@@ -0,0 +1,47 @@
+from benchmarks.api import compare_with_baseline
+
+
+class TestApiBenchmark:
+
+    class TestCompareWithBaseline:
+
+        def results(self, p50_ms: float, requests_per_second: float) -> dict:
+            return {
+                "scenarios": {
+                    "predict-price": {
+                        "p50_ms": p50_ms,
+                        "p95_ms": 10.0,
+                        "p99_ms": 20.0,
+                        "requests_per_second": requests_per_second,
+                    }
+                }
+            }
+
+        def test_returns_no_regressions_within_threshold(self):
+            regressions = compare_with_baseline(
+                results=self.results(p50_ms=5.4, requests_per_second=95),
+                baseline=self.results(p50_ms=5.0, requests_per_second=100),
+                max_regression=0.1,
+            )
+
+            assert regressions == []
+
+        def test_returns_metrics_that_regressed_more_than_threshold(self):
+            regressions = compare_with_baseline(
+                results=self.results(p50_ms=6.0, requests_per_second=80),
+                baseline=self.results(p50_ms=5.0, requests_per_second=100),
+                max_regression=0.1,
+            )
+
+            assert len(regressions) == 2
+            assert regressions[0].startswith("predict-price p50_ms")
+            assert regressions[1].startswith("predict-price requests_per_second")
+
+        def test_ignores_scenarios_missing_from_results(self):
+            regressions = compare_with_baseline(
+                results={"scenarios": {}},
+                baseline=self.results(p50_ms=5.0, requests_per_second=100),
+                max_regression=0.1,
+            )
+
+            assert regressions == []
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from src.config.database_pool import InstrumentedQueuePool, get_pool_stats
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        pool_pre_ping=True,
+    )
+    yield engine
+    engine.dispose()
+
+
+class TestDatabasePool:
+
+    class TestGetPoolStats:
+
+        def test_counts_checkouts_and_checked_out_connections(self, engine):
+            with engine.connect() as connection:
+                connection.execute(text("select 1"))
+                stats = get_pool_stats(engine.pool)
+
+                assert stats.checked_out == 1
+                assert stats.checkouts == 1
+
+            stats = get_pool_stats(engine.pool)
+            assert stats.checked_out == 0
+            assert stats.checked_in == 1
+            assert stats.pool_size == 1
+            assert stats.pre_ping is True
+            assert stats.checkout_wait_seconds_buckets[-1].count == 1
+
+        def test_counts_checkout_timeouts(self, engine):
+            with engine.connect():
+                with pytest.raises(exc.TimeoutError):
+                    engine.connect()
+
+            stats = get_pool_stats(engine.pool)
+            assert stats.checkouts == 1
+            assert stats.checkout_timeouts == 1
+            assert stats.checkout_wait_seconds_max >= 0.05
+
+        def test_wait_time_buckets_are_cumulative(self, engine):
+            for _ in range(3):
+                with engine.connect():
+                    pass
+
+            counts = [
+                bucket.count for bucket in get_pool_stats(engine.pool).checkout_wait_seconds_buckets
+            ]
+            assert counts == sorted(counts)
+            assert counts[-1] == 3
+
+        def test_keeps_stats_when_the_engine_is_disposed(self, engine):
+            with engine.connect():
+                pass
+            engine.dispose()
+
+            assert get_pool_stats(engine.pool).checkouts == 1
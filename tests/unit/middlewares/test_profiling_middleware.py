@@ -0,0 +1,78 @@
+import os
+import pstats
+import time
+from datetime import datetime, timezone
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.middlewares import profiling_middleware
+from src.middlewares.profiling_middleware import RequestProfilingMiddleware, get_profile_id
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def slow_prediction() -> float:
+    end = time.perf_counter() + 0.03
+    while time.perf_counter() < end:
+        pass
+    return 1.0
+
+
+def create_client(tmp_path, mocker, sample_rate: float = 0.0) -> TestClient:
+    mocker.patch.object(profiling_middleware, "APP_DIR", TESTS_DIR)
+    app = FastAPI()
+
+    @app.get("/diamond/price")
+    def get_price():
+        return {"price": slow_prediction()}
+
+    app.add_middleware(
+        RequestProfilingMiddleware, output_dir=str(tmp_path), sample_rate=sample_rate
+    )
+    return TestClient(app)
+
+
+class TestRequestProfilingMiddleware:
+
+    def test_profiles_requests_with_the_header(self, tmp_path, mocker):
+        client = create_client(tmp_path, mocker)
+
+        response = client.get("/diamond/price", headers={"X-Profile": "1"})
+
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+        assert profile_id.endswith("_GET_diamond-price")
+        stats = pstats.Stats(str(tmp_path / f"{profile_id}.pstats")).stats
+        assert any(function_name == "slow_prediction" for _, _, function_name in stats)
+        collapsed = (tmp_path / f"{profile_id}.collapsed").read_text()
+        assert "get_price" in collapsed and "slow_prediction" in collapsed
+
+    def test_does_not_profile_other_requests(self, tmp_path, mocker):
+        client = create_client(tmp_path, mocker)
+
+        response = client.get("/diamond/price", headers={"X-Profile": "0"})
+        client.get("/diamond/price")
+
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+        assert not os.listdir(tmp_path)
+
+    def test_profiles_sampled_requests(self, tmp_path, mocker):
+        client = create_client(tmp_path, mocker, sample_rate=1.0)
+
+        response = client.get("/diamond/price")
+
+        profile_id = response.headers["X-Profile-Id"]
+        assert sorted(os.listdir(tmp_path)) == [f"{profile_id}.collapsed", f"{profile_id}.pstats"]
+
+
+class TestGetProfileId:
+
+    def test_tags_the_profile_with_timestamp_method_and_path(self):
+        now = datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)
+
+        assert get_profile_id("POST", "/diamond/predict-price", now) == (
+            "20240102T030405000006Z_POST_diamond-predict-price"
+        )
+        assert get_profile_id("GET", "/", now) == "20240102T030405000006Z_GET_root"
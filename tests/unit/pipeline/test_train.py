@@ -0,0 +1,106 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from optuna.trial import TrialState
+
+from src.pipeline.train import (
+    export_linear_model,
+    prepare_diamonds_df_for_linear_model,
+    run_training,
+    search_xgboost_params,
+    split_xgboost_data,
+    train_linear_model,
+)
+from src.schemas.diamond_schema import DiamondFeaturesForPredictionSchema
+from src.services.dataset_service import remove_invalid_diamonds
+from src.services.linear_model_service import load_linear_model_from_bytes
+from src.services.model_registry_service import ModelRegistry
+
+
+@pytest.fixture(scope="module")
+def diamonds_df():
+    return remove_invalid_diamonds(pd.read_csv("data/diamonds.csv").head(300))
+
+
+class TestTrain:
+
+    class TestPrepareDiamondsDfForLinearModel:
+
+        def test_one_hot_encodes_categories_dropping_first_level(self, diamonds_df):
+            response = prepare_diamonds_df_for_linear_model(diamonds_df)
+
+            assert list(response.columns[:2]) == ["carat", "x"]
+            assert "price" not in response.columns
+            assert "depth" not in response.columns
+            assert "cut_Fair" not in response.columns
+            assert "cut_Good" in response.columns
+
+    class TestExportLinearModel:
+
+        def test_exported_model_predicts_the_same_prices(self, diamonds_df):
+            model, _ = train_linear_model(diamonds_df)
+            linear_model = load_linear_model_from_bytes(
+                json.dumps(export_linear_model(model)).encode()
+            )
+            diamonds = [
+                DiamondFeaturesForPredictionSchema.model_validate(record)
+                for record in diamonds_df.head(20).to_dict("records")
+            ]
+
+            expected = np.exp(model.predict(prepare_diamonds_df_for_linear_model(diamonds_df).head(20)))
+            assert np.allclose(linear_model.predict_prices(diamonds), expected)
+            assert np.allclose([linear_model.predict_price(diamond) for diamond in diamonds], expected)
+
+    class TestSearchXgboostParams:
+
+        def test_resumes_study_running_only_missing_trials(self, diamonds_df, tmp_path):
+            x_train, _, y_train, _ = split_xgboost_data(diamonds_df)
+            storage_url = f"sqlite:///{tmp_path / 'study.db'}"
+
+            search_xgboost_params(
+                x_train, y_train, storage_url=storage_url, study_name="test", n_trials=2, workers=1
+            )
+            study = search_xgboost_params(
+                x_train, y_train, storage_url=storage_url, study_name="test", n_trials=3, workers=2
+            )
+
+            assert len(study.get_trials(states=(TrialState.COMPLETE,))) == 3
+
+    class TestRunTraining:
+
+        def test_writes_models_and_metrics(self, diamonds_df, tmp_path):
+            data_path = tmp_path / "diamonds.csv"
+            diamonds_df.to_csv(data_path, index=False)
+            registry = ModelRegistry(root=str(tmp_path / "registry"), name="diamonds-xgboost")
+
+            metrics = run_training(
+                data_path=str(data_path),
+                model_path=str(tmp_path / "model_xcgboost.pkl"),
+                linear_model_path=str(tmp_path / "model_linear.json"),
+                metrics_path=str(tmp_path / "metrics.json"),
+                storage_url=f"sqlite:///{tmp_path / 'study.db'}",
+                study_name="test",
+                n_trials=1,
+                workers=1,
+                registry=registry,
+                promote=True,
+            )
+
+            with open(tmp_path / "model_xcgboost.pkl", "rb") as f:
+                model = pickle.load(f)
+            assert list(model.feature_names_in_) == [
+                "carat", "cut", "color", "clarity", "depth", "table", "x", "y", "z"
+            ]
+            assert metrics["completed_trials"] == 1
+            assert json.loads((tmp_path / "metrics.json").read_text()) == metrics
+            assert load_linear_model_from_bytes((tmp_path / "model_linear.json").read_bytes())
+            assert registry.get_live().version == metrics["model_version"]
+            model_version = registry.get_version(metrics["model_version"])
+            assert model_version.artifact == "model.ubj"
+            assert model_version.metrics.mae == metrics["xgboost"]["mae"]
+            assert [feature.name for feature in model_version.feature_schema] == list(
+                model.feature_names_in_
+            )
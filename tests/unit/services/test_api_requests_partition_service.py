@@ -0,0 +1,79 @@
+from datetime import date
+
+from src.services.api_requests_partition_service import (
+    add_months,
+    apply_retention,
+    get_partition_month,
+    get_partition_name,
+)
+
+
+def executed_statements(db) -> list[str]:
+    return [str(call.args[0]) for call in db.execute.call_args_list]
+
+
+class TestApiRequestsPartitionService:
+
+    class TestAddMonths:
+
+        def test_returns_first_day_of_the_month_across_years(self):
+            assert add_months(date(2024, 11, 17), 3) == date(2025, 2, 1)
+            assert add_months(date(2024, 1, 31), -1) == date(2023, 12, 1)
+
+    class TestGetPartitionMonth:
+
+        def test_returns_month_of_partition_name(self):
+            assert get_partition_month(get_partition_name(date(2024, 6, 29))) == date(2024, 6, 1)
+
+        def test_returns_none_for_default_partition(self):
+            assert get_partition_month("api_requests_default") is None
+
+    class TestApplyRetention:
+
+        def test_creates_missing_partitions_and_drops_expired_ones(self, mocker):
+            db = mocker.MagicMock()
+            db.scalar.return_value = False
+            db.scalars.return_value = [
+                "api_requests_default",
+                "api_requests_y2024m03",
+                "api_requests_y2024m04",
+                "api_requests_y2024m09",
+                "api_requests_y2024m10",
+            ]
+
+            created, dropped = apply_retention(
+                db, today=date(2024, 9, 15), retention_months=6, partitions_ahead_months=2
+            )
+
+            assert created == ["api_requests_y2024m11"]
+            assert dropped == ["api_requests_y2024m03"]
+            assert executed_statements(db) == [
+                "CREATE TABLE api_requests_y2024m11 PARTITION OF api_requests "
+                "FOR VALUES FROM ('2024-11-01 00:00:00+00') TO ('2024-12-01 00:00:00+00')",
+                "ALTER TABLE api_requests DETACH PARTITION api_requests_y2024m03",
+                "DROP TABLE api_requests_y2024m03",
+            ]
+
+        def test_moves_the_requests_stored_in_the_default_partition_to_the_new_one(self, mocker):
+            db = mocker.MagicMock()
+            db.scalar.return_value = True
+            db.scalars.return_value = ["api_requests_default", "api_requests_y2024m09"]
+
+            created, _ = apply_retention(
+                db, today=date(2024, 9, 15), retention_months=6, partitions_ahead_months=1
+            )
+
+            in_range = (
+                "created_at >= '2024-10-01 00:00:00+00' AND created_at < '2024-11-01 00:00:00+00'"
+            )
+            assert created == ["api_requests_y2024m10"]
+            assert "FROM api_requests_default WHERE " + in_range in str(db.scalar.call_args.args[0])
+            assert executed_statements(db) == [
+                "ALTER TABLE api_requests DETACH PARTITION api_requests_default",
+                "CREATE TABLE api_requests_y2024m10 PARTITION OF api_requests "
+                "FOR VALUES FROM ('2024-10-01 00:00:00+00') TO ('2024-11-01 00:00:00+00')",
+                "INSERT INTO api_requests_y2024m10 SELECT * FROM api_requests_default WHERE " + in_range,
+                "DELETE FROM api_requests_default WHERE " + in_range,
+                "ALTER TABLE api_requests ATTACH PARTITION api_requests_default DEFAULT",
+            ]
+            db.commit.assert_called()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from src.models.api_request_model import APIrequestModel
+from src.schemas.api_requests_schema import ApiRequestsSchema
+from src.services.api_requests_service import (
+    ApiRequestsLogWriter,
+    create_api_request_record,
+    save_api_requests_to_database,
+)
+
+
+def count_api_requests(session_factory) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(APIrequestModel))
+
+
+class TestApiRequestsService:
+
+    class TestApiRequestsLogWriter:
+
+        def request_data(self, index: int = 0) -> ApiRequestsSchema:
+            return ApiRequestsSchema(
+                request_type="post",
+                path="/diamond/predict-price",
+                response=f"The predicted value for the diamond is: ${index}",
+                status_code=200,
+                created_at=datetime.now(),
+            )
+
+        def test_writes_queued_records_in_bulk_when_stopped(self, db_session_factory):
+            writer = ApiRequestsLogWriter(
+                session_factory=db_session_factory,
+                max_queue_size=100,
+                flush_max_records=10,
+                flush_interval_ms=60_000,
+            )
+            writer.start()
+            for index in range(25):
+                assert writer.enqueue(self.request_data(index)) is True
+            writer.stop()
+
+            stats = writer.get_stats()
+            assert count_api_requests(db_session_factory) == 25
+            assert stats.written_records == 25
+            assert stats.flushes == 3
+            assert stats.queue_depth == 0
+            assert stats.running is False
+
+        def test_drops_records_when_queue_is_full(self, db_session_factory):
+            writer = ApiRequestsLogWriter(
+                session_factory=db_session_factory,
+                max_queue_size=2,
+                flush_max_records=10,
+                flush_interval_ms=10,
+            )
+
+            results = [writer.enqueue(self.request_data(index)) for index in range(3)]
+
+            assert results == [True, True, False]
+            assert writer.get_stats().dropped_records == 1
+            assert writer.get_stats().queue_depth == 2
+
+        def test_flushes_after_interval(self, db_session_factory):
+            writer = ApiRequestsLogWriter(
+                session_factory=db_session_factory,
+                max_queue_size=100,
+                flush_max_records=100,
+                flush_interval_ms=10,
+            )
+            writer.start()
+            writer.enqueue(self.request_data())
+
+            for _ in range(100):
+                if writer.get_stats().written_records:
+                    break
+                time.sleep(writer.flush_interval_seconds)
+            writer.stop()
+
+            assert writer.get_stats().flushes == 1
+            assert count_api_requests(db_session_factory) == 1
+
+        def test_keeps_running_when_a_flush_raises_an_unexpected_error(
+            self, db_session_factory, mocker
+        ):
+            def create_record(request_data):
+                if request_data["response"].endswith("$0"):
+                    raise UnicodeEncodeError("utf-8", "", 0, 1, "bad record")
+                return create_api_request_record(request_data)
+
+            mocker.patch(
+                "src.services.api_requests_service.create_api_request_record",
+                side_effect=create_record,
+            )
+            writer = ApiRequestsLogWriter(
+                session_factory=db_session_factory,
+                max_queue_size=100,
+                flush_max_records=1,
+                flush_interval_ms=60_000,
+            )
+            writer.start()
+            writer.enqueue(self.request_data(0))
+            writer.enqueue(self.request_data(1))
+            writer.stop()
+
+            stats = writer.get_stats()
+            assert stats.dropped_records == 1
+            assert stats.written_records == 1
+            assert count_api_requests(db_session_factory) == 1
+
+    class TestSaveApiRequestsToDatabase:
+
+        def test_stores_the_response_compressed_with_its_hash_and_size(
+            self, db_session_factory, mocker
+        ):
+            mocker.patch("src.config.app_config.AUDIT_LOG_RESPONSE_MAX_BYTES", 10_000)
+            response = json.dumps([{"carat": 0.96, "cut": "Ideal"}] * 100)
+
+            with db_session_factory() as db:
+                save_api_requests_to_database(
+                    db=db,
+                    request_data=ApiRequestsSchema(
+                        request_type="post",
+                        path="/diamond/search",
+                        response=response,
+                        status_code=200,
+                        created_at=datetime.now(),
+                    ),
+                )
+                api_request = db.scalar(select(APIrequestModel))
+
+            assert api_request.get_response_text() == response
+            assert len(api_request.response) < len(response)
+            assert api_request.response_encoding == "zlib"
+            assert api_request.response_sha256 == hashlib.sha256(response.encode()).hexdigest()
+            assert api_request.response_size == len(response)
+            assert api_request.response_truncated is False
+
+        def test_truncates_responses_larger_than_the_cap(self, db_session_factory, mocker):
+            mocker.patch("src.config.app_config.AUDIT_LOG_RESPONSE_MAX_BYTES", 100)
+            response = json.dumps([{"carat": 0.96, "cut": "Ideal"}] * 100)
+
+            with db_session_factory() as db:
+                save_api_requests_to_database(
+                    db=db,
+                    request_data=ApiRequestsSchema(
+                        request_type="post",
+                        path="/diamond/search",
+                        response=response,
+                        status_code=200,
+                        created_at=datetime.now(),
+                    ),
+                )
+                api_request = db.scalar(select(APIrequestModel))
+
+            assert api_request.get_response_text() == response[:100]
+            assert api_request.response_size == len(response)
+            assert api_request.response_truncated is True
@@ -1,4 +1,16 @@
-from src.services.dataset_service import create_dataframe_from_csv
+import multiprocessing
+import os
+
+from src.services.dataset_service import (
+    create_dataframe_from_csv,
+    get_columnar_dataset_path,
+    ingest_csv,
+    load_dataset,
+    remove_invalid_diamonds,
+    validate_diamonds,
+    widen_float32_values,
+)
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -18,3 +30,202 @@ class TestDatasetService:
             response = create_dataframe_from_csv('data/diamonds.csv')
 
             assert isinstance(response, pd.DataFrame)
+
+    class TestLoadDataset:
+
+        @pytest.fixture
+        def csv_path(self, tmp_path):
+            path = tmp_path / "diamonds.csv"
+            pd.read_csv("data/diamonds.csv").head(50).to_csv(path, index=False)
+            return str(path)
+
+        def test_writes_columnar_dataset_to_cache_dir(self, csv_path, dataset_cache_dir, tmp_path):
+            other_csv_path = tmp_path / "other" / "diamonds.csv"
+            other_csv_path.parent.mkdir()
+
+            path = get_columnar_dataset_path(csv_path)
+
+            assert os.path.dirname(path) == dataset_cache_dir
+            assert path != get_columnar_dataset_path(str(other_csv_path))
+
+        def test_converts_csv_to_typed_columnar_dataset(self, csv_path):
+            response = load_dataset(csv_path)
+
+            assert os.path.exists(get_columnar_dataset_path(csv_path))
+            assert response.cut.cat.ordered
+            assert response.cut.cat.categories.tolist() == ["Fair", "Good", "Very Good", "Ideal", "Premium"]
+            assert response.carat.dtype == np.float32
+            assert response.price.dtype == np.int32
+            expected = pd.read_csv(csv_path)
+            assert response.astype({"cut": str, "color": str, "clarity": str, "price": "int64"})[
+                ["cut", "color", "clarity", "price"]
+            ].equals(expected[["cut", "color", "clarity", "price"]])
+            assert np.allclose(response.carat, expected.carat)
+
+        def test_reuses_columnar_dataset_while_csv_is_unchanged(self, csv_path, mocker):
+            load_dataset(csv_path)
+            convert = mocker.patch("src.services.dataset_service.convert_csv_to_columnar_dataset")
+
+            response = load_dataset(csv_path)
+
+            convert.assert_not_called()
+            assert len(response) == 50
+
+        def test_converts_csv_again_when_it_changes(self, csv_path):
+            load_dataset(csv_path)
+            pd.read_csv("data/diamonds.csv").head(60).to_csv(csv_path, index=False)
+
+            assert len(load_dataset(csv_path)) == 60
+
+        def test_reads_csv_when_columnar_dataset_cannot_be_written(self, csv_path, mocker):
+            mocker.patch(
+                "src.services.dataset_service.convert_csv_to_columnar_dataset",
+                side_effect=PermissionError("read-only"),
+            )
+
+            response = load_dataset(csv_path)
+
+            assert len(response) == 50
+            assert response.carat.dtype == np.float32
+
+        def test_raises_error_when_csv_path_is_not_found(self, tmp_path):
+            with pytest.raises(FileNotFoundError):
+                load_dataset(str(tmp_path / "missing.csv"))
+
+    class TestWidenFloat32Values:
+
+        def test_keeps_the_decimal_values(self):
+            values = np.array([1.1, 0.23, 61.8, 4733.5, 0.0], dtype=np.float32)
+
+            assert widen_float32_values(values).tolist() == [1.1, 0.23, 61.8, 4733.5, 0.0]
+
+    class TestValidateDiamonds:
+
+        def test_keeps_rows_with_known_categories_and_numeric_values(self):
+            df = pd.read_csv("data/diamonds.csv", dtype=str).head(4)
+            df.loc[1, "cut"] = "Flawless"
+            df.loc[2, "carat"] = "heavy"
+            df.loc[3, "price"] = "10.5"
+
+            response = validate_diamonds(df)
+
+            assert response.index.tolist() == [0]
+            assert response.cut.cat.ordered
+            assert response.price.dtype == np.int32
+
+        def test_raises_value_error_when_a_column_is_missing(self):
+            df = pd.read_csv("data/diamonds.csv", dtype=str).head(4).drop(columns="clarity")
+
+            with pytest.raises(ValueError):
+                validate_diamonds(df)
+
+    class TestIngestCsv:
+
+        @pytest.fixture
+        def csv_path(self, tmp_path):
+            path = tmp_path / "diamonds.csv"
+            pd.read_csv("data/diamonds.csv").head(100).to_csv(path, index=False)
+            return str(path)
+
+        def test_appends_new_valid_diamonds_in_chunks(self, csv_path, tmp_path):
+            source = pd.read_csv("data/diamonds.csv").iloc[90:130].copy()
+            source.loc[120, "color"] = "Z"
+            source.loc[121, "x"] = 0
+            source = pd.concat([source, source.loc[[125]]])
+            source_path = tmp_path / "stock.csv"
+            source.to_csv(source_path, index=False)
+
+            response = ingest_csv(source_path=str(source_path), csv_path=csv_path, chunk_size=8)
+
+            assert response.rows_read == 41
+            assert response.invalid_rows == 2
+            assert response.duplicate_rows == 11
+            assert response.appended_rows == 28
+            assert response.dataset_rows == 128
+            expected = pd.read_csv("data/diamonds.csv").iloc[:130].drop(index=[120, 121])
+            assert pd.read_csv(csv_path).equals(expected.reset_index(drop=True))
+
+        def test_updates_columnar_dataset_without_converting_csv_again(self, csv_path, tmp_path, mocker):
+            source_path = tmp_path / "stock.csv"
+            pd.read_csv("data/diamonds.csv").iloc[100:110].to_csv(source_path, index=False)
+            ingest_csv(source_path=str(source_path), csv_path=csv_path, chunk_size=4)
+            convert = mocker.patch("src.services.dataset_service.convert_csv_to_columnar_dataset")
+
+            response = load_dataset(csv_path)
+
+            convert.assert_not_called()
+            assert len(response) == 110
+            assert np.allclose(response.carat, pd.read_csv(csv_path).carat)
+
+        def test_concurrent_ingestions_of_two_processes_append_each_diamond_once(
+            self, csv_path, tmp_path
+        ):
+            df = pd.read_csv("data/diamonds.csv")
+            source_paths = [str(tmp_path / "stock-1.csv"), str(tmp_path / "stock-2.csv")]
+            df.iloc[100:2000].to_csv(source_paths[0], index=False)
+            df.iloc[1000:3000].to_csv(source_paths[1], index=False)
+            context = multiprocessing.get_context("fork")
+            processes = [
+                context.Process(
+                    target=ingest_csv,
+                    kwargs={"source_path": source_path, "csv_path": csv_path, "chunk_size": 50},
+                )
+                for source_path in source_paths
+            ]
+
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join(timeout=60)
+
+            assert [process.exitcode for process in processes] == [0, 0]
+            expected_path = str(tmp_path / "expected.csv")
+            df.head(100).to_csv(expected_path, index=False)
+            for source_path in source_paths:
+                ingest_csv(source_path=source_path, csv_path=expected_path, chunk_size=50)
+            column_names = list(df.columns)
+            response = pd.read_csv(csv_path)
+            expected = pd.read_csv(expected_path)
+            assert response.sort_values(column_names, ignore_index=True).equals(
+                expected.sort_values(column_names, ignore_index=True)
+            )
+            assert len(load_dataset(csv_path)) == len(response)
+            assert np.allclose(load_dataset(csv_path).price, response.price)
+
+        def test_leaves_the_dataset_unchanged_when_a_later_chunk_is_malformed(
+            self, csv_path, tmp_path
+        ):
+            lines = pd.read_csv("data/diamonds.csv").iloc[100:200].to_csv(index=False).splitlines()
+            lines.insert(80, "0.3,Ideal,H,VVS1,61.2,57.0,400,4.3,4.39,2.66,1,2")
+            source_path = tmp_path / "stock.csv"
+            source_path.write_text("\n".join(lines) + "\n")
+
+            with pytest.raises(pd.errors.ParserError):
+                ingest_csv(source_path=str(source_path), csv_path=csv_path, chunk_size=10)
+
+            assert len(pd.read_csv(csv_path)) == 100
+            assert len(load_dataset(csv_path)) == 100
+
+        def test_raises_value_error_when_a_column_is_missing(self, csv_path, tmp_path):
+            source_path = tmp_path / "stock.csv"
+            pd.read_csv("data/diamonds.csv").head(5).drop(columns="price").to_csv(source_path, index=False)
+
+            with pytest.raises(ValueError):
+                ingest_csv(source_path=str(source_path), csv_path=csv_path, chunk_size=4)
+            assert len(pd.read_csv(csv_path)) == 100
+
+    class TestRemoveInvalidDiamonds:
+
+        def test_removes_diamonds_with_zero_dimension_or_non_positive_price(self):
+            df = pd.DataFrame(
+                {
+                    "x": [1.0, 0.0, 1.0, 1.0],
+                    "y": [1.0, 1.0, 1.0, 1.0],
+                    "z": [1.0, 1.0, 1.0, 1.0],
+                    "price": [100, 100, 0, -1],
+                }
+            )
+
+            response = remove_invalid_diamonds(df)
+
+            assert response.index.tolist() == [0]
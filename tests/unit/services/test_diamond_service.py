@@ -1,16 +1,22 @@
+import numpy as np
 import pytest
 import pandas as pd
-from pandas.testing import assert_frame_equal
 
 from src.schemas.diamond_schema import (
     DiamondFeaturesForPredictionSchema,
     DiamondFeaturesForSearchSchema,
+    DiamondFeaturesForSimilaritySearchSchema,
 )
 from src.services.diamond_service import (
     create_dataframe_from_diamond_schema_for_prediction,
-    filter_diamonds_df_by_features,
-    diamonds_df_filtered_by_similar_weight,
+    find_positions_with_most_similar_weight,
+    predict_diamond_price,
+    predict_diamonds_prices_in_batch,
+    search_diamond_by_features_and_similar_weight,
+    search_similar_diamonds,
+    validate_diamonds_df_for_prediction,
 )
+from src.services.search_index_service import DiamondSearchIndex
 from src.utils.enums.diamonds_enums import (
     DiamondClarityEnum,
     DiamondColorEnum,
@@ -104,33 +110,121 @@ class TestDiamondService:
 
     class TestSearchDiamondByFeatures:
 
-        def test_filter_diamonds_by_features(
-            self,
-            features,
-            df_with_features_and_price,
-            df_result_after_filter,
+        @pytest.fixture
+        def search_index(self, mocker, df_with_features_and_price):
+            def patch_search_index(df: pd.DataFrame) -> None:
+                mocker.patch(
+                    "src.services.search_index_service.search_index_cache.get",
+                    return_value=DiamondSearchIndex.from_dataframe(df),
+                )
+
+            patch_search_index(df_with_features_and_price)
+            return patch_search_index
+
+        def test_search_diamonds_by_features(
+            self, search_index, features, df_result_after_filter
         ):
+            response = search_diamond_by_features_and_similar_weight(features)
 
-            response = filter_diamonds_df_by_features(
-                features=features, df=df_with_features_and_price
+            assert response == df_result_after_filter.to_dict("records")
+
+        def test_search_diamonds_by_similar_weight(
+            self, search_index, features, df_result_after_filter
+        ):
+            response = search_diamond_by_features_and_similar_weight(
+                features.model_copy(update={"n": 2})
             )
 
-            assert isinstance(response, pd.DataFrame)
-            assert_frame_equal(response, df_result_after_filter)
+            assert response == df_result_after_filter.iloc[[1, 3]].to_dict("records")
 
-        def test_filter_diamonds_by_similar_weight(
-            self,
-            features,
-            df_with_features_and_price,
-            df_result_after_filter,
+        def test_search_diamonds_by_similar_weight_returns_each_row_once(
+            self, search_index, features, df_with_features_and_price
         ):
+            search_index(pd.concat([df_with_features_and_price] * 3, ignore_index=True))
 
-            response = diamonds_df_filtered_by_similar_weight(
-                weight=features.carat, df=df_with_features_and_price
+            response = search_diamond_by_features_and_similar_weight(
+                features.model_copy(update={"carat": 1.05, "n": 5})
             )
 
-            assert isinstance(response, pd.DataFrame)
-            assert_frame_equal(response, df_result_after_filter)
+            assert sorted(record[DiamondColumnsEnum.CARAT.value] for record in response) == [
+                1.03, 1.03, 1.03, 1.1, 1.1
+            ]
+
+        def test_search_diamonds_returns_all_rows_when_n_is_larger(
+            self, search_index, features, df_result_after_filter
+        ):
+            response = search_diamond_by_features_and_similar_weight(
+                features.model_copy(update={"carat": 5, "n": 100})
+            )
+
+            assert response == df_result_after_filter.to_dict("records")
+
+        def test_search_diamonds_raises_when_no_diamond_has_the_features(
+            self, search_index, features
+        ):
+            with pytest.raises(ValueError):
+                search_diamond_by_features_and_similar_weight(
+                    features.model_copy(update={"cut": DiamondCutEnum.fair.value})
+                )
+
+        @pytest.mark.parametrize("weight", [0.1, 0.5, 0.8, 1.0, 1.5, 3.0])
+        @pytest.mark.parametrize("n", [1, 2, 3, 7])
+        def test_find_positions_with_most_similar_weight(self, weight, n):
+            sorted_carats = np.array([0.3, 0.31, 0.5, 0.5, 0.7, 0.9, 1.01, 1.2, 2.0])
+
+            positions = find_positions_with_most_similar_weight(
+                sorted_carats=sorted_carats, weight=weight, n=n
+            )
+
+            distances = np.sort(np.abs(sorted_carats - weight))
+            assert len(set(positions.tolist())) == n
+            assert np.array_equal(
+                np.sort(np.abs(sorted_carats[positions] - weight)), distances[:n]
+            )
+
+    class TestSearchSimilarDiamonds:
+
+        @pytest.fixture
+        def search_index(self, mocker):
+            df = pd.read_csv("data/diamonds.csv")
+            mocker.patch(
+                "src.services.search_index_service.search_index_cache.get",
+                return_value=DiamondSearchIndex.from_dataframe(df),
+            )
+            return df
+
+        def test_returns_the_nearest_diamonds_first_with_their_distance(self, search_index):
+            diamond = search_index.iloc[10].to_dict()
+            data = DiamondFeaturesForSimilaritySearchSchema(**diamond, n=4)
+
+            response = search_similar_diamonds(data)
+
+            assert len(response) == 4
+            assert response[0] == {**diamond, "distance": 0.0}
+            assert [record["distance"] for record in response] == sorted(
+                record["distance"] for record in response
+            )
+
+        def test_a_weight_of_zero_leaves_the_feature_out(self, search_index):
+            diamond = search_index.iloc[10].to_dict()
+            data = DiamondFeaturesForSimilaritySearchSchema(
+                **{**diamond, "depth": 1.0, "table": 1.0},
+                weights={"depth": 0, "table": 0},
+            )
+
+            response = search_similar_diamonds(data)
+
+            assert response[0] == {**diamond, "distance": 0.0}
+
+        def test_raises_when_every_weight_is_zero(self, search_index):
+            diamond = search_index.iloc[10].to_dict()
+            data = DiamondFeaturesForSimilaritySearchSchema(
+                **diamond,
+                weights={"carat": 0, "depth": 0, "table": 0, "x": 0, "y": 0, "z": 0},
+            )
+
+            with pytest.raises(ValueError):
+                search_similar_diamonds(data)
 
     class TestCreateDataframeFromDiamondSchemaForPrediction:
         def test_create_dataframe_from_diamond_schema_for_prediction(self):
@@ -147,4 +241,81 @@ class TestDiamondService:
             )
 
             response = create_dataframe_from_diamond_schema_for_prediction(data)
-            assert isinstance(response, pd.DataFrame)
\ No newline at end of file
+            assert isinstance(response, pd.DataFrame)
+
+    class TestPredictDiamondPrice:
+
+        def test_message_shows_the_price_as_the_model_predicts_it(self, model_cache, mocker):
+            mocker.patch(
+                "src.services.prediction_cache_service.prediction_cache.get", return_value=None
+            )
+            mocker.patch(
+                "src.services.prediction_batching_service.prediction_batcher.predict",
+                return_value=float(np.float32(4641.396)),
+            )
+            data = DiamondFeaturesForPredictionSchema(
+                carat=1.1, cut="Ideal", color="H", clarity="SI2",
+                depth=62.0, table=55.0, x=6.61, y=6.65, z=4.11,
+            )
+
+            response = predict_diamond_price(data)
+
+            assert response.message == "The predicted value for the diamond is: $4641.396"
+            assert response.price == pytest.approx(4641.396)
+
+    class TestPredictDiamondsPricesInBatch:
+
+        @pytest.fixture
+        def diamonds(self):
+            return [
+                {"carat": 1.1, "cut": "Ideal", "color": "H", "clarity": "SI2", "depth": 62.0, "table": 55.0, "x": 6.61, "y": 6.65, "z": 4.11},
+                {"carat": 0.3, "cut": "Premium", "color": "D", "clarity": "VS1", "depth": 61.5, "table": 58.0, "x": 4.3, "y": 4.28, "z": 2.64},
+                {"carat": 2.02, "cut": "Very Good", "color": "G", "clarity": "SI1", "depth": 63.1, "table": 57.0, "x": 7.95, "y": 8.0, "z": 5.03},
+            ]
+
+        def test_predicts_same_prices_as_single_prediction(self, diamonds, model_cache):
+            response = predict_diamonds_prices_in_batch(diamonds)
+
+            assert response.model_version == model_cache.get().version
+            for row, diamond in zip(response.predictions, diamonds):
+                single = predict_diamond_price(DiamondFeaturesForPredictionSchema(**diamond))
+                assert row.error is None
+                assert row.price == single.price
+
+        def test_reports_invalid_rows_without_failing_the_batch(self, diamonds, model_cache):
+            diamonds.insert(1, {**diamonds[0], "cut": "Shiny"})
+            diamonds.insert(2, {**diamonds[0], "x": 0})
+
+            response = predict_diamonds_prices_in_batch(diamonds)
+
+            assert [row.index for row in response.predictions] == [0, 1, 2, 3, 4]
+            assert response.predictions[1].price is None
+            assert response.predictions[1].error.startswith("cut: ")
+            assert response.predictions[2].price is None
+            assert response.predictions[2].error == "x must have value grather than 0."
+            assert all(
+                row.price is not None and row.error is None
+                for row in (response.predictions[0], response.predictions[3], response.predictions[4])
+            )
+
+        def test_raises_error_when_batch_is_empty(self, model_cache):
+            with pytest.raises(ValueError):
+                predict_diamonds_prices_in_batch([])
+
+    class TestValidateDiamondsDfForPrediction:
+
+        def test_reports_every_invalid_column_of_each_row(self):
+            df = pd.read_csv("data/diamonds.csv", dtype=str, keep_default_na=False).head(3)
+            df.loc[1, "color"] = "Z"
+            df.loc[1, "carat"] = "0"
+            df.loc[2, "table"] = ""
+
+            features, errors = validate_diamonds_df_for_prediction(df)
+
+            assert errors.tolist() == [
+                "",
+                "color: must be one of D, E, F, G, H, I, J; carat must have value grather than 0.",
+                "table: must be a number",
+            ]
+            assert features.cut.cat.ordered
+            assert features.carat.tolist() == [1.1, 0.0, 1.2]
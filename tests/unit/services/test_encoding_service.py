@@ -0,0 +1,67 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.schemas.diamond_schema import DiamondFeaturesForPredictionSchema
+from src.services.diamond_service import (
+    create_dataframe_from_diamond_schemas_for_prediction,
+    prepare_diamond_df_for_xgboost_model,
+)
+from src.services.encoding_service import DiamondFeatureEncoder, get_model_encoder
+
+
+class TestEncodingService:
+
+    @pytest.fixture
+    def model(self, model_path):
+        with open(model_path, "rb") as f:
+            return pickle.load(f)
+
+    @pytest.fixture
+    def diamonds(self):
+        df = pd.read_csv("data/diamonds.csv").drop(columns="price").head(200)
+        return [DiamondFeaturesForPredictionSchema(**row) for row in df.to_dict("records")]
+
+    class TestDiamondFeatureEncoder:
+
+        def test_predictions_are_identical_to_dataframe_path(self, model, diamonds):
+            encoder = get_model_encoder(model)
+
+            for diamond in diamonds:
+                df = create_dataframe_from_diamond_schemas_for_prediction([diamond])
+                expected = model.predict(prepare_diamond_df_for_xgboost_model(df))
+
+                assert model.predict(encoder.encode(diamond)).tobytes() == expected.tobytes()
+
+        def test_batch_predictions_are_identical_to_dataframe_path(self, model, diamonds):
+            encoder = get_model_encoder(model)
+            df = create_dataframe_from_diamond_schemas_for_prediction(diamonds)
+            expected = model.predict(prepare_diamond_df_for_xgboost_model(df))
+
+            assert model.predict(encoder.encode_many(diamonds)).tobytes() == expected.tobytes()
+
+        def test_dataframe_predictions_are_identical_to_dataframe_path(self, model, diamonds):
+            encoder = get_model_encoder(model)
+            df = create_dataframe_from_diamond_schemas_for_prediction(diamonds)
+            expected = model.predict(prepare_diamond_df_for_xgboost_model(df))
+
+            features = encoder.encode_dataframe(prepare_diamond_df_for_xgboost_model(df))
+
+            assert model.predict(features).tobytes() == expected.tobytes()
+
+        def test_encodes_features_in_received_order(self, diamonds):
+            encoder = DiamondFeatureEncoder(("clarity", "carat", "cut"))
+
+            features = encoder.encode(diamonds[0])
+
+            assert features.dtype == np.float32
+            assert features.tolist() == [[6.0, np.float32(1.1), 3.0]]
+
+        def test_raises_error_when_category_is_unknown(self, diamonds):
+            encoder = DiamondFeatureEncoder(("cut",))
+            diamond = diamonds[0].model_copy(update={"cut": "Shiny"})
+
+            with pytest.raises(KeyError):
+                encoder.encode(diamond)
@@ -0,0 +1,112 @@
+import json
+import math
+
+import pytest
+
+from src.schemas.diamond_schema import DiamondFeaturesForPredictionSchema
+from src.services.diamond_service import (
+    create_dataframe_from_diamond_schemas_for_prediction,
+    prepare_diamond_df_for_xgboost_model,
+)
+from src.services.linear_model_service import (
+    LinearPriceModel,
+    load_linear_model_from_bytes,
+    warm_up_linear_model,
+)
+
+COEFFICIENTS = {
+    "carat": -0.7,
+    "x": 1.2,
+    "cut_Ideal": 0.08,
+    "color_J": -0.45,
+    "clarity_IF": 1.3,
+}
+
+
+def create_diamond(**features) -> DiamondFeaturesForPredictionSchema:
+    data = {
+        "carat": 1.1,
+        "cut": "Ideal",
+        "color": "J",
+        "clarity": "IF",
+        "depth": 62.0,
+        "table": 55.0,
+        "x": 6.61,
+        "y": 6.65,
+        "z": 4.11,
+    }
+    data.update(features)
+    return DiamondFeaturesForPredictionSchema.model_validate(data)
+
+
+class TestLinearModelService:
+
+    class TestLinearPriceModel:
+
+        def test_predicts_exponential_of_weighted_features(self):
+            model = LinearPriceModel.from_coefficients(intercept=5.5, coefficients=COEFFICIENTS)
+
+            response = model.predict_price(create_diamond())
+
+            assert response == pytest.approx(
+                math.exp(5.5 - 0.7 * 1.1 + 1.2 * 6.61 + 0.08 - 0.45 + 1.3)
+            )
+
+        def test_reference_categories_have_no_weight(self):
+            model = LinearPriceModel.from_coefficients(intercept=5.5, coefficients=COEFFICIENTS)
+
+            response = model.predict_price(create_diamond(cut="Fair", color="D", clarity="I1"))
+
+            assert response == pytest.approx(math.exp(5.5 - 0.7 * 1.1 + 1.2 * 6.61))
+
+        def test_batch_predictions_are_the_same_as_single_predictions(self):
+            model = LinearPriceModel.from_coefficients(intercept=5.5, coefficients=COEFFICIENTS)
+            diamonds = [
+                create_diamond(),
+                create_diamond(carat=0.3, cut="Good", color="E", x=4.2),
+            ]
+
+            response = model.predict_prices(diamonds)
+
+            assert response.tolist() == pytest.approx(
+                [model.predict_price(diamond) for diamond in diamonds]
+            )
+
+        def test_dataframe_predictions_are_the_same_as_single_predictions(self):
+            model = LinearPriceModel.from_coefficients(intercept=5.5, coefficients=COEFFICIENTS)
+            diamonds = [
+                create_diamond(),
+                create_diamond(carat=0.3, cut="Good", color="E", x=4.2),
+            ]
+            df = prepare_diamond_df_for_xgboost_model(
+                create_dataframe_from_diamond_schemas_for_prediction(diamonds)
+            )
+
+            response = model.predict_dataframe(df)
+
+            assert response.tolist() == pytest.approx(
+                [model.predict_price(diamond) for diamond in diamonds]
+            )
+
+        def test_raises_value_error_when_feature_is_unknown(self):
+            with pytest.raises(ValueError):
+                LinearPriceModel.from_coefficients(
+                    intercept=5.5, coefficients={**COEFFICIENTS, "cut_Excellent": 0.1}
+                )
+
+    class TestLoadLinearModelFromBytes:
+
+        def test_loads_model_from_json(self):
+            raw_model = json.dumps({"intercept": 5.5, "coefficients": COEFFICIENTS}).encode()
+
+            model = load_linear_model_from_bytes(raw_model)
+
+            assert model.intercept == 5.5
+            assert warm_up_linear_model(model) > 0
+
+        @pytest.mark.parametrize(
+            "raw_model", [b"not json", b'{"intercept": 5.5}', b'{"intercept": 5.5, "coefficients": {"price": 1}}']
+        )
+        def test_raises_value_error_when_model_is_invalid(self, raw_model):
+            with pytest.raises(ValueError):
+                load_linear_model_from_bytes(raw_model)
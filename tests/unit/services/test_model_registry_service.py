@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from src.schemas.model_registry_schema import ModelMetricsSchema
+from src.services.model_registry_service import ModelRegistry, create_feature_schema
+
+METRICS = ModelMetricsSchema(r2=0.98, mae=280.5)
+
+
+def register(registry: ModelRegistry, model) -> str:
+    return registry.register(
+        model,
+        metrics=METRICS,
+        data_sha256="0" * 64,
+        feature_schema=[],
+    ).version
+
+
+class TestModelRegistryService:
+
+    class TestCreateFeatureSchema:
+
+        def test_describes_features_in_order_with_categories(self):
+            df = pd.DataFrame(
+                {
+                    "carat": [1.0],
+                    "cut": pd.Categorical(["Ideal"], categories=["Fair", "Ideal"], ordered=True),
+                }
+            )
+
+            response = create_feature_schema(df)
+
+            assert [feature.name for feature in response] == ["carat", "cut"]
+            assert response[0].categories is None
+            assert response[1].categories == ["Fair", "Ideal"]
+
+    class TestModelRegistry:
+
+        def test_registers_versions_with_their_metadata(self, tmp_path):
+            registry = ModelRegistry(root=str(tmp_path), name="diamonds")
+
+            version = register(registry, {"name": "first"})
+
+            model_version = registry.get_version(version)
+            assert model_version.metrics == METRICS
+            assert model_version.data_sha256 == "0" * 64
+            assert [v.version for v in registry.list_versions()] == [version]
+            assert register(registry, {"name": "first"}) == version
+
+        def test_raises_key_error_when_version_is_not_registered(self, tmp_path):
+            registry = ModelRegistry(root=str(tmp_path), name="diamonds")
+
+            with pytest.raises(KeyError):
+                registry.promote("123456789abc")
+
+        def test_promotes_versions_keeping_the_previous_one(self, tmp_path):
+            registry = ModelRegistry(root=str(tmp_path), name="diamonds")
+            first = register(registry, {"name": "first"})
+            second = register(registry, {"name": "second"})
+
+            assert registry.get_live() is None
+            registry.promote(first)
+            live = registry.promote(second)
+
+            assert registry.get_live() == live
+            assert (live.version, live.previous_version) == (second, first)
+            assert registry.get_live_artifact_path() == registry.get_artifact_path(second)
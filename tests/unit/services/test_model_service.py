@@ -0,0 +1,184 @@
+import logging
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from src.schemas.model_registry_schema import ModelMetricsSchema
+from src.services.model_registry_service import ModelRegistry
+from src.services.model_service import (
+    ModelCache,
+    load_model_from_bytes,
+    warm_up_model,
+)
+
+METRICS = ModelMetricsSchema(r2=0.98, mae=280.5)
+
+
+def write_artifact(path, model, mtime_ns=None):
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class TestModelService:
+
+    class TestModelCache:
+
+        def test_loads_model_once_and_shares_it(self, tmp_path, mocker):
+            path = tmp_path / "model.pkl"
+            write_artifact(path, {"name": "first"})
+            loader = mocker.Mock(side_effect=pickle.loads)
+            cache = ModelCache(path=str(path), reload_interval_seconds=1, loader=loader)
+
+            first = cache.get()
+            second = cache.get()
+
+            assert first is second
+            assert first.model == {"name": "first"}
+            loader.assert_called_once()
+
+        def test_raises_error_when_artifact_is_not_found(self, tmp_path):
+            cache = ModelCache(path=str(tmp_path / "no_model.pkl"), reload_interval_seconds=1)
+
+            with pytest.raises(FileNotFoundError):
+                cache.get()
+
+        def test_reloads_model_when_artifact_changes(self, tmp_path):
+            path = tmp_path / "model.pkl"
+            write_artifact(path, {"name": "first"}, mtime_ns=1_000_000_000)
+            cache = ModelCache(path=str(path), reload_interval_seconds=1)
+            first = cache.get()
+
+            write_artifact(path, {"name": "second"}, mtime_ns=2_000_000_000)
+
+            assert cache.reload_if_changed() is True
+            assert cache.get().model == {"name": "second"}
+            assert cache.get().version != first.version
+
+        def test_does_not_reload_when_only_mtime_changes(self, tmp_path):
+            path = tmp_path / "model.pkl"
+            write_artifact(path, {"name": "first"}, mtime_ns=1_000_000_000)
+            cache = ModelCache(path=str(path), reload_interval_seconds=1)
+            first = cache.get()
+
+            os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+
+            assert cache.reload_if_changed() is False
+            assert cache.get().model is first.model
+            assert cache.get().version == first.version
+
+        def test_keeps_current_model_when_new_artifact_is_invalid(self, tmp_path):
+            path = tmp_path / "model.pkl"
+            write_artifact(path, {"name": "first"}, mtime_ns=1_000_000_000)
+            cache = ModelCache(path=str(path), reload_interval_seconds=1)
+            first = cache.get()
+
+            path.write_bytes(b"not a pickle")
+            os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+
+            assert cache.reload_if_changed() is False
+            assert cache.get() is first
+
+        def test_warns_once_when_the_artifact_goes_missing(self, tmp_path, caplog):
+            path = tmp_path / "model.pkl"
+            write_artifact(path, {"name": "first"})
+            cache = ModelCache(path=str(path), reload_interval_seconds=1)
+            first = cache.get()
+            os.remove(path)
+
+            with caplog.at_level(logging.DEBUG, logger="src.services.model_service"):
+                for _ in range(3):
+                    assert cache.reload_if_changed() is False
+
+            warnings = [record for record in caplog.records if record.levelno == logging.WARNING]
+            assert len(warnings) == 1
+            assert cache.get() is first
+
+        def test_does_not_warn_about_an_artifact_never_deployed(self, tmp_path, caplog):
+            cache = ModelCache(path=str(tmp_path / "model_linear.json"), reload_interval_seconds=1)
+
+            with caplog.at_level(logging.DEBUG, logger="src.services.model_service"):
+                for _ in range(3):
+                    assert cache.reload_if_changed() is False
+
+            assert all(record.levelno == logging.DEBUG for record in caplog.records)
+
+        def test_serves_live_registry_version_and_rolls_back_to_warm_model(self, tmp_path, mocker):
+            registry = ModelRegistry(root=str(tmp_path / "registry"), name="diamonds")
+            first, second = [
+                registry.register(model, metrics=METRICS, data_sha256="", feature_schema=[])
+                for model in ({"name": "first"}, {"name": "second"})
+            ]
+            registry.promote(first.version)
+            loader = mocker.Mock(side_effect=pickle.loads)
+            cache = ModelCache(
+                path=str(tmp_path / "no_model.pkl"),
+                reload_interval_seconds=1,
+                loader=loader,
+                registry=registry,
+            )
+            served_first = cache.get()
+
+            registry.promote(second.version)
+            assert cache.reload_if_changed() is True
+            assert cache.get().version == second.version
+            assert cache.get_previous() is served_first
+
+            registry.promote(first.version)
+            assert cache.reload_if_changed() is True
+            assert cache.get() is served_first
+            assert loader.call_count == 2
+
+        def test_serves_path_while_no_registry_version_is_live(self, tmp_path):
+            path = tmp_path / "model.pkl"
+            write_artifact(path, {"name": "first"})
+            registry = ModelRegistry(root=str(tmp_path / "registry"), name="diamonds")
+            cache = ModelCache(path=str(path), reload_interval_seconds=1, registry=registry)
+
+            assert cache.get().model == {"name": "first"}
+
+        def test_loads_native_model_and_warms_it_up(self, model_path, tmp_path):
+            with open(model_path, "rb") as f:
+                model = pickle.load(f)
+            native_path = tmp_path / "model.ubj"
+            model.save_model(native_path)
+            cache = ModelCache(path=str(native_path), reload_interval_seconds=1)
+
+            served_model = cache.get()
+
+            assert served_model.format == "xgboost"
+            assert served_model.load_seconds > 0
+            assert served_model.first_inference_seconds > 0
+
+    class TestLoadModelFromBytes:
+
+        def test_native_model_predicts_the_same_as_pickled_model(self, model_path, tmp_path):
+            with open(model_path, "rb") as f:
+                raw_pickle = f.read()
+            pickled_model = load_model_from_bytes(raw_pickle)
+            pickled_model.save_model(tmp_path / "model.ubj")
+            pickled_model.save_model(tmp_path / "model.json")
+            features = np.array([[1.1, 3, 4, 6, 62.0, 55.0, 6.61, 6.65, 4.11]], dtype=np.float32)
+
+            for native_file_name in ("model.ubj", "model.json"):
+                native_model = load_model_from_bytes((tmp_path / native_file_name).read_bytes())
+
+                assert list(native_model.feature_names_in_) == list(pickled_model.feature_names_in_)
+                assert native_model.predict(features) == pickled_model.predict(features)
+
+        def test_raises_value_error_when_native_model_is_invalid(self):
+            with pytest.raises(ValueError):
+                load_model_from_bytes(b"not a model")
+
+        def test_raises_unpickling_error_when_pickle_is_invalid(self):
+            with pytest.raises(pickle.UnpicklingError):
+                load_model_from_bytes(pickle.dumps({"name": "first"})[:-3])
+
+    class TestWarmUpModel:
+
+        def test_skips_models_without_feature_count(self):
+            assert warm_up_model({"name": "first"}) is None
+
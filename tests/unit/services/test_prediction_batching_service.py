@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.services.prediction_batching_service import PredictionBatcher
+
+
+class FakeModel:
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def predict(self, features: np.ndarray, model) -> np.ndarray:
+        with self._lock:
+            self.batch_sizes.append(len(features))
+        time.sleep(self.delay_seconds)
+        return features[:, 0] * 2
+
+
+@pytest.fixture
+def batcher_factory():
+    batchers = []
+
+    def create(model: FakeModel, max_batch_size: int = 64, max_wait_ms: float = 5):
+        batcher = PredictionBatcher(
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, predict=model.predict
+        )
+        batcher.start()
+        batchers.append(batcher)
+        return batcher
+
+    yield create
+    for batcher in batchers:
+        batcher.stop()
+
+
+def predict_concurrently(batcher: PredictionBatcher, model: FakeModel, n: int) -> list[float]:
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        return list(
+            executor.map(
+                lambda value: batcher.predict(np.array([[value, 1.0]], dtype=np.float32), model),
+                range(n),
+            )
+        )
+
+
+class TestPredictionBatchingService:
+
+    class TestPredictionBatcher:
+
+        def test_coalesces_concurrent_predictions_returning_each_caller_its_price(
+            self, batcher_factory
+        ):
+            model = FakeModel(delay_seconds=0.02)
+            batcher = batcher_factory(model)
+
+            response = predict_concurrently(batcher, model, n=32)
+
+            assert response == [value * 2.0 for value in range(32)]
+            assert sum(model.batch_sizes) == 32
+            assert len(model.batch_sizes) < 32
+            assert batcher.get_stats().largest_batch_size > 1
+
+        def test_batches_have_at_most_max_batch_size_rows(self, batcher_factory):
+            model = FakeModel(delay_seconds=0.02)
+            batcher = batcher_factory(model, max_batch_size=4)
+
+            predict_concurrently(batcher, model, n=32)
+
+            assert max(model.batch_sizes) <= 4
+
+        def test_stops_waiting_when_traffic_is_light(self, batcher_factory):
+            model = FakeModel()
+            batcher = batcher_factory(model)
+            predict_concurrently(batcher, model, n=32)
+
+            for value in range(10):
+                batcher.predict(np.array([[value, 1.0]], dtype=np.float32), model)
+
+            assert batcher.get_stats().current_wait_ms == 0
+
+        def test_raises_prediction_error_to_every_caller(self, batcher_factory):
+            def predict(features, model):
+                raise ValueError("Feature shape mismatch")
+
+            batcher = PredictionBatcher(max_batch_size=8, max_wait_ms=5, predict=predict)
+            batcher.start()
+
+            try:
+                with pytest.raises(ValueError):
+                    batcher.predict(np.zeros((1, 2), dtype=np.float32), FakeModel())
+            finally:
+                batcher.stop()
+
+        def test_predicts_right_away_when_not_running(self):
+            model = FakeModel()
+            batcher = PredictionBatcher(max_batch_size=8, max_wait_ms=5, predict=model.predict)
+
+            response = batcher.predict(np.array([[3.0, 1.0]], dtype=np.float32), model)
+
+            assert response == 6.0
+            assert batcher.get_stats().batches == 0
+
+        def test_predictions_racing_stop_are_all_answered(self):
+            model = FakeModel(delay_seconds=0.005)
+            batcher = PredictionBatcher(max_batch_size=8, max_wait_ms=5, predict=model.predict)
+            batcher.start()
+
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                futures = [
+                    executor.submit(
+                        batcher.predict, np.array([[value, 1.0]], dtype=np.float32), model
+                    )
+                    for value in range(64)
+                ]
+                batcher.stop()
+                response = [future.result(timeout=5) for future in futures]
+
+            assert response == [value * 2.0 for value in range(64)]
+            assert not batcher.is_running
+
+        def test_raises_timeout_error_when_the_batch_takes_too_long(self):
+            model = FakeModel(delay_seconds=0.5)
+            batcher = PredictionBatcher(
+                max_batch_size=8, max_wait_ms=5, timeout_seconds=0.05, predict=model.predict
+            )
+            batcher.start()
+
+            try:
+                with pytest.raises(TimeoutError):
+                    batcher.predict(np.array([[3.0, 1.0]], dtype=np.float32), model)
+            finally:
+                batcher.stop()
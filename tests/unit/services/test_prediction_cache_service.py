@@ -0,0 +1,68 @@
+import pytest
+
+from src.schemas.diamond_schema import DiamondFeaturesForPredictionSchema
+from src.services.prediction_cache_service import PredictionCache
+
+
+class TestPredictionCacheService:
+
+    @pytest.fixture
+    def diamond(self):
+        return DiamondFeaturesForPredictionSchema(
+            carat=1.1, cut="Ideal", color="H", clarity="SI2",
+            depth=62.0, table=55.0, x=6.61, y=6.65, z=4.11,
+        )
+
+    class TestPredictionCache:
+
+        def test_returns_cached_price_for_same_canonical_features(self, diamond):
+            cache = PredictionCache(max_entries=10, ttl_seconds=None, float_precision=2)
+            cache.put("v1", cache.make_key(diamond), 4733.0)
+
+            same_diamond = diamond.model_copy(update={"carat": 1.1000001})
+
+            assert cache.get("v1", cache.make_key(same_diamond)) == 4733.0
+            assert cache.get_stats().hits == 1
+
+        def test_misses_when_features_differ(self, diamond):
+            cache = PredictionCache(max_entries=10, ttl_seconds=None, float_precision=6)
+            cache.put("v1", cache.make_key(diamond), 4733.0)
+
+            other_diamond = diamond.model_copy(update={"color": "D"})
+
+            assert cache.get("v1", cache.make_key(other_diamond)) is None
+            assert cache.get_stats().misses == 1
+
+        def test_invalidates_entries_when_model_version_changes(self, diamond):
+            cache = PredictionCache(max_entries=10, ttl_seconds=None, float_precision=6)
+            key = cache.make_key(diamond)
+            cache.put("v1", key, 4733.0)
+
+            assert cache.get("v2", key) is None
+            assert cache.get_stats().entries == 0
+            assert cache.get_stats().invalidations == 1
+            assert cache.get_stats().model_version == "v2"
+
+        def test_evicts_least_recently_used_entry(self, diamond):
+            cache = PredictionCache(max_entries=2, ttl_seconds=None, float_precision=6)
+            keys = [cache.make_key(diamond.model_copy(update={"carat": carat})) for carat in (1, 2, 3)]
+            cache.put("v1", keys[0], 1.0)
+            cache.put("v1", keys[1], 2.0)
+            cache.get("v1", keys[0])
+            cache.put("v1", keys[2], 3.0)
+
+            assert cache.get("v1", keys[1]) is None
+            assert cache.get("v1", keys[0]) == 1.0
+            assert cache.get_stats().evictions == 1
+            assert cache.get_stats().entries == 2
+
+        def test_expires_entries_after_ttl(self, diamond, mocker):
+            monotonic = mocker.patch("src.services.prediction_cache_service.time.monotonic", return_value=100.0)
+            cache = PredictionCache(max_entries=10, ttl_seconds=5, float_precision=6)
+            key = cache.make_key(diamond)
+            cache.put("v1", key, 4733.0)
+
+            monotonic.return_value = 106.0
+
+            assert cache.get("v1", key) is None
+            assert cache.get_stats().expirations == 1
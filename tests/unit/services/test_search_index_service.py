@@ -0,0 +1,286 @@
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.spatial import cKDTree
+
+from src.services.dataset_service import dataset_lock, ingest_csv, load_dataset
+from src.services.search_index_service import (
+    SIMILARITY_FEATURES,
+    DiamondSearchIndex,
+    DiamondSearchIndexCache,
+    SimilarityTreeCache,
+    get_partition_id,
+)
+
+
+class TestSearchIndexService:
+
+    class TestDiamondSearchIndex:
+
+        def test_partition_has_rows_with_the_same_features_sorted_by_carat(self):
+            df = pd.read_csv("data/diamonds.csv")
+            index = DiamondSearchIndex.from_dataframe(df)
+
+            partition = index.get_partition_slice(
+                get_partition_id(cut="Ideal", color="H", clarity="SI2")
+            )
+            rows = index.row_offsets[partition]
+
+            expected_df = df[(df.cut == "Ideal") & (df.color == "H") & (df.clarity == "SI2")]
+            assert sorted(rows.tolist()) == expected_df.index.tolist()
+            assert np.all(np.diff(index.sorted_carats[partition]) >= 0)
+
+        def test_partition_is_empty_when_there_are_no_diamonds_with_the_features(self):
+            df = pd.read_csv("data/diamonds.csv").head(1)
+            index = DiamondSearchIndex.from_dataframe(df)
+
+            assert index.is_partition_empty(get_partition_id(cut="Fair", color="D", clarity="IF"))
+
+        def test_records_have_the_same_format_as_dataframe_records(self):
+            df = pd.read_csv("data/diamonds.csv")
+            index = DiamondSearchIndex.from_dataframe(df)
+            rows = np.array([0, 10, 42])
+
+            assert index.get_records(rows) == df.iloc[rows].to_dict("records")
+
+        def test_streamed_chunks_have_the_same_records(self):
+            df = pd.read_csv("data/diamonds.csv")
+            index = DiamondSearchIndex.from_dataframe(df)
+            rows = np.arange(0, 100, 7)
+
+            ndjson = b"".join(index.iter_ndjson(rows, chunk_size=4)).decode()
+            columnar = json.loads(b"".join(index.iter_columnar_json(rows, chunk_size=4)))
+
+            expected = df.iloc[rows].to_dict("records")
+            assert [json.loads(line) for line in ndjson.splitlines()] == expected
+            assert columnar == {column: [record[column] for record in expected] for column in df.columns}
+
+        def test_records_of_the_columnar_dataset_are_the_csv_records(self, tmp_path):
+            path = tmp_path / "diamonds.csv"
+            df = pd.read_csv("data/diamonds.csv")
+            df.to_csv(path, index=False)
+            index = DiamondSearchIndex.from_dataframe(load_dataset(str(path)))
+            rows = np.arange(0, len(df), 97)
+
+            assert index.get_records(rows) == df.iloc[rows].to_dict("records")
+
+        def test_keeps_float32_columns_as_views_of_the_columnar_dataset(self, tmp_path):
+            path = tmp_path / "diamonds.csv"
+            pd.read_csv("data/diamonds.csv").head(500).to_csv(path, index=False)
+            df = load_dataset(str(path))
+
+            index = DiamondSearchIndex.from_dataframe(df)
+
+            assert index.columns["depth"].dtype == np.float32
+            assert np.shares_memory(index.columns["depth"], df["depth"].to_numpy())
+            assert index.sorted_carats.dtype == np.float64
+
+        def test_appended_rows_are_indexed_as_if_the_index_was_rebuilt(self):
+            df = pd.read_csv("data/diamonds.csv")
+            expected = DiamondSearchIndex.from_dataframe(df)
+
+            index = DiamondSearchIndex.from_dataframe(df.head(3000))
+            for start in range(3000, len(df), 700):
+                index = index.append_dataframe(df.iloc[start : start + 700])
+
+            assert np.array_equal(index.sorted_carats, expected.sorted_carats)
+            assert np.array_equal(index.partition_bounds, expected.partition_bounds)
+            partition = index.get_partition_slice(
+                get_partition_id(cut="Ideal", color="H", clarity="SI2")
+            )
+            assert sorted(index.row_offsets[partition].tolist()) == sorted(
+                expected.row_offsets[partition].tolist()
+            )
+            assert index.get_records(np.arange(len(df))) == df.to_dict("records")
+
+        @pytest.mark.parametrize(
+            "weights",
+            [[1, 1, 1, 1, 1, 1], [2, 0.5, 0, 1, 1, 3], [1, 0, 0, 0, 0, 0], [100, 0.01, 1, 1, 1, 5]],
+        )
+        def test_most_similar_rows_are_the_nearest_ones_of_the_partition(self, weights):
+            df = pd.read_csv("data/diamonds.csv")
+            index = DiamondSearchIndex.from_dataframe(df)
+            weights = np.array(weights, dtype=np.float64)
+            features = np.array([0.9, 62.0, 57.0, 6.1, 6.2, 3.8])
+
+            rows, distances = index.find_most_similar_rows(
+                partition_id=get_partition_id(cut="Ideal", color="H", clarity="SI2"),
+                features=features,
+                weights=weights,
+                n=5,
+            )
+
+            partition_df = df[(df.cut == "Ideal") & (df.color == "H") & (df.clarity == "SI2")]
+            scales = df[SIMILARITY_FEATURES].std(ddof=0).to_numpy()
+            expected_distances = np.sqrt(
+                (((partition_df[SIMILARITY_FEATURES].to_numpy() - features) / scales) ** 2 * weights).sum(axis=1)
+            )
+            assert np.allclose(distances, np.sort(expected_distances)[:5])
+            assert np.all(np.diff(distances) >= 0)
+            assert set(rows.tolist()) <= set(partition_df.index.tolist())
+
+        def test_weights_of_the_same_features_share_a_tree(self):
+            index = DiamondSearchIndex.from_dataframe(pd.read_csv("data/diamonds.csv"))
+            partition_id = get_partition_id(cut="Ideal", color="H", clarity="SI2")
+            features = np.array([0.9, 62.0, 57.0, 6.1, 6.2, 3.8])
+
+            for weights in ([1, 1, 1, 1, 1, 1], [3, 0.2, 1, 2, 1, 1], [0, 1, 1, 1, 1, 1]):
+                index.find_most_similar_rows(
+                    partition_id, features, np.array(weights, dtype=np.float64), n=5
+                )
+
+            assert len(index.similarity_trees) == 2
+
+        def test_returns_the_whole_partition_when_n_is_larger(self):
+            df = pd.read_csv("data/diamonds.csv")
+            index = DiamondSearchIndex.from_dataframe(df)
+            partition_id = get_partition_id(cut="Ideal", color="H", clarity="SI2")
+
+            rows, distances = index.find_most_similar_rows(
+                partition_id=partition_id,
+                features=np.array([0.9, 62.0, 57.0, 6.1, 6.2, 3.8]),
+                weights=np.ones(len(SIMILARITY_FEATURES)),
+                n=100000,
+            )
+
+            assert sorted(rows.tolist()) == sorted(
+                index.row_offsets[index.get_partition_slice(partition_id)].tolist()
+            )
+            assert len(distances) == len(rows)
+
+        def test_appended_index_does_not_reuse_the_similarity_trees(self):
+            df = pd.read_csv("data/diamonds.csv")
+            index = DiamondSearchIndex.from_dataframe(df.head(100))
+            row = df.iloc[101]
+            features = row[SIMILARITY_FEATURES].to_numpy(dtype=np.float64)
+            partition_id = get_partition_id(cut=row.cut, color=row.color, clarity=row.clarity)
+            index.find_most_similar_rows(partition_id, features, np.ones(6), n=1)
+
+            appended = index.append_dataframe(df.iloc[100:200])
+            rows, distances = appended.find_most_similar_rows(partition_id, features, np.ones(6), n=1)
+
+            assert len(index.similarity_trees) == 1
+            assert rows.tolist() == [101]
+            assert distances.tolist() == [0.0]
+
+    class TestSimilarityTreeCache:
+
+        def test_builds_each_tree_once(self, mocker):
+            cache = SimilarityTreeCache(max_entries=2)
+            build = mocker.Mock(side_effect=lambda: cKDTree(np.zeros((1, 1))))
+
+            first = cache.get_or_build((0, (1.0,)), build)
+            second = cache.get_or_build((0, (1.0,)), build)
+
+            assert first is second
+            build.assert_called_once()
+
+        def test_serves_other_trees_while_building_one(self):
+            cache = SimilarityTreeCache(max_entries=2)
+            cached = cache.get_or_build((0, (True,)), lambda: cKDTree(np.zeros((1, 1))))
+            building = threading.Event()
+            release = threading.Event()
+
+            def build() -> cKDTree:
+                building.set()
+                release.wait(timeout=5)
+                return cKDTree(np.ones((1, 1)))
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(cache.get_or_build, (1, (True,)), build) for _ in range(2)]
+                building.wait(timeout=5)
+                assert cache.get_or_build((0, (True,)), build) is cached
+                release.set()
+                first, second = [future.result(timeout=5) for future in futures]
+
+            assert first is second
+
+        def test_evicts_the_least_recently_used_tree(self):
+            cache = SimilarityTreeCache(max_entries=2)
+            build = lambda: cKDTree(np.zeros((1, 1)))
+            first = cache.get_or_build((0, (1.0,)), build)
+            cache.get_or_build((1, (1.0,)), build)
+            cache.get_or_build((0, (1.0,)), build)
+
+            cache.get_or_build((2, (1.0,)), build)
+
+            assert len(cache) == 2
+            assert cache.get_or_build((0, (1.0,)), build) is first
+
+    class TestDiamondSearchIndexCache:
+
+        def test_rebuilds_index_when_csv_changes(self, tmp_path):
+            path = tmp_path / "diamonds.csv"
+            df = pd.read_csv("data/diamonds.csv")
+            df.head(10).to_csv(path, index=False)
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+            cache = DiamondSearchIndexCache(path=str(path))
+
+            first = cache.get()
+            assert cache.get() is first
+
+            df.head(20).to_csv(path, index=False)
+            os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+
+            assert cache.get() is not first
+            assert len(cache.get().row_offsets) == 20
+
+        def test_serves_pinned_index_while_the_csv_is_unchanged(self, tmp_path):
+            path = tmp_path / "diamonds.csv"
+            pd.read_csv("data/diamonds.csv").head(10).to_csv(path, index=False)
+            index = DiamondSearchIndex.from_dataframe(load_dataset(str(path)))
+            cache = DiamondSearchIndexCache(path=str(path))
+
+            cache.pin(index)
+
+            assert cache.get() is index
+            assert cache.get() is index
+
+        def test_appends_rows_ingested_by_another_process_to_the_pinned_index(
+            self, tmp_path, mocker
+        ):
+            path = tmp_path / "diamonds.csv"
+            df = pd.read_csv("data/diamonds.csv")
+            df.head(10).to_csv(path, index=False)
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+            index = DiamondSearchIndex.from_dataframe(load_dataset(str(path)))
+            cache = DiamondSearchIndexCache(path=str(path))
+            cache.pin(index)
+            cache.get()
+            append_dataframe = mocker.spy(DiamondSearchIndex, "append_dataframe")
+
+            source_path = tmp_path / "stock.csv"
+            df.iloc[10:40].to_csv(source_path, index=False)
+            process = multiprocessing.get_context("fork").Process(
+                target=ingest_csv,
+                kwargs={"source_path": str(source_path), "csv_path": str(path), "chunk_size": 5},
+            )
+            process.start()
+            process.join(timeout=60)
+
+            response = cache.get()
+            assert process.exitcode == 0
+            assert len(response.row_offsets) == 40
+            assert append_dataframe.call_count == 1
+            assert response.get_records(np.arange(40)) == df.head(40).to_dict("records")
+
+        def test_serves_the_current_index_while_the_dataset_is_ingested(self, tmp_path):
+            path = tmp_path / "diamonds.csv"
+            df = pd.read_csv("data/diamonds.csv")
+            df.head(10).to_csv(path, index=False)
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+            cache = DiamondSearchIndexCache(path=str(path))
+            index = cache.get()
+
+            with dataset_lock(str(path)):
+                df.head(20).to_csv(path, index=False)
+                os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+                assert cache.get() is index
+
+            assert len(cache.get().row_offsets) == 20
@@ -0,0 +1,58 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.search_index_service import DiamondSearchIndex
+from src.services.shared_memory_service import SharedSearchIndex
+
+
+class TestSharedMemoryService:
+
+    class TestSharedSearchIndex:
+
+        def test_shared_index_has_the_same_arrays_as_the_index(self):
+            index = DiamondSearchIndex.from_dataframe(pd.read_csv("data/diamonds.csv"))
+            shared_index = SharedSearchIndex(index)
+
+            try:
+                rows = np.arange(0, 100, 7)
+                assert shared_index.index.get_records(rows) == index.get_records(rows)
+                assert np.array_equal(shared_index.index.sorted_carats, index.sorted_carats)
+                assert np.array_equal(shared_index.index.row_offsets, index.row_offsets)
+                assert np.array_equal(shared_index.index.partition_bounds, index.partition_bounds)
+                assert shared_index.nbytes >= index.sorted_carats.nbytes
+            finally:
+                shared_index.close()
+
+        def test_shared_arrays_are_read_only(self):
+            index = DiamondSearchIndex.from_dataframe(pd.read_csv("data/diamonds.csv").head(10))
+            shared_index = SharedSearchIndex(index)
+
+            try:
+                with pytest.raises(ValueError):
+                    shared_index.index.sorted_carats[0] = 0
+                with pytest.raises(ValueError):
+                    shared_index.index.columns["price"][0] = 0
+            finally:
+                shared_index.close()
+
+        def test_close_unmaps_and_unlinks_the_blocks(self):
+            index = DiamondSearchIndex.from_dataframe(pd.read_csv("data/diamonds.csv").head(10))
+            shared_index = SharedSearchIndex(index)
+            blocks = list(shared_index._blocks)
+
+            shared_index.close()
+
+            assert all(block.buf is None for block in blocks)
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=blocks[0].name)
+
+        def test_raises_value_error_when_a_column_holds_objects(self):
+            df = pd.read_csv("data/diamonds.csv").head(10)
+            df["certificate"] = "GIA"
+            index = DiamondSearchIndex.from_dataframe(df)
+
+            with pytest.raises(ValueError):
+                SharedSearchIndex(index)
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.services.startup_service import StartupTracker, load_models, warm_up
+
+
+@pytest.fixture
+def database(mocker):
+    return mocker.patch("src.services.startup_service.connect_to_database")
+
+
+@pytest.fixture
+def search_index_cache(mocker):
+    return mocker.patch("src.services.search_index_service.search_index_cache")
+
+
+class TestStartupService:
+
+    class TestStartupTracker:
+
+        def test_records_the_duration_of_a_stage(self):
+            tracker = StartupTracker()
+
+            with tracker.stage("data_load"):
+                pass
+
+            report = tracker.get_report()
+            assert [stage.name for stage in report.stages] == ["data_load"]
+            assert report.stages[0].error is None
+            assert report.total_seconds == report.stages[0].seconds
+            assert not report.ready
+
+        def test_records_the_listed_errors_and_goes_on(self):
+            tracker = StartupTracker()
+
+            with tracker.stage("model_load", (FileNotFoundError,)):
+                raise FileNotFoundError("model.pkl")
+
+            assert tracker.get_report().stages[0].error == "model.pkl"
+
+        def test_raises_other_errors(self):
+            tracker = StartupTracker()
+
+            with pytest.raises(KeyError):
+                with tracker.stage("model_load", (FileNotFoundError,)):
+                    raise KeyError("model")
+
+            assert not tracker.has_stage("model_load")
+
+        def test_is_not_ready_while_a_required_stage_failed(self):
+            tracker = StartupTracker()
+            tracker.record("db_connect", 0.1, error="connection refused")
+            tracker.record("model_load", 0.1, error="model.pkl")
+            tracker.set_ready(True)
+
+            assert tracker.is_warmed_up
+            assert not tracker.is_ready
+            assert tracker.get_failed_stages() == ["model_load"]
+
+            tracker.record("model_load", 0.2)
+
+            assert tracker.is_ready
+
+    class TestLoadModels:
+
+        def test_loads_the_linear_model_when_the_xgboost_one_fails(self, model_cache, linear_model_cache):
+            model_cache.path = "missing.pkl"
+            tracker = StartupTracker()
+
+            load_models(tracker)
+
+            stages = {stage.name: stage for stage in tracker.get_report().stages}
+            assert "missing.pkl" in stages["model_load"].error
+            assert stages["linear_model_load"].error is None
+            assert linear_model_cache.get_if_loaded() is not None
+
+    class TestWarmUp:
+
+        def test_runs_every_stage_and_marks_the_process_ready(
+            self, model_cache, linear_model_cache, database, search_index_cache
+        ):
+            tracker = StartupTracker()
+
+            report = asyncio.run(warm_up(tracker))
+
+            assert report.ready
+            assert [stage.name for stage in report.stages] == [
+                "db_connect",
+                "model_load",
+                "linear_model_load",
+                "data_load",
+            ]
+            database.assert_called_once()
+            search_index_cache.get.assert_called_once()
+            assert model_cache.get_if_loaded() is not None
+
+        def test_is_ready_when_the_database_is_down(
+            self, model_cache, linear_model_cache, database, search_index_cache
+        ):
+            database.side_effect = OperationalError("SELECT 1", {}, Exception("connection refused"))
+            tracker = StartupTracker()
+
+            report = asyncio.run(warm_up(tracker))
+
+            assert report.ready
+            assert "connection refused" in report.stages[0].error
+
+        def test_skips_the_stages_already_run(
+            self, model_cache, linear_model_cache, database, search_index_cache
+        ):
+            tracker = StartupTracker()
+            tracker.record("data_load", 1.5)
+
+            report = asyncio.run(warm_up(tracker))
+
+            search_index_cache.get.assert_not_called()
+            assert report.stages[0].name == "data_load"
+            assert report.stages[0].seconds == 1.5
+
+        def test_is_not_ready_when_the_model_load_fails(
+            self, model_cache, linear_model_cache, database, search_index_cache
+        ):
+            model_cache.path = "missing.pkl"
+            tracker = StartupTracker()
+
+            report = asyncio.run(warm_up(tracker))
+
+            assert not report.ready
+            assert tracker.get_failed_stages() == ["model_load"]
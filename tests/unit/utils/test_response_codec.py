@@ -0,0 +1,32 @@
+import pytest
+
+from src.utils.response_codec import decode_response, encode_response
+
+
+class TestResponseCodec:
+
+    class TestEncodeResponse:
+
+        def test_round_trips_the_response(self):
+            response = "The predicted value for the diamond is: $5358.2705078125"
+
+            encoded = encode_response(response, max_bytes=1000, compression_level=6)
+
+            assert decode_response(encoded["response"], encoded["response_encoding"]) == response
+            assert encoded["response_truncated"] is False
+
+        def test_drops_a_character_cut_by_the_cap(self):
+            encoded = encode_response("carat ≈ 1", max_bytes=8, compression_level=6)
+
+            assert decode_response(encoded["response"], encoded["response_encoding"]) == "carat "
+            assert encoded["response_size"] == len("carat ≈ 1".encode("utf-8"))
+            assert encoded["response_truncated"] is True
+
+    class TestDecodeResponse:
+
+        def test_decodes_uncompressed_responses(self):
+            assert decode_response(b"legacy response", "identity") == "legacy response"
+
+        def test_raises_value_error_when_encoding_is_unknown(self):
+            with pytest.raises(ValueError):
+                decode_response(b"", "gzip")
@@ -0,0 +1,85 @@
+import os
+import pstats
+import time
+
+import pytest
+
+from src.utils.stack_sampler import StackSampler
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def busy_wait(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestStackSampler:
+
+    class TestSample:
+
+        def test_samples_the_stacks_running_code_under_the_root_dir(self):
+            sampler = StackSampler(root_dir=TESTS_DIR, interval_seconds=0.001)
+
+            sampler.start()
+            busy_wait(0.05)
+            sampler.stop()
+
+            function_names = {
+                function_name
+                for _, stack in sampler.samples
+                for _, _, function_name in stack
+            }
+            assert "busy_wait" in function_names
+            assert sampler.duration_seconds >= 0.05
+
+        def test_skips_stacks_outside_the_root_dir(self, tmp_path):
+            sampler = StackSampler(root_dir=str(tmp_path), interval_seconds=0.001)
+
+            sampler.start()
+            busy_wait(0.02)
+            sampler.stop()
+
+            assert not sampler.samples
+
+        def test_skips_ignored_threads(self):
+            sampler = StackSampler(
+                root_dir=TESTS_DIR, interval_seconds=0.001, ignored_thread_prefixes=("Main",)
+            )
+
+            sampler.start()
+            busy_wait(0.02)
+            sampler.stop()
+
+            assert not sampler.samples
+
+    class TestOutputs:
+
+        def get_sampler(self) -> StackSampler:
+            sampler = StackSampler(root_dir=TESTS_DIR, interval_seconds=0.001)
+            root = ("app.py", 1, "handle")
+            leaf = ("app.py", 10, "predict")
+            sampler.samples[("MainThread", (root, leaf))] = 3
+            sampler.samples[("MainThread", (root,))] = 1
+            return sampler
+
+        def test_collapses_stacks_from_root_to_leaf(self):
+            collapsed = self.get_sampler().get_collapsed_stacks()
+
+            assert collapsed.splitlines() == [
+                "MainThread;handle (app.py:1) 1",
+                "MainThread;handle (app.py:1);predict (app.py:10) 3",
+            ]
+
+        def test_writes_stats_loadable_by_pstats(self, tmp_path):
+            path = tmp_path / "profile.pstats"
+
+            self.get_sampler().dump_pstats(str(path))
+
+            stats = pstats.Stats(str(path)).stats
+            calls, _, total_time, cumulative_time, callers = stats[("app.py", 1, "handle")]
+            assert (calls, total_time, cumulative_time) == (4, pytest.approx(0.001), pytest.approx(0.004))
+            calls, _, total_time, cumulative_time, callers = stats[("app.py", 10, "predict")]
+            assert (calls, total_time, cumulative_time) == (3, pytest.approx(0.003), pytest.approx(0.003))
+            assert callers[("app.py", 1, "handle")][0] == 3